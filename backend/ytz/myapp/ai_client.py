@@ -0,0 +1,208 @@
+"""
+AI 서버 호출 클라이언트
+
+- requests.Session 커넥션 풀 재사용 (keep-alive)
+- 연결/응답 타임아웃 분리 설정
+- 서킷 브레이커: 연속 실패가 쌓이면 일정 시간 동안 바로 에러 반환 (→ 기존 502 응답)
+- acall_ai_server(): ASGI(async) 뷰용. httpx가 설치되어 있으면 비동기 HTTP,
+  없으면 스레드 풀에서 동기 클라이언트 실행
+  (httpx 클라이언트는 이벤트 루프별로 하나, 루프가 끝나면 닫힘)
+- 같은 명령은 voice_cache에서 바로 응답 (AI 서버 호출 생략)
+
+반환 형식은 기존 call_ai_server와 같음 (실패 시 {"action": "error", "message": ...})
+"""
+import asyncio
+import threading
+import time
+import weakref
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .voice_cache import voice_cache
+
+try:
+    import httpx
+except ImportError:  # 선택 의존성
+    httpx = None
+
+AI_SERVER_URL = getattr(settings, "AI_SERVER_URL", "http://localhost:8001/llm/run")
+AI_SERVER_CONNECT_TIMEOUT = getattr(settings, "AI_SERVER_CONNECT_TIMEOUT", 1.0)
+AI_SERVER_READ_TIMEOUT = getattr(settings, "AI_SERVER_READ_TIMEOUT", 3.0)
+AI_SERVER_POOL_SIZE = getattr(settings, "AI_SERVER_POOL_SIZE", 20)
+AI_CIRCUIT_FAILURE_THRESHOLD = getattr(settings, "AI_CIRCUIT_FAILURE_THRESHOLD", 5)
+AI_CIRCUIT_RESET_TIMEOUT = getattr(settings, "AI_CIRCUIT_RESET_TIMEOUT", 30.0)
+# half-open 시험 호출이 결과 기록 없이 이 시간을 넘기면 끝난 것으로 보고 다른 요청으로 다시 시험
+AI_CIRCUIT_TRIAL_TIMEOUT = getattr(
+    settings, "AI_CIRCUIT_TRIAL_TIMEOUT", AI_SERVER_CONNECT_TIMEOUT + AI_SERVER_READ_TIMEOUT + 1.0
+)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    closed → (연속 실패 failure_threshold회) → open
+    open → (reset_timeout초 경과) → half-open: 요청 1개만 통과시켜 시험
+    half-open 성공 → closed, 실패 → 다시 open
+    시험 호출이 취소되면(release_trial) 또는 trial_timeout 동안 결과가 없으면 다음 요청이 다시 시험
+    """
+
+    def __init__(self, failure_threshold, reset_timeout, trial_timeout=AI_CIRCUIT_TRIAL_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = trial_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.trial_started = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        with self.lock:
+            state = self.state
+            if state == "open":
+                raise CircuitOpenError("AI 서버 일시 차단 중 (circuit open)")
+            if state == "half-open":
+                now = time.monotonic()
+                if self.trial_running and now - self.trial_started < self.trial_timeout:
+                    raise CircuitOpenError("AI 서버 상태 확인 중 (circuit half-open)")
+                self.trial_running = True
+                self.trial_started = now
+
+    def release_trial(self):
+        """결과 없이 끝난 호출 (취소 등) → 시험 자리만 반납"""
+        with self.lock:
+            self.trial_running = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker(AI_CIRCUIT_FAILURE_THRESHOLD, AI_CIRCUIT_RESET_TIMEOUT)
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=AI_SERVER_POOL_SIZE)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+# 이벤트 루프 → (AsyncClient, 수명 관리용 async generator)
+_async_clients = weakref.WeakKeyDictionary()
+
+
+async def _client_lifetime(client):
+    """
+    루프가 끝날 때 클라이언트 닫기
+    asyncio.run()은 루프를 닫기 전에 shutdown_asyncgens()로 멈춰 있는 async generator를 모두 닫음
+    → WSGI에서 async_to_sync가 요청마다 만드는 루프도 끝나면 커넥션 풀까지 정리됨
+    """
+    try:
+        yield
+    finally:
+        _async_clients.pop(asyncio.get_running_loop(), None)
+        await client.aclose()
+
+
+async def _get_async_client():
+    # AsyncClient는 이벤트 루프에 묶이므로 루프별로 하나씩 유지 (ASGI 서버 루프에서는 계속 재사용)
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(AI_SERVER_READ_TIMEOUT, connect=AI_SERVER_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=AI_SERVER_POOL_SIZE),
+        )
+        lifetime = _client_lifetime(client)
+        await lifetime.__anext__()  # 첫 yield까지 진행 → 루프에 등록
+        entry = _async_clients[loop] = (client, lifetime)
+    return entry[0]
+
+
+def _error(e):
+    return {"action": "error", "message": str(e)}
+
+
+def call_ai_server(text: str) -> dict:
+    cached = voice_cache.get(text)
+    if cached is not None:
+        return cached
+
+    try:
+        breaker.before_call()
+    except CircuitOpenError as e:
+        return _error(e)
+
+    try:
+        res = _session.post(
+            AI_SERVER_URL,
+            json={"text": text},
+            timeout=(AI_SERVER_CONNECT_TIMEOUT, AI_SERVER_READ_TIMEOUT)
+        )
+        if res.status_code >= 500:  # 4xx는 요청 문제이므로 장애로 보지 않음
+            res.raise_for_status()
+        result = res.json()
+    except Exception as e:
+        breaker.record_failure()
+        return _error(e)
+    except BaseException:
+        # 요청 취소(클라이언트 연결 끊김 → CancelledError) 등은 AI 서버 장애가 아님
+        breaker.release_trial()
+        raise
+
+    breaker.record_success()
+    voice_cache.put(text, result)
+    return result
+
+
+async def acall_ai_server(text: str) -> dict:
+    cached = voice_cache.get(text)
+    if cached is not None:
+        return cached
+
+    if httpx is None:
+        return await sync_to_async(call_ai_server, thread_sensitive=False)(text)
+
+    try:
+        breaker.before_call()
+    except CircuitOpenError as e:
+        return _error(e)
+
+    try:
+        client = await _get_async_client()
+        res = await client.post(AI_SERVER_URL, json={"text": text})
+        if res.status_code >= 500:  # 4xx는 요청 문제이므로 장애로 보지 않음
+            res.raise_for_status()
+        result = res.json()
+    except Exception as e:
+        breaker.record_failure()
+        return _error(e)
+    except BaseException:
+        # 요청 취소(클라이언트 연결 끊김 → CancelledError) 등은 AI 서버 장애가 아님
+        breaker.release_trial()
+        raise
+
+    breaker.record_success()
+    voice_cache.put(text, result)
+    return result
@@ -0,0 +1,213 @@
+"""
+알림 파이프라인
+
+1. 중복 제거: 같은 (device, event)가 ALERT_DEDUPE_WINDOW 안에 있으면 count / last_seen만 UPDATE
+   (반복 알림은 토큰을 쓰지 않으므로 같은 이벤트가 반복돼도 다른 새 이벤트가 막히지 않음)
+2. 디바이스별 토큰 버킷: 새 Alert 행을 만들 때만 토큰 사용, 초과분은 버림 (suppressed 카운트)
+3. 새 알림은 디스패처 큐에 넣고, 백그라운드 스레드가 묶어서 sink들에 전달 후 delivered_at 기록
+
+sink는 settings.ALERT_SINKS (dotted path 목록)로 교체 가능
+- ConsoleSink: 표준 출력 (기존 send_alert 동작)
+- BrokerSink: 디바이스 푸시 채널(events.broker)로 "alert" 이벤트 발행
+- MemorySink: 로컬 개발 / 테스트용 (받은 배치를 메모리에 보관)
+"""
+import atexit
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import events
+from .models import Alert
+
+ALERT_DEDUPE_WINDOW = getattr(settings, "ALERT_DEDUPE_WINDOW", 600)
+ALERT_RATE_CAPACITY = getattr(settings, "ALERT_RATE_CAPACITY", 10)
+ALERT_RATE_PER_MINUTE = getattr(settings, "ALERT_RATE_PER_MINUTE", 2)
+ALERT_BATCH_SIZE = getattr(settings, "ALERT_BATCH_SIZE", 50)
+ALERT_BATCH_INTERVAL = getattr(settings, "ALERT_BATCH_INTERVAL", 5.0)
+ALERT_SINKS = getattr(settings, "ALERT_SINKS", ["myapp.alerts.ConsoleSink"])
+
+
+# ------------------------
+# sink (알림 받는 쪽)
+# ------------------------
+class ConsoleSink:
+    def send(self, alerts):
+        for alert in alerts:
+            print(f"[ALERT] {alert.device_id} - {alert.event} (x{alert.count})")
+
+
+class BrokerSink:
+    def send(self, alerts):
+        for alert in alerts:
+            events.broker.publish([f"device:{alert.device_id}"], {
+                "type": "alert",
+                "device_id": alert.device_id,
+                "alert_id": alert.alert_id,
+                "event": alert.event,
+                "count": alert.count,
+                "last_seen": alert.last_seen.isoformat(),
+            })
+
+
+class MemorySink:
+    batches = []
+
+    def send(self, alerts):
+        self.batches.append(list(alerts))
+
+
+# ------------------------
+# 디바이스별 토큰 버킷
+# ------------------------
+class TokenBuckets:
+    def __init__(self, capacity, per_minute):
+        self.capacity = capacity
+        self.rate = per_minute / 60
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key):
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self.buckets[key] = (tokens, now)
+                return False
+            self.buckets[key] = (tokens - 1, now)
+            return True
+
+
+# ------------------------
+# 배치 디스패처
+# ------------------------
+class AlertDispatcher:
+    def __init__(self, sink_paths, batch_size, interval):
+        self.sink_paths = sink_paths
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue = queue.Queue()
+        self.stop_event = threading.Event()
+        self.start_lock = threading.Lock()
+        self.thread = None
+        self.sinks = None
+
+    def start(self):
+        with self.start_lock:
+            if self.thread is not None:
+                return
+            self.sinks = [import_string(path)() for path in self.sink_paths]
+            self.thread = threading.Thread(target=self.run, name="alert-dispatcher", daemon=True)
+            self.thread.start()
+            atexit.register(self.stop)
+
+    def submit(self, alert):
+        if self.thread is None:
+            self.start()
+        self.queue.put(alert)
+
+    def drain(self, timeout):
+        try:
+            batch = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def deliver(self, batch):
+        if not batch:
+            return
+        try:
+            for sink in self.sinks:
+                sink.send(batch)
+            Alert.objects.filter(
+                alert_id__in=[alert.alert_id for alert in batch]
+            ).update(delivered_at=timezone.now())
+        except Exception as e:
+            print(f"[ALERT] 전달 실패 ({len(batch)}건): {e}")
+        finally:
+            close_old_connections()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            batch = self.drain(self.interval)
+            # 배치가 덜 찼으면 interval 동안 더 모아서 전달
+            deadline = time.monotonic() + self.interval
+            while batch and len(batch) < self.batch_size and time.monotonic() < deadline:
+                more = self.drain(max(0.0, deadline - time.monotonic()))
+                if not more:
+                    break
+                batch.extend(more)
+            self.deliver(batch)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        while True:
+            batch = self.drain(0)
+            if not batch:
+                return
+            self.deliver(batch)
+
+
+class AlertPipeline:
+    def __init__(self):
+        self.buckets = TokenBuckets(ALERT_RATE_CAPACITY, ALERT_RATE_PER_MINUTE)
+        self.dispatcher = AlertDispatcher(ALERT_SINKS, ALERT_BATCH_SIZE, ALERT_BATCH_INTERVAL)
+        self.created = 0
+        self.deduplicated = 0
+        self.suppressed = 0
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def raise_alert(self, device_id, event):
+        """
+        반환: ("created" | "deduplicated" | "rate_limited", Alert 또는 None)
+        """
+        now = timezone.now()
+        recent = Alert.objects.filter(
+            device_id=device_id,
+            event=event,
+            last_seen__gte=now - timedelta(seconds=ALERT_DEDUPE_WINDOW)
+        ).order_by("-last_seen").values_list("alert_id", flat=True).first()
+
+        if recent is not None:
+            Alert.objects.filter(alert_id=recent).update(count=F("count") + 1, last_seen=now)
+            self.count("deduplicated")
+            return "deduplicated", None
+
+        if not self.buckets.take(device_id):
+            self.count("suppressed")
+            return "rate_limited", None
+
+        alert = Alert.objects.create(device_id=device_id, event=event, last_seen=now)
+        self.count("created")
+        self.dispatcher.submit(alert)
+        return "created", alert
+
+    def stats(self):
+        with self.lock:
+            return {
+                "created": self.created,
+                "deduplicated": self.deduplicated,
+                "suppressed": self.suppressed,
+                "pending_delivery": self.dispatcher.queue.qsize(),
+            }
+
+
+pipeline = AlertPipeline()
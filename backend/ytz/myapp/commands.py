@@ -0,0 +1,168 @@
+"""
+디바이스별 명령 큐 (백엔드 → 라즈베리파이 브릿지)
+
+- Device 상태 필드가 바뀌면 (signals.push_device_changes) 필드마다 명령 1개를 순번과 함께 저장
+  (디바이스 생성은 제외, 브릿지는 처음 poll(after=0)할 때 현재 상태(state)를 함께 받음)
+- enqueue()는 변경마다 transaction.on_commit으로 등록 → 커밋된 것만 저장
+  (롤백된 세이브포인트 안의 변경은 Django가 콜백과 함께 버림)
+- batched() 블록 안에서는 커밋된 변경을 모아 블록이 끝날 때 한 번에 저장
+  → 팀 일괄 제어 / 업로드의 자동 풍속처럼 한 요청에서 디바이스 여러 대가 바뀌어도
+    커서 잠금 1번, 명령 bulk_create 1번, 커서 bulk_update 1번
+- 순번은 CommandCursor 행을 잠그고 발급 → 디바이스 안에서 단조 증가 (중간에 빈 번호는 있을 수 있음)
+- 같은 kind의 미확인 명령은 새 명령이 대체 (fan_speed 1 → 2 → 3 이면 3만 남음)
+  → 오래 꺼져 있던 브릿지도 요청 1번으로 최종 상태만 받음
+- 브릿지는 GET /api/device/commands/?device_id=&after=<마지막 처리 순번> 으로 long-poll
+  after 이하 명령은 확인(ack)으로 보고 삭제
+- after가 이미 확인된 순번보다 작으면 (브릿지 재부팅 등) 현재 상태 전체를 함께 내려줌 (reset)
+  after=0 (처음 연결)이어도 state는 함께 내려줌 (reset은 아니므로 long-poll 대기는 그대로)
+
+※ long-poll 대기는 같은 프로세스의 broker로 깨움. 다른 워커에서 생긴 명령은 다음 poll에서 전달됨
+"""
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import events
+from .models import CommandCursor, Device, QueuedCommand
+
+# 브릿지 재동기화 시 내려주는 상태 필드 (signals.DEVICE_STATE_FIELDS와 동일)
+STATE_FIELDS = ("power_state", "fan_speed", "angle", "mode")
+
+
+def topic(device_id):
+    return f"commands:{device_id}"
+
+
+def lock_cursor(device_id):
+    CommandCursor.objects.get_or_create(device_id=device_id)
+    return CommandCursor.objects.select_for_update().get(device_id=device_id)
+
+
+class CommandBatch(dict):
+    """커밋된 명령 {device_id: {kind: value}} (batched() 블록 1개 단위)"""
+
+    def add(self, device_id, changes):
+        self.setdefault(device_id, {}).update(changes)
+
+    def flush(self):
+        if self:
+            enqueue_many(dict(self))
+            self.clear()
+
+
+_pending = threading.local()
+
+
+@contextmanager
+def batched():
+    """
+    블록 안에서 커밋된 명령을 모아 블록이 끝날 때 한 번에 저장
+    트랜잭션 안에서 시작했으면 그 트랜잭션이 커밋될 때 저장 (모든 변경 콜백 다음에 등록되므로 마지막에 실행)
+    """
+    previous = getattr(_pending, "batch", None)
+    batch = _pending.batch = CommandBatch()
+    try:
+        yield batch
+    finally:
+        _pending.batch = previous
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(batch.flush, robust=True)
+        else:
+            batch.flush()
+
+
+def enqueue(device_id, changes):
+    """
+    changes: {kind: value} → 현재 트랜잭션이 커밋되면 저장 (롤백되면 취소)
+    batched() 안이면 블록이 끝날 때 한 번에, 트랜잭션 밖이면 바로 저장
+    """
+    if not changes:
+        return
+
+    batch = getattr(_pending, "batch", None)
+    save = batch.add if batch is not None else lambda device_id, changes: enqueue_many({device_id: changes})
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(save, device_id, dict(changes)), robust=True)
+    else:
+        save(device_id, changes)
+
+
+def enqueue_many(batch):
+    """
+    batch: {device_id: {kind: value}} → 같은 kind의 미확인 명령은 삭제 후 새 순번으로 추가
+    반환: {device_id: 마지막 순번}
+    """
+    device_ids = sorted(batch)
+    with transaction.atomic():
+        CommandCursor.objects.bulk_create(
+            [CommandCursor(device_id=device_id) for device_id in device_ids], ignore_conflicts=True
+        )
+        cursors = list(
+            CommandCursor.objects.select_for_update().filter(device_id__in=device_ids).order_by("device_id")
+        )
+
+        replaced = Q()
+        for cursor in cursors:
+            replaced |= Q(
+                device_id=cursor.device_id, kind__in=list(batch[cursor.device_id]), seq__gt=cursor.acked_seq
+            )
+        QueuedCommand.objects.filter(replaced).delete()
+
+        rows = []
+        for cursor in cursors:
+            for kind, value in batch[cursor.device_id].items():
+                cursor.last_seq += 1
+                rows.append(QueuedCommand(device_id=cursor.device_id, seq=cursor.last_seq, kind=kind, value=value))
+        QueuedCommand.objects.bulk_create(rows)
+        CommandCursor.objects.bulk_update(cursors, ["last_seq"])
+
+        last_seqs = {cursor.device_id: cursor.last_seq for cursor in cursors}
+
+        def publish():
+            for device_id, seq in last_seqs.items():
+                events.broker.publish([topic(device_id)], {"type": "commands.ready", "device_id": device_id, "seq": seq})
+
+        transaction.on_commit(publish)
+    return last_seqs
+
+
+def advance(cursor, seq):
+    """seq 이하 명령 확인 처리 → 삭제 (발급하지 않은 순번까지는 올리지 않음, cursor는 잠근 상태)"""
+    seq = min(seq, cursor.last_seq)
+    if seq > cursor.acked_seq:
+        cursor.acked_seq = seq
+        cursor.acked_at = timezone.now()
+        cursor.save(update_fields=["acked_seq", "acked_at"])
+        QueuedCommand.objects.filter(device_id=cursor.device_id, seq__lte=seq).delete()
+
+
+def pending(device_id, after):
+    """
+    after 이하 명령은 확인 처리하고 그 이후 명령 목록 반환
+    반환: {"device_id", "acked_seq", "last_seq", "reset", "commands"[, "state"]}
+    """
+    with transaction.atomic():
+        cursor = lock_cursor(device_id)
+        reset = after < cursor.acked_seq
+        advance(cursor, after)
+
+        commands = list(
+            QueuedCommand.objects.filter(device_id=device_id, seq__gt=cursor.acked_seq)
+            .order_by("seq")
+            .values("seq", "kind", "value", "created_at")
+        )
+
+    result = {
+        "device_id": device_id,
+        "acked_seq": cursor.acked_seq,
+        "last_seq": cursor.last_seq,
+        "reset": reset,
+        "commands": commands,
+    }
+    if reset or after == 0:
+        result["state"] = Device.objects.filter(device_id=device_id).values(*STATE_FIELDS).first()
+    return result
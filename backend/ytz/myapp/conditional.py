@@ -0,0 +1,32 @@
+"""
+조건부 GET (ETag / If-None-Match, Last-Modified / If-Modified-Since)
+
+폴링 클라이언트가 변경 없는 데이터를 매번 받지 않도록,
+직렬화 전에 가벼운 쿼리(last_sync, sensor_id 등)만으로 304 여부를 판단
+"""
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """강한 ETag (값이 하나라도 바뀌면 달라짐)"""
+    return quote_etag("-".join(str(part) for part in parts))
+
+
+def timestamp(dt):
+    return int(dt.timestamp()) if dt else None
+
+
+def not_modified(request, etag, last_modified=None):
+    """클라이언트 캐시가 최신이면 304 응답, 아니면 None"""
+    return get_conditional_response(
+        request, etag=etag, last_modified=timestamp(last_modified)
+    )
+
+
+def with_validators(response, etag, last_modified=None):
+    if response.status_code == 200:
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(timestamp(last_modified))
+    return response
@@ -0,0 +1,70 @@
+"""
+AI 제어 결과 → 디바이스 상태 반영
+
+음성 제어(control_fan / control_fan_async)와 전원 끄기 타이머(timers.py)가 같은 경로로 디바이스를 바꾸도록 분리
+"""
+from django.utils import timezone
+
+from .serializer import DeviceSerializer
+
+
+def apply_ai_result(device, ai_result):
+    """
+    AI 결과를 디바이스에 반영 (저장은 호출한 쪽에서)
+    반환: (응답 본문, 상태 코드, 디바이스 변경 여부)
+    """
+    action = ai_result.get("action")
+
+    # AI 서버 에러
+    if action == "error":
+        return {
+            "error": "AI 서버 오류",
+            "detail": ai_result.get("message")
+        }, 502, False
+
+    # 처리할 명령 없음
+    if action == "none":
+        return {
+            "message": "처리할 명령이 없습니다.",
+            "ai_result": ai_result
+        }, 200, False
+
+    # 타이머만 있는 명령 ({"timer": 3600} / {"timer": null}) → 예약은 호출한 쪽에서 (timers.set_timer)
+    if action is None and "timer" in ai_result:
+        return {
+            "message": "타이머 명령 처리 완료",
+            "ai_result": ai_result
+        }, 200, False
+
+    # AI 오류
+    VALID_ACTIONS = {"off", "on", "rotate", "following", "tracking", "none"}
+
+    if action not in VALID_ACTIONS:
+        return {
+            "error": "알 수 없는 AI action",
+            "action": action
+        }, 400, False
+
+    # 실제 제어 로직
+    fan_speed = ai_result.get("fan_speed")
+    angle = ai_result.get("angle")
+
+    if action == "off":
+        device.power_state = False
+
+    elif action == "on":
+        device.power_state = True
+        if fan_speed is not None:
+            device.fan_speed = fan_speed
+
+    elif action == "rotate":
+        if angle is not None:
+            device.angle = angle
+
+    device.last_sync = timezone.now()
+
+    return {
+        "message": "AI 명령 처리 완료",
+        "device": DeviceSerializer(device).data,
+        "ai_result": ai_result
+    }, 200, True
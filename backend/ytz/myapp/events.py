@@ -0,0 +1,98 @@
+"""
+디바이스 상태 변경 브로커 (프로세스 내 메모리)
+
+- 토픽: "device:<device_id>", "team:<team_id>"
+- publish()는 동기 코드(뷰, 시그널)에서 호출
+- 구독자는 동기(queue.Queue) / 비동기(asyncio.Queue) 둘 다 가능
+  → SSE 뷰는 비동기 구독, 테스트에서는 동기 구독으로 바로 확인
+- 구독자 큐가 가득 차면 이벤트를 버리고 dropped를 올림 (소비자가 스냅샷으로 재동기화)
+
+여러 프로세스로 운영할 때는 같은 인터페이스로 Redis pub/sub 등을 붙이면 됨
+"""
+import asyncio
+import itertools
+import queue
+import threading
+
+from django.conf import settings
+
+DEVICE_STREAM_QUEUE_SIZE = getattr(settings, "DEVICE_STREAM_QUEUE_SIZE", 100)
+
+
+class Subscription:
+    def __init__(self, broker, topics, maxsize, loop=None):
+        self.broker = broker
+        self.topics = set(topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize) if loop else queue.Queue(maxsize)
+        self.dropped = 0
+
+    def deliver(self, event):
+        if self.loop is None:
+            self._put(event)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # 이벤트 루프가 이미 닫힘 → 끊어진 구독
+            self.close()
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except (asyncio.QueueFull, queue.Full):
+            self.dropped += 1
+
+    def get(self, timeout=None):
+        """동기 구독용 (없으면 queue.Empty)"""
+        return self.queue.get(timeout=timeout)
+
+    async def aget(self, timeout=None):
+        """비동기 구독용 (없으면 asyncio.TimeoutError)"""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class DeviceEventBroker:
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self.subscribers = {}
+        self.sequence = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def subscribe(self, topics, loop=None):
+        subscription = Subscription(self, topics, self.queue_size, loop)
+        with self.lock:
+            for topic in subscription.topics:
+                self.subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for topic in subscription.topics:
+                subscribers = self.subscribers.get(topic)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[topic]
+
+    def has_subscribers(self, prefix):
+        with self.lock:
+            return any(topic.startswith(prefix) for topic in self.subscribers)
+
+    def publish(self, topics, event):
+        """event에 id를 붙여서 topics 구독자에게 전달 (중복 구독자는 1번만)"""
+        event = dict(event, id=next(self.sequence))
+        with self.lock:
+            targets = set()
+            for topic in topics:
+                targets.update(self.subscribers.get(topic, ()))
+        for subscription in targets:
+            subscription.deliver(event)
+        return event
+
+
+broker = DeviceEventBroker(DEVICE_STREAM_QUEUE_SIZE)
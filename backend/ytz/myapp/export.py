@@ -0,0 +1,84 @@
+"""
+센서 데이터 스트리밍 내보내기 (NDJSON / CSV)
+
+- 모델 인스턴스/DRF 직렬화 없이 values_list 튜플을 바로 인코딩
+- sensor_id 기준 keyset 청크로 읽음 (WHERE sensor_id > 마지막 id LIMIT n)
+  MySQL 드라이버는 .iterator()도 결과 전체를 클라이언트 메모리에 올리기 때문에,
+  청크 단위 조회로 내보내기 크기와 상관없이 메모리 사용량을 일정하게 유지
+- ASGI에서는 async_chunks()로 감싸서 전달
+  (동기 iterator를 넘기면 Django가 sync_to_async(list)로 전체를 메모리에 모은 뒤에야 전송)
+"""
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+EXPORT_CHUNK_SIZE = getattr(settings, "SENSOR_EXPORT_CHUNK_SIZE", 2000)
+
+# SensorDataSerializer 출력과 같은 키 / 순서
+FIELDS = (
+    "sensor_id", "device", "temperature", "humidity",
+    "dust_density", "co2_level", "ir_detected", "created_at",
+)
+COLUMNS = (
+    "sensor_id", "device_id", "temperature", "humidity",
+    "dust_density", "co2_level", "ir_detected", "created_at",
+)
+
+
+def iter_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    queryset = queryset.order_by("sensor_id").values_list(*COLUMNS)
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(sensor_id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        for row in chunk:
+            yield row[:-1] + (row[-1].isoformat() if row[-1] else None,)
+        last_id = chunk[-1][0]
+
+
+def ndjson_chunks(queryset):
+    lines = []
+    for row in iter_rows(queryset):
+        lines.append(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False))
+        if len(lines) >= EXPORT_CHUNK_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def csv_chunks(queryset):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+
+    count = 0
+    for row in iter_rows(queryset):
+        writer.writerow(row)
+        count += 1
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+async def async_chunks(chunks):
+    """동기 청크 생성기를 청크마다 sync_to_async로 하나씩 진행 (DB 조회는 요청 스레드와 같은 스레드)"""
+    done = object()
+    advance = sync_to_async(next)
+    while True:
+        chunk = await advance(chunks, done)
+        if chunk is done:
+            return
+        yield chunk
+
+
+FORMATS = {
+    "ndjson": (ndjson_chunks, "application/x-ndjson", "ndjson"),
+    "csv": (csv_chunks, "text/csv; charset=utf-8", "csv"),
+}
@@ -0,0 +1,159 @@
+"""
+온도 / 미세먼지 기반 자동 풍속 제어
+
+- 올라갈 때: 25°C 초과 → 2단, 30°C 초과 → 3단 (기존 규칙 그대로)
+  PM2.5 35 초과 → 2단, 75 초과 → 3단, 두 채널 중 높은 단계 적용
+- 내려갈 때: 해당 단계 진입 값 - HYSTERESIS 이하가 되어야 한 단계씩 내려감
+  → 25°C / 30°C 부근에서 풍속이 계속 바뀌는 현상 방지
+- 계산 결과가 현재 풍속과 같으면 DB에 쓰지 않음 (suppressed 카운트)
+- 바뀔 때만 fan_speed, last_sync 두 컬럼만 UPDATE
+- 브릿지가 같은 정책(policy())으로 로컬 제어하고 결정을 보고(report)하면
+  AUTO_SPEED_LOCAL_TTL 동안 그 디바이스는 서버 쪽 자동 풍속을 생략 (deferred 카운트)
+  로컬 제어 표시는 Device.local_control_until에 저장 (워커가 여러 개여도 같은 판단)
+  남은 시간이 TTL의 절반 이상이면 다시 쓰지 않음 → 60초마다 오는 정책 동기화에도 UPDATE는 가끔만
+- 브릿지(hardware/workspace/local_control.py)는 기본 정책 없이 이 policy()만 사용
+  (level_for / channel_speed / next_speed는 브릿지 쪽과 같은 규칙, 바꾸면 양쪽 함께 수정)
+"""
+import json
+import threading
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Device
+
+# 풍속 단계별 진입 온도 (이 온도 초과 시 해당 단계)
+AUTO_SPEED_THRESHOLDS = getattr(settings, "AUTO_SPEED_THRESHOLDS", {2: 25.0, 3: 30.0})
+AUTO_SPEED_HYSTERESIS = getattr(settings, "AUTO_SPEED_HYSTERESIS", 1.0)
+AUTO_SPEED_DUST_THRESHOLDS = getattr(settings, "AUTO_SPEED_DUST_THRESHOLDS", {2: 35.0, 3: 75.0})
+AUTO_SPEED_DUST_HYSTERESIS = getattr(settings, "AUTO_SPEED_DUST_HYSTERESIS", 5.0)
+AUTO_SPEED_PWM = getattr(settings, "AUTO_SPEED_PWM", {1: 90, 2: 170, 3: 255})
+AUTO_SPEED_MIN_INTERVAL = getattr(settings, "AUTO_SPEED_MIN_INTERVAL", 3)
+AUTO_SPEED_LOCAL_TTL = getattr(settings, "AUTO_SPEED_LOCAL_TTL", 300)
+
+LEVELS = set(AUTO_SPEED_THRESHOLDS) | set(AUTO_SPEED_DUST_THRESHOLDS)
+
+
+def level_for(value, thresholds):
+    """히스테리시스 없이 값만으로 계산한 단계"""
+    speed = 1
+    for level, threshold in sorted(thresholds.items()):
+        if value > threshold:
+            speed = level
+    return speed
+
+
+def channel_speed(current, value, thresholds, hysteresis):
+    """한 채널이 요구하는 풍속: 올라갈 때는 바로, 내려갈 때는 hysteresis만큼 더 내려가야 함"""
+    target = level_for(value, thresholds)
+    speed = current
+    while speed > target and (speed not in thresholds or value <= thresholds[speed] - hysteresis):
+        speed -= 1
+    return max(speed, target)
+
+
+def next_speed(current, temp, dust=None):
+    channels = []
+    if temp:
+        channels.append((temp, AUTO_SPEED_THRESHOLDS, AUTO_SPEED_HYSTERESIS))
+    if dust is not None:
+        channels.append((dust, AUTO_SPEED_DUST_THRESHOLDS, AUTO_SPEED_DUST_HYSTERESIS))
+    if not channels:
+        return current
+
+    # 자동 제어 범위 밖의 수동 설정값이면 바로 적용
+    if current != 1 and current not in LEVELS:
+        return max(level_for(value, thresholds) for value, thresholds, _ in channels)
+    return max(channel_speed(current, *channel) for channel in channels)
+
+
+def policy():
+    """브릿지 로컬 제어용 정책 (JSON 키는 문자열)"""
+    return {
+        "thresholds": AUTO_SPEED_THRESHOLDS,
+        "hysteresis": AUTO_SPEED_HYSTERESIS,
+        "dust_thresholds": AUTO_SPEED_DUST_THRESHOLDS,
+        "dust_hysteresis": AUTO_SPEED_DUST_HYSTERESIS,
+        "pwm": AUTO_SPEED_PWM,
+        "min_interval": AUTO_SPEED_MIN_INTERVAL,
+    }
+
+
+# 설정에서만 바뀌므로 시작할 때 한 번 계산
+POLICY_VERSION = zlib.crc32(json.dumps(policy(), sort_keys=True, default=str).encode())
+
+
+class AutoSpeedController:
+    def __init__(self):
+        self.writes = 0
+        self.suppressed = 0
+        self.deferred = 0
+        self.reports = 0
+        self.lock = threading.Lock()
+
+    def locally_controlled(self, device):
+        until = device.local_control_until
+        return until is not None and until > timezone.now()
+
+    def apply(self, device, temp, dust=None):
+        """
+        측정 온도 / 미세먼지를 디바이스에 반영
+        반환: 실제로 풍속을 바꿨으면 True
+        """
+        if self.locally_controlled(device):
+            with self.lock:
+                self.deferred += 1
+            return False
+
+        speed = next_speed(device.fan_speed, temp, dust)
+        return self.save(device, speed)
+
+    def touch(self, device_id):
+        """브릿지가 로컬 제어 중임을 표시 (정책 동기화 / 결정 보고 때마다, AUTO_SPEED_LOCAL_TTL 후 만료)"""
+        now = timezone.now()
+        ttl = timedelta(seconds=AUTO_SPEED_LOCAL_TTL)
+        Device.objects.filter(device_id=device_id).filter(
+            Q(local_control_until__isnull=True) | Q(local_control_until__lt=now + ttl / 2)
+        ).update(local_control_until=now + ttl)
+
+    def report(self, device, speed):
+        """
+        브릿지가 로컬에서 내린 풍속 결정 반영
+        반환: 실제로 풍속을 바꿨으면 True
+        """
+        self.touch(device.device_id)
+        with self.lock:
+            self.reports += 1
+        return self.save(device, speed)
+
+    def save(self, device, speed):
+        if speed == device.fan_speed:
+            with self.lock:
+                self.suppressed += 1
+            return False
+
+        device.fan_speed = speed
+        device.last_sync = timezone.now()
+        device.save(update_fields=["fan_speed", "last_sync"])
+        with self.lock:
+            self.writes += 1
+        return True
+
+    def stats(self):
+        with self.lock:
+            return {
+                "thresholds": AUTO_SPEED_THRESHOLDS,
+                "hysteresis": AUTO_SPEED_HYSTERESIS,
+                "dust_thresholds": AUTO_SPEED_DUST_THRESHOLDS,
+                "dust_hysteresis": AUTO_SPEED_DUST_HYSTERESIS,
+                "writes": self.writes,
+                "suppressed": self.suppressed,
+                "deferred": self.deferred,
+                "reports": self.reports,
+            }
+
+
+controller = AutoSpeedController()
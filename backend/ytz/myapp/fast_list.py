@@ -0,0 +1,78 @@
+"""
+읽기 전용 목록 응답 빠른 경로
+
+- DRF ModelSerializer 대신 queryset.values() dict를 바로 JSON 인코딩
+- 키 이름 / 순서는 serializer_class의 필드 목록에서 가져오므로 기존 출력과 동일
+  (FK는 values()에서도 pk 값으로 나옴)
+- orjson이 설치되어 있으면 사용, 없으면 표준 json (DRF와 같은 compact 형식)
+- Accept-Encoding: gzip 이고 응답이 GZIP_MIN_SIZE 이상이면 gzip 압축
+
+FastListMixin을 ViewSet에 섞으면 list()가 JSON 요청일 때만 빠른 경로를 사용
+(브라우저블 API 등 다른 렌더러는 기존 경로)
+"""
+import datetime
+import gzip
+import json
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성
+    orjson = None
+
+FAST_LIST_GZIP_MIN_SIZE = getattr(settings, "FAST_LIST_GZIP_MIN_SIZE", 1024)
+
+
+def _default(value):
+    # DRF DateTimeField / DateField 기본 출력과 같은 형식
+    if isinstance(value, datetime.datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_UTC_Z)
+    return json.dumps(
+        data, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+def json_response(request, data):
+    content = dumps(data)
+    response = HttpResponse(content_type="application/json")
+
+    accepts_gzip = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+    if accepts_gzip and len(content) >= FAST_LIST_GZIP_MIN_SIZE:
+        content = gzip.compress(content, compresslevel=5)
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ("Accept-Encoding",))
+
+    response.content = content
+    return response
+
+
+class FastListMixin:
+    def list(self, request, *args, **kwargs):
+        if getattr(request.accepted_renderer, "format", None) != "json":
+            return super().list(request, *args, **kwargs)
+
+        fields = list(self.get_serializer_class()().fields)
+        queryset = self.filter_queryset(self.get_queryset()).values(*fields)
+
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return json_response(request, list(queryset))
+
+        # CursorPagination.get_paginated_response()와 같은 구조
+        return json_response(request, {
+            "next": self.paginator.get_next_link(),
+            "previous": self.paginator.get_previous_link(),
+            "results": page,
+        })
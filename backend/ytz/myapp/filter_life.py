@@ -0,0 +1,126 @@
+"""
+공기청정 필터 마모 추정 (FilterStatus.dust_accumulated / condition)
+
+- 센서 업로드마다 O(1) 누적: dust_density × 풍량 가중치(fan_speed, 전원 꺼짐 = 0)
+- 디바이스의 현재 필터 = 가장 최근 FilterStatus (없으면 새로 생성)
+- 동시 업로드(워커 여러 개 / write-behind 스레드): 트랜잭션 안에서 디바이스 행을 잠근 뒤
+  누적은 F("dust_accumulated") + 증가분으로 UPDATE → 증가분 유실 / 필터 중복 생성 없음
+- condition은 FILTER_CONDITION_THRESHOLDS 기준으로 누적값에서 계산
+- recompute(): 과거 SensorData로 다시 계산 (recompute_filters 명령어)
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Device, FilterStatus, SensorData
+
+# 풍속 단계별 풍량 가중치 (목록에 없는 값은 가장 큰 가중치)
+FILTER_SPEED_WEIGHTS = getattr(settings, "FILTER_SPEED_WEIGHTS", {1: 1.0, 2: 1.6, 3: 2.2})
+# (누적값 하한, 상태) - 누적값이 하한 이상인 것 중 마지막 상태
+FILTER_CONDITION_THRESHOLDS = getattr(settings, "FILTER_CONDITION_THRESHOLDS", [
+    (0, "good"),
+    (50000, "fair"),
+    (80000, "replace_soon"),
+    (100000, "replace"),
+])
+
+
+def airflow_weight(device):
+    if not device.power_state:
+        return 0.0
+    return FILTER_SPEED_WEIGHTS.get(device.fan_speed, max(FILTER_SPEED_WEIGHTS.values()))
+
+
+def condition_for(dust_accumulated):
+    condition = FILTER_CONDITION_THRESHOLDS[0][1]
+    for lower, name in FILTER_CONDITION_THRESHOLDS:
+        if dust_accumulated >= lower:
+            condition = name
+    return condition
+
+
+def current_filters(device_ids):
+    """디바이스별 현재 필터 (쿼리 1번)"""
+    latest_ids = FilterStatus.objects.filter(
+        device_id__in=device_ids
+    ).values("device_id").annotate(last=Max("filter_id")).values("last")
+    return {
+        f.device_id: f for f in FilterStatus.objects.filter(filter_id__in=latest_ids)
+    }
+
+
+def apply_readings(rows):
+    """새 센서 데이터의 먼지 농도를 디바이스별 현재 필터에 누적"""
+    increments = {}
+    for row in rows:
+        if row.dust_density:
+            weight = airflow_weight(row.device)
+            if weight:
+                increments[row.device_id] = increments.get(row.device_id, 0.0) + row.dust_density * weight
+    if not increments:
+        return
+
+    with transaction.atomic():
+        # 디바이스 단위 잠금: 같은 디바이스의 누적 / 새 필터 생성을 한 번에 하나씩
+        list(Device.objects.select_for_update().filter(
+            device_id__in=increments
+        ).order_by("device_id").values_list("device_id", flat=True))
+
+        filters = current_filters(increments)
+        changed, created = [], []
+        for device_id, amount in increments.items():
+            status = filters.get(device_id)
+            if status is None:
+                created.append(FilterStatus(
+                    device_id=device_id, dust_accumulated=amount, condition=condition_for(amount)
+                ))
+                continue
+            status.condition = condition_for((status.dust_accumulated or 0.0) + amount)
+            status.dust_accumulated = Coalesce(F("dust_accumulated"), 0.0) + amount
+            changed.append(status)
+
+        FilterStatus.objects.bulk_update(changed, ["dust_accumulated", "condition"])
+        FilterStatus.objects.bulk_create(created)
+
+
+def recompute(device_ids=None, since=None):
+    """
+    과거 데이터로 현재 필터 누적값을 다시 계산
+    - SensorData에는 측정 당시 풍속이 없으므로 디바이스의 현재 풍속/전원으로 가중
+      (전원이 꺼져 있어도 가중치는 현재 풍속 기준으로 계산)
+    - since: 필터 교체 시각 (이후 데이터만 누적)
+    반환: 갱신한 필터 수
+    """
+    devices = Device.objects.all()
+    if device_ids:
+        devices = devices.filter(device_id__in=device_ids)
+    devices = {device.device_id: device for device in devices}
+
+    readings = SensorData.objects.filter(device_id__in=devices, dust_density__isnull=False)
+    if since is not None:
+        readings = readings.filter(created_at__gte=since)
+    totals = dict(
+        readings.values("device_id").annotate(total=Sum("dust_density")).values_list("device_id", "total")
+    )
+
+    filters = current_filters(devices)
+    changed, created = [], []
+    for device_id, device in devices.items():
+        weight = FILTER_SPEED_WEIGHTS.get(device.fan_speed, max(FILTER_SPEED_WEIGHTS.values()))
+        amount = (totals.get(device_id) or 0.0) * weight
+        status = filters.get(device_id)
+        if status is None:
+            if not amount:
+                continue
+            created.append(FilterStatus(
+                device_id=device_id, dust_accumulated=amount, condition=condition_for(amount)
+            ))
+            continue
+        status.dust_accumulated = amount
+        status.condition = condition_for(amount)
+        changed.append(status)
+
+    FilterStatus.objects.bulk_update(changed, ["dust_accumulated", "condition"], batch_size=500)
+    FilterStatus.objects.bulk_create(created, batch_size=500)
+    return len(changed) + len(created)
@@ -0,0 +1,108 @@
+"""
+디바이스 heartbeat (POST /api/device/heartbeat/) + 접속 상태 (GET /api/device/presence/)
+
+- register_device / POST /devices/ 대신 브릿지가 주기적으로 호출
+  → last_heartbeat, last_sync, battery_level, ip_address만 UPDATE 1번 (power_state 등은 건드리지 않음)
+- 같은 디바이스의 heartbeat가 WINDOW 안에 다시 오고 battery / ip가 그대로면 메모리에만 기록 (DB 쓰기 생략)
+  UPDATE에도 같은 조건을 걸어 다른 워커가 이미 쓴 경우 0건 갱신
+- 접속 상태: max(DB의 last_heartbeat, 이 프로세스가 받은 마지막 heartbeat) 기준
+  → 워커가 여러 개여도 다른 워커가 받은 heartbeat 반영, OFFLINE_AFTER 초 안에 있으면 online
+  last_sync는 제어 / 자동 풍속 저장 때도 바뀌므로 접속 상태에 쓰지 않음
+
+※ 생략된 heartbeat만큼 DB의 last_heartbeat는 최대 WINDOW 초 늦을 수 있음 (OFFLINE_AFTER > WINDOW)
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Device
+
+DEVICE_HEARTBEAT_WINDOW = getattr(settings, "DEVICE_HEARTBEAT_WINDOW", 30)
+DEVICE_OFFLINE_AFTER = getattr(settings, "DEVICE_OFFLINE_AFTER", 90)
+
+
+class HeartbeatTracker:
+    def __init__(self, window, offline_after):
+        self.window = timedelta(seconds=window)
+        self.offline_after = timedelta(seconds=offline_after)
+        self.lock = threading.Lock()
+        self.written = {}    # device_id → (DB에 쓴 시각, battery_level, ip_address)
+        self.last_seen = {}  # device_id → 마지막 heartbeat 시각
+
+        self.received = 0
+        self.coalesced = 0
+        self.writes = 0
+
+    def beat(self, device_id, battery_level=None, ip_address=None):
+        """
+        heartbeat 1건 처리
+        반환: "written" / "coalesced" / "unknown" (없는 디바이스)
+        """
+        now = timezone.now()
+        with self.lock:
+            self.received += 1
+            previous = self.written.get(device_id)
+            if previous is not None:
+                written_at, battery, ip = previous
+                if now - written_at < self.window and (battery, ip) == (battery_level, ip_address):
+                    self.last_seen[device_id] = now
+                    self.coalesced += 1
+                    return "coalesced"
+
+        # 값이 바뀌었거나 WINDOW가 지난 경우에만 갱신
+        updated = Device.objects.filter(device_id=device_id).filter(
+            Q(last_heartbeat__isnull=True)
+            | Q(last_heartbeat__lt=now - self.window)
+            | ~Q(battery_level=battery_level)
+            | ~Q(ip_address=ip_address)
+        ).update(last_heartbeat=now, last_sync=now, battery_level=battery_level, ip_address=ip_address)
+
+        if not updated and not Device.objects.filter(device_id=device_id).exists():
+            return "unknown"
+
+        with self.lock:
+            self.written[device_id] = (now, battery_level, ip_address)
+            self.last_seen[device_id] = now
+            if updated:
+                self.writes += 1
+            else:
+                self.coalesced += 1
+        return "written" if updated else "coalesced"
+
+    def presence(self, device_ids):
+        """
+        device_ids 각각의 online 여부와 마지막 heartbeat 시각
+        (DB 조회 1번, 이 프로세스가 더 최근 heartbeat를 받았으면 그 시각)
+        """
+        now = timezone.now()
+        seen = dict.fromkeys(device_ids)
+        seen.update(Device.objects.filter(device_id__in=device_ids).values_list("device_id", "last_heartbeat"))
+        with self.lock:
+            for device_id, at in seen.items():
+                local = self.last_seen.get(device_id)
+                if local is not None and (at is None or local > at):
+                    seen[device_id] = local
+
+        return [
+            {
+                "device_id": device_id,
+                "online": at is not None and now - at <= self.offline_after,
+                "last_seen": at,
+            }
+            for device_id, at in seen.items()
+        ]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "tracked": len(self.last_seen),
+                "received": self.received,
+                "coalesced": self.coalesced,
+                "writes": self.writes,
+            }
+
+
+tracker = HeartbeatTracker(DEVICE_HEARTBEAT_WINDOW, DEVICE_OFFLINE_AFTER)
@@ -0,0 +1,35 @@
+"""
+Idempotency-Key 처리 (라즈베리파이 outbox 재전송 대비)
+
+- claim(key): 키를 처음 보면 저장하고 True, 이미 처리한 키면 False
+  → 호출한 쪽 트랜잭션 안에서 부르면 저장이 롤백될 때 키도 함께 롤백되어 재시도 가능
+- seen(key): 이미 처리한 키인지 조회만 (write-behind: 실제 기록은 저장할 때 claim)
+- prune(days): 오래된 키 삭제 (manage.py prune_idempotency_keys)
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+KEY_MAX_LENGTH = 64
+
+
+def claim(key):
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=key[:KEY_MAX_LENGTH])
+    except IntegrityError:
+        return False
+    return True
+
+
+def seen(key):
+    return IdempotencyKey.objects.filter(key=key[:KEY_MAX_LENGTH]).exists()
+
+
+def prune(days):
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
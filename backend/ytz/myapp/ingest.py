@@ -0,0 +1,94 @@
+"""
+센서 데이터 저장 공통 처리
+
+배치 업로드와 write-behind 플러셔가 같은 경로로 저장하도록 모아둠
+- bulk insert → apply_derived(집계 / 최신값 / 필터 마모) → 디바이스당 1회 자동 풍속 제어
+- 라즈베리파이가 늦게 재전송한 측정값(created_at이 과거)은
+  최신값을 덮어쓰지 않고, 자동 풍속 제어에도 쓰지 않음
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import filter_life, rollup
+from .fan_control import controller
+from .models import LatestSensorData, SensorData
+
+LATEST_FIELDS = ("temperature", "humidity", "dust_density", "co2_level", "ir_detected", "created_at")
+
+# 이보다 오래된 측정값은 자동 풍속 제어에 쓰지 않음 (초)
+AUTO_SPEED_MAX_AGE = getattr(settings, "AUTO_SPEED_MAX_AGE", 120)
+
+
+def update_latest(rows):
+    """디바이스별 마지막 측정값으로 LatestSensorData upsert (디바이스 수와 상관없이 쿼리 1~2번)"""
+    latest = {}
+    for row in rows:
+        current = latest.get(row.device_id)
+        if current is None or row.created_at >= current.created_at:
+            latest[row.device_id] = row
+
+    # 이미 더 최근 값이 있는 디바이스는 제외 (재전송된 과거 측정값)
+    stored = LatestSensorData.objects.filter(device_id__in=list(latest)).values_list("device_id", "created_at")
+    existing = set()
+    for device_id, created_at in stored:
+        existing.add(device_id)
+        if created_at and created_at > latest[device_id].created_at:
+            del latest[device_id]
+    if not latest:
+        return
+
+    objs = [
+        LatestSensorData(
+            device_id=device_id,
+            **{field: getattr(row, field) for field in LATEST_FIELDS}
+        )
+        for device_id, row in latest.items()
+    ]
+    if connection.features.supports_update_conflicts_with_target:
+        # PostgreSQL / SQLite: INSERT ... ON CONFLICT (device_id) DO UPDATE
+        LatestSensorData.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=["device"],
+            update_fields=LATEST_FIELDS,
+        )
+        return
+
+    # MySQL은 충돌 대상 지정 불가 → 있는 행은 bulk_update(CASE WHEN 1번), 없는 행은 bulk_create
+    # 동시에 같은 디바이스의 첫 행을 만들면 먼저 들어간 값이 남음 (다음 업로드 때 갱신)
+    LatestSensorData.objects.bulk_update(
+        [obj for obj in objs if obj.device_id in existing], LATEST_FIELDS
+    )
+    LatestSensorData.objects.bulk_create(
+        [obj for obj in objs if obj.device_id not in existing], ignore_conflicts=True
+    )
+
+
+def apply_derived(rows):
+    """저장된 센서 데이터로 파생 테이블 갱신 (단건 업로드도 같은 경로 사용)"""
+    rollup.apply_readings(rows)
+    update_latest(rows)
+    filter_life.apply_readings(rows)
+
+
+def save_readings(rows):
+    """
+    검증된 SensorData 인스턴스 목록을 한 트랜잭션으로 저장
+    - 자동 풍속은 디바이스별로 목록에서 가장 마지막 측정값(온도 / 미세먼지 있는 것) 기준
+    """
+    cutoff = timezone.now() - timedelta(seconds=AUTO_SPEED_MAX_AGE)
+    latest = {}
+    for row in rows:
+        if (row.temperature or row.dust_density is not None) and row.created_at >= cutoff:
+            latest[row.device_id] = row
+
+    with transaction.atomic():
+        SensorData.objects.bulk_create(rows)
+        apply_derived(rows)
+
+        # 온도 / 미세먼지 기반 자동 풍속 제어 (디바이스당 1회, 바뀔 때만 저장)
+        for row in latest.values():
+            controller.apply(row.device, row.temperature, row.dust_density)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from myapp import rollup
+
+
+class Command(BaseCommand):
+    help = "SensorData 원본으로 분/시간/일 집계(SensorRollup)를 다시 계산합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--device", action="append", dest="devices",
+            help="대상 디바이스 ID (여러 번 지정 가능, 생략 시 전체)",
+        )
+        parser.add_argument(
+            "--since",
+            help="이 시각 이후 데이터만 다시 계산 (ISO 8601, 하루 단위로 내림)",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None:
+                raise CommandError("--since 형식이 올바르지 않습니다. (ISO 8601)")
+
+        result = rollup.backfill(device_ids=options["devices"], since=since)
+        for resolution, count in result.items():
+            self.stdout.write(f"{resolution}: {count} buckets")
+        self.stdout.write(self.style.SUCCESS("집계 재계산 완료"))
@@ -0,0 +1,80 @@
+import json
+import time
+
+from django.db import transaction
+from django.test import RequestFactory
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from myapp import fast_list
+from myapp.models import Device, SensorData
+from myapp.serializer import SensorDataSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "센서 목록 직렬화 속도 비교 (DRF ModelSerializer vs values() 빠른 경로). "
+        "임시 데이터는 트랜잭션 롤백으로 삭제됩니다."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def best_of(self, repeat, func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+
+        try:
+            with transaction.atomic():
+                device = Device.objects.create(device_id="__bench__")
+                SensorData.objects.bulk_create(
+                    [
+                        SensorData(
+                            device=device, temperature=20 + i % 10, humidity=40.5,
+                            dust_density=12.3, co2_level=410, ir_detected=i % 2 == 0,
+                        )
+                        for i in range(rows)
+                    ],
+                    batch_size=1000,
+                )
+                queryset = SensorData.objects.filter(device=device).order_by("-created_at")
+                fields = list(SensorDataSerializer().fields)
+                request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+                drf_time, drf_body = self.best_of(repeat, lambda: JSONRenderer().render(
+                    SensorDataSerializer(queryset, many=True).data
+                ))
+                fast_time, fast_body = self.best_of(repeat, lambda: fast_list.dumps(
+                    list(queryset.values(*fields))
+                ))
+                gzip_time, gzip_response = self.best_of(repeat, lambda: fast_list.json_response(
+                    request, list(queryset.values(*fields))
+                ))
+                raise Rollback
+        except Rollback:
+            pass
+
+        encoder = "orjson" if fast_list.orjson is not None else "json"
+        self.stdout.write(f"rows: {rows} (best of {repeat})")
+        self.stdout.write(f"DRF serializer : {drf_time * 1000:8.1f} ms  {len(drf_body)} bytes")
+        self.stdout.write(f"values+{encoder:<7} : {fast_time * 1000:8.1f} ms  {len(fast_body)} bytes")
+        self.stdout.write(
+            f"values+gzip    : {gzip_time * 1000:8.1f} ms  {len(gzip_response.content)} bytes"
+        )
+        self.stdout.write(f"speedup        : {drf_time / fast_time:.1f}x")
+        self.stdout.write(
+            f"output identical: {json.loads(drf_body) == json.loads(fast_body)}"
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from myapp import idempotency
+
+
+class Command(BaseCommand):
+    help = "오래된 Idempotency-Key 기록을 삭제합니다. (재전송 가능 기간이 지난 키)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=7,
+            help="이 일수보다 오래된 키 삭제 (기본 7일)",
+        )
+
+    def handle(self, *args, **options):
+        count = idempotency.prune(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Idempotency-Key {count}개 삭제"))
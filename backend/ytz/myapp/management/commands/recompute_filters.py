@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from myapp import filter_life
+
+
+class Command(BaseCommand):
+    help = "SensorData 먼지 농도로 현재 필터 누적값(dust_accumulated)과 상태(condition)를 다시 계산합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--device", action="append", dest="devices",
+            help="대상 디바이스 ID (여러 번 지정 가능, 생략 시 전체)",
+        )
+        parser.add_argument(
+            "--since",
+            help="필터 교체 시각 (ISO 8601, 이후 데이터만 누적)",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            since = parse_datetime(options["since"])
+            if since is None:
+                raise CommandError("--since 형식이 올바르지 않습니다. (ISO 8601)")
+
+        count = filter_life.recompute(device_ids=options["devices"], since=since)
+        self.stdout.write(self.style.SUCCESS(f"필터 {count}개 재계산 완료"))
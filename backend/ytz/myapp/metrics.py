@@ -0,0 +1,205 @@
+"""
+엔드포인트별 쿼리 수 / 지연 시간 측정
+
+- QueryMetricsMiddleware: 요청마다 URL 이름(resolver_match.url_name) 기준으로
+  SQL 쿼리 수, SQL 시간, 렌더링 시간, 전체 시간 기록
+  렌더링 시간 = DRF Response.render() (JSON 인코딩)만, serializer.data 변환은 뷰 시간에 포함
+- metrics_view: Prometheus 텍스트 형식으로 내보내기 (/metrics)
+- settings.QUERY_BUDGETS = {"url_name": 최대 쿼리 수}
+  "url_name" 키는 GET/HEAD에만 적용, 다른 메서드는 "POST url_name" 처럼 지정
+  초과 시 경고 출력 + 카운트, QUERY_BUDGET_STRICT = True 이면 예외 (테스트 실패)
+
+※ DEBUG와 무관하게 connection.execute_wrapper로 직접 측정
+※ sync / async 겸용 미들웨어: async 뷰(long-poll, SSE 등)가 스레드로 밀려나지 않음
+  카운터는 contextvar로 넘기므로 sync_to_async 스레드에서 실행된 쿼리도 요청에 집계
+"""
+import contextvars
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class EndpointStats:
+    __slots__ = (
+        "requests", "wall_seconds", "queries", "query_seconds",
+        "render_seconds", "max_queries", "budget_exceeded",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.wall_seconds = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.render_seconds = 0.0
+        self.max_queries = 0
+        self.budget_exceeded = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, method, wall, queries, query_time, render_time, over_budget):
+        with self.lock:
+            stats = self.endpoints.get((endpoint, method))
+            if stats is None:
+                stats = self.endpoints[(endpoint, method)] = EndpointStats()
+            stats.requests += 1
+            stats.wall_seconds += wall
+            stats.queries += queries
+            stats.query_seconds += query_time
+            stats.render_seconds += render_time
+            stats.max_queries = max(stats.max_queries, queries)
+            stats.budget_exceeded += 1 if over_budget else 0
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+    def render(self):
+        metrics = (
+            ("requests", "counter", "ytz_http_requests_total", "요청 수"),
+            ("wall_seconds", "counter", "ytz_http_request_duration_seconds_total", "전체 처리 시간 합계"),
+            ("queries", "counter", "ytz_db_queries_total", "SQL 쿼리 수 합계"),
+            ("query_seconds", "counter", "ytz_db_query_duration_seconds_total", "SQL 실행 시간 합계"),
+            ("render_seconds", "counter", "ytz_render_duration_seconds_total", "응답 렌더링(JSON 인코딩) 시간 합계"),
+            ("max_queries", "gauge", "ytz_db_queries_max", "요청 1건 최대 SQL 쿼리 수"),
+            ("budget_exceeded", "counter", "ytz_query_budget_exceeded_total", "쿼리 예산 초과 횟수"),
+        )
+        with self.lock:
+            items = sorted(self.endpoints.items())
+            lines = []
+            for attr, kind, name, help_text in metrics:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (endpoint, method), stats in items:
+                    lines.append(
+                        f'{name}{{endpoint="{endpoint}",method="{method}"}} {getattr(stats, attr)}'
+                    )
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# 현재 요청의 QueryCounter (sync_to_async로 넘어간 스레드에도 그대로 전달됨)
+current_counter = contextvars.ContextVar("query_counter", default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    counter = current_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.seconds += time.perf_counter() - start
+        counter.count += 1
+
+
+def install_counter(connection, **kwargs):
+    """연결마다 한 번만 등록 (재연결해도 중복 등록 안 함)"""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+connection_created.connect(install_counter)
+
+
+def query_budget(endpoint, method):
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    budget = budgets.get(f"{method} {endpoint}")
+    if budget is None and method in ("GET", "HEAD"):
+        budget = budgets.get(endpoint)
+    return budget
+
+
+class QueryMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # 미들웨어 로드 전에 이미 열린 연결
+        for connection in connections.all(initialized_only=True):
+            install_counter(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        counter, token, start = self.begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_counter.reset(token)
+        self.finish(request, counter, start)
+        return response
+
+    async def __acall__(self, request):
+        counter, token, start = self.begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_counter.reset(token)
+        self.finish(request, counter, start)
+        return response
+
+    def begin(self, request):
+        counter = QueryCounter()
+        request._render_seconds = 0.0
+        return counter, current_counter.set(counter), time.perf_counter()
+
+    def finish(self, request, counter, start):
+        wall = time.perf_counter() - start
+        match = getattr(request, "resolver_match", None)
+        endpoint = match.url_name if match and match.url_name else "unresolved"
+
+        budget = query_budget(endpoint, request.method)
+        over_budget = budget is not None and counter.count > budget
+
+        registry.record(
+            endpoint, request.method, wall,
+            counter.count, counter.seconds, request._render_seconds, over_budget
+        )
+
+        if over_budget:
+            message = f"{endpoint}: 쿼리 {counter.count}개 (예산 {budget}개)"
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            print(f"[QUERY BUDGET] {message}")
+
+    def process_template_response(self, request, response):
+        # DRF Response는 이 다음에 render() 되므로 렌더링 종료 시점을 콜백으로 측정
+        start = time.perf_counter()
+
+        def finished(rendered):
+            request._render_seconds += time.perf_counter() - start
+
+        response.add_post_render_callback(finished)
+        return response
+
+
+def metrics_view(request):
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
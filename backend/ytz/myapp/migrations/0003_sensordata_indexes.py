@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("myapp", "0002_remove_sensordata_heatmap_temp_device_mode"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sensordata",
+            index=models.Index(
+                fields=["device", "created_at"], name="sensor_device_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sensordata",
+            index=models.Index(fields=["created_at"], name="sensor_created_idx"),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("myapp", "0003_sensordata_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SensorRollup",
+            fields=[
+                ("rollup_id", models.AutoField(primary_key=True, serialize=False)),
+                (
+                    "resolution",
+                    models.CharField(
+                        choices=[
+                            ("minute", "Minute"),
+                            ("hour", "Hour"),
+                            ("day", "Day"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("bucket_start", models.DateTimeField()),
+                ("sample_count", models.IntegerField(default=0)),
+                ("temperature_sum", models.FloatField(default=0.0)),
+                ("temperature_count", models.IntegerField(default=0)),
+                ("temperature_min", models.FloatField(blank=True, null=True)),
+                ("temperature_max", models.FloatField(blank=True, null=True)),
+                ("humidity_sum", models.FloatField(default=0.0)),
+                ("humidity_count", models.IntegerField(default=0)),
+                ("humidity_min", models.FloatField(blank=True, null=True)),
+                ("humidity_max", models.FloatField(blank=True, null=True)),
+                ("dust_density_sum", models.FloatField(default=0.0)),
+                ("dust_density_count", models.IntegerField(default=0)),
+                ("dust_density_min", models.FloatField(blank=True, null=True)),
+                ("dust_density_max", models.FloatField(blank=True, null=True)),
+                ("co2_level_sum", models.FloatField(default=0.0)),
+                ("co2_level_count", models.IntegerField(default=0)),
+                ("co2_level_min", models.FloatField(blank=True, null=True)),
+                ("co2_level_max", models.FloatField(blank=True, null=True)),
+                ("ir_detected_count", models.IntegerField(default=0)),
+                (
+                    "device",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="myapp.device"
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("device", "resolution", "bucket_start"),
+                        name="rollup_device_resolution_bucket_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
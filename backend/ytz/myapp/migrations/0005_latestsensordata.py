@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_latest_readings(apps, schema_editor):
+    # 디바이스별 최신 측정값 1건씩 ((device, created_at) 인덱스 사용)
+    Device = apps.get_model("myapp", "Device")
+    SensorData = apps.get_model("myapp", "SensorData")
+    LatestSensorData = apps.get_model("myapp", "LatestSensorData")
+
+    fields = (
+        "temperature",
+        "humidity",
+        "dust_density",
+        "co2_level",
+        "ir_detected",
+        "created_at",
+    )
+    rows = []
+    for device_id in Device.objects.values_list("device_id", flat=True).iterator():
+        latest = (
+            SensorData.objects.filter(device_id=device_id)
+            .order_by("-created_at", "-sensor_id")
+            .values(*fields)
+            .first()
+        )
+        if latest:
+            rows.append(LatestSensorData(device_id=device_id, **latest))
+    LatestSensorData.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("myapp", "0004_sensorrollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LatestSensorData",
+            fields=[
+                (
+                    "device",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="latest_reading",
+                        serialize=False,
+                        to="myapp.device",
+                    ),
+                ),
+                ("temperature", models.FloatField(blank=True, null=True)),
+                ("humidity", models.FloatField(blank=True, null=True)),
+                ("dust_density", models.FloatField(blank=True, null=True)),
+                ("co2_level", models.FloatField(blank=True, null=True)),
+                ("ir_detected", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(fill_latest_readings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("myapp", "0005_latestsensordata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Alert",
+            fields=[
+                ("alert_id", models.AutoField(primary_key=True, serialize=False)),
+                ("event", models.CharField(max_length=100)),
+                ("count", models.IntegerField(default=1)),
+                ("first_seen", models.DateTimeField(auto_now_add=True)),
+                ("last_seen", models.DateTimeField()),
+                ("delivered_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "device",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="myapp.device"
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["device", "event", "last_seen"], name="alert_dedupe_idx"
+                    ),
+                    models.Index(fields=["last_seen"], name="alert_last_seen_idx"),
+                ],
+            },
+        ),
+    ]
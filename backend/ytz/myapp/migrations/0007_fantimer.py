@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("myapp", "0006_alert"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FanTimer",
+            fields=[
+                (
+                    "device",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="timer",
+                        serialize=False,
+                        to="myapp.device",
+                    ),
+                ),
+                ("fire_at", models.DateTimeField(db_index=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("myapp", "0007_fantimer"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CommandCursor",
+            fields=[
+                (
+                    "device",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="command_cursor",
+                        serialize=False,
+                        to="myapp.device",
+                    ),
+                ),
+                ("last_seq", models.BigIntegerField(default=0)),
+                ("acked_seq", models.BigIntegerField(default=0)),
+                ("acked_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="QueuedCommand",
+            fields=[
+                ("command_id", models.AutoField(primary_key=True, serialize=False)),
+                ("seq", models.BigIntegerField()),
+                ("kind", models.CharField(max_length=20)),
+                ("value", models.JSONField(null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "device",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="myapp.device"
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("device", "seq"), name="queued_command_device_seq_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("myapp", "0009_sensor_created_at_idempotency"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="device",
+            name="last_heartbeat",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
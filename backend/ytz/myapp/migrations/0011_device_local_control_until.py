@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 22:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("myapp", "0010_device_last_heartbeat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="device",
+            name="local_control_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 # ---------------------------
@@ -61,6 +62,10 @@ class Device(models.Model):
     )
 
     last_sync = models.DateTimeField(auto_now=True)
+    # 마지막 heartbeat (last_sync는 제어 / 자동 풍속 저장 때도 바뀌므로 접속 상태는 이 값 기준)
+    last_heartbeat = models.DateTimeField(null=True, blank=True)
+    # 브릿지가 로컬 자동 풍속 제어 중인 기한 (이때까지 서버 자동 풍속 생략, fan_control.py)
+    local_control_until = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.device_id} ({self.mode})"
@@ -76,12 +81,43 @@ class SensorData(models.Model):
     dust_density = models.FloatField(null=True, blank=True)  # Field3
     co2_level = models.FloatField(null=True, blank=True)  # Field4
     ir_detected = models.BooleanField(default=False)  # Field5
-    created_at = models.DateTimeField(auto_now_add=True)  # Field7
+    created_at = models.DateTimeField(default=timezone.now)  # Field7 (배치 업로드는 측정 시각 지정 가능)
+
+    class Meta:
+        indexes = [
+            # 디바이스별 기간 조회 / 커서 페이지네이션용
+            models.Index(fields=["device", "created_at"], name="sensor_device_created_idx"),
+            # 전체 조회 (admin) 정렬용
+            models.Index(fields=["created_at"], name="sensor_created_idx"),
+        ]
 
     def __str__(self):
         return f"SensorData {self.sensor_id} ({self.device.device_id})"
 
 
+# ---------------------------
+# 디바이스별 최신 센서 데이터 (LatestSensorData)
+# ---------------------------
+class LatestSensorData(models.Model):
+    """
+    디바이스마다 가장 최근 센서 측정값 1행 (SensorData 비정규화 사본)
+    - 업로드 시 ingest.update_latest()가 갱신
+    - 대시보드에서 SensorData를 정렬/검색하지 않고 조인 한 번으로 조회
+    """
+    device = models.OneToOneField(
+        Device, on_delete=models.CASCADE, primary_key=True, related_name="latest_reading"
+    )
+    temperature = models.FloatField(null=True, blank=True)
+    humidity = models.FloatField(null=True, blank=True)
+    dust_density = models.FloatField(null=True, blank=True)
+    co2_level = models.FloatField(null=True, blank=True)
+    ir_detected = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"LatestSensorData({self.device_id} @ {self.created_at})"
+
+
 # ---------------------------
 # 공기청정 필터 상태 (FilterStatus)
 # ---------------------------
@@ -124,3 +160,161 @@ class TeamDevice(models.Model):
 
     def __str__(self):
         return f"{self.team.team_name} ↔ {self.device.device_id}"
+
+
+# ---------------------------
+# 센서 데이터 집계 (SensorRollup)
+# ---------------------------
+class SensorRollup(models.Model):
+    """
+    디바이스별 분/시간/일 단위 센서 집계
+    - 평균은 sum / count 로 계산 (값이 없는 측정은 count에서 제외)
+    - 점유율(occupancy) = ir_detected_count / sample_count
+    """
+    RESOLUTION_CHOICES = [
+        ("minute", "Minute"),
+        ("hour", "Hour"),
+        ("day", "Day"),
+    ]
+
+    rollup_id = models.AutoField(primary_key=True)
+    device = models.ForeignKey(Device, on_delete=models.CASCADE)
+    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField()
+    sample_count = models.IntegerField(default=0)
+
+    temperature_sum = models.FloatField(default=0.0)
+    temperature_count = models.IntegerField(default=0)
+    temperature_min = models.FloatField(null=True, blank=True)
+    temperature_max = models.FloatField(null=True, blank=True)
+
+    humidity_sum = models.FloatField(default=0.0)
+    humidity_count = models.IntegerField(default=0)
+    humidity_min = models.FloatField(null=True, blank=True)
+    humidity_max = models.FloatField(null=True, blank=True)
+
+    dust_density_sum = models.FloatField(default=0.0)
+    dust_density_count = models.IntegerField(default=0)
+    dust_density_min = models.FloatField(null=True, blank=True)
+    dust_density_max = models.FloatField(null=True, blank=True)
+
+    co2_level_sum = models.FloatField(default=0.0)
+    co2_level_count = models.IntegerField(default=0)
+    co2_level_min = models.FloatField(null=True, blank=True)
+    co2_level_max = models.FloatField(null=True, blank=True)
+
+    ir_detected_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["device", "resolution", "bucket_start"],
+                name="rollup_device_resolution_bucket_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"SensorRollup {self.device_id} {self.resolution} {self.bucket_start}"
+
+
+# ---------------------------
+# 알림 (Alert)
+# ---------------------------
+class Alert(models.Model):
+    """
+    디바이스 알림 (고온, 습도 높음, 배터리 부족 등)
+    - 같은 (device, event)가 중복 허용 시간 안에 다시 오면 새 행 대신 count / last_seen 갱신
+    """
+    alert_id = models.AutoField(primary_key=True)
+    device = models.ForeignKey(Device, on_delete=models.CASCADE)
+    event = models.CharField(max_length=100)
+    count = models.IntegerField(default=1)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField()
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["device", "event", "last_seen"], name="alert_dedupe_idx"),
+            models.Index(fields=["last_seen"], name="alert_last_seen_idx"),
+        ]
+
+    def __str__(self):
+        return f"Alert({self.device_id} - {self.event} x{self.count})"
+
+
+# ---------------------------
+# 전원 끄기 타이머 (FanTimer)
+# ---------------------------
+class FanTimer(models.Model):
+    """
+    디바이스별 예약된 전원 끄기 타이머 (디바이스당 1개, 새로 설정하면 교체)
+    - 실행되거나 취소되면 행 삭제 → 테이블에는 대기 중인 타이머만 남음
+    - 서버 재시작 시 이 테이블로 스케줄러 복구 (myapp/timers.py)
+    """
+    device = models.OneToOneField(
+        Device, on_delete=models.CASCADE, primary_key=True, related_name="timer"
+    )
+    fire_at = models.DateTimeField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"FanTimer({self.device_id} @ {self.fire_at})"
+
+
+# ---------------------------
+# 디바이스 명령 큐 (QueuedCommand / CommandCursor)
+# ---------------------------
+class CommandCursor(models.Model):
+    """
+    디바이스별 명령 순번
+    - last_seq: 마지막으로 발급한 순번 (디바이스 안에서 단조 증가)
+    - acked_seq: 브릿지(라즈베리파이)가 확인한 마지막 순번
+    """
+    device = models.OneToOneField(
+        Device, on_delete=models.CASCADE, primary_key=True, related_name="command_cursor"
+    )
+    last_seq = models.BigIntegerField(default=0)
+    acked_seq = models.BigIntegerField(default=0)
+    acked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"CommandCursor({self.device_id} {self.acked_seq}/{self.last_seq})"
+
+
+class QueuedCommand(models.Model):
+    """
+    브릿지로 보낼 명령 (kind = 바뀐 Device 필드, value = 새 값)
+    - 같은 kind의 미확인 명령은 새 명령이 들어오면 삭제 (최종 상태만 전달)
+    - 확인(ack)된 명령은 삭제
+    """
+    command_id = models.AutoField(primary_key=True)
+    device = models.ForeignKey(Device, on_delete=models.CASCADE)
+    seq = models.BigIntegerField()
+    kind = models.CharField(max_length=20)
+    value = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["device", "seq"], name="queued_command_device_seq_uniq"),
+        ]
+
+    def __str__(self):
+        return f"QueuedCommand({self.device_id} #{self.seq} {self.kind}={self.value})"
+
+
+# ---------------------------
+# 처리한 업로드 키 (IdempotencyKey)
+# ---------------------------
+class IdempotencyKey(models.Model):
+    """
+    처리 완료한 요청의 Idempotency-Key 헤더 값
+    - 라즈베리파이 outbox가 응답을 못 받고 같은 배치를 다시 보내도 한 번만 저장
+    - 오래된 키는 manage.py prune_idempotency_keys 로 정리
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"IdempotencyKey({self.key})"
@@ -0,0 +1,14 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class SensorDataCursorPagination(CursorPagination):
+    """
+    센서 데이터 커서(keyset) 페이지네이션
+    - OFFSET 없이 (device, created_at) 인덱스를 따라가므로
+      데이터가 아무리 많아도 페이지 조회 속도가 일정함
+    """
+    page_size = getattr(settings, "SENSOR_PAGE_SIZE", 100)
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = ("-created_at", "-sensor_id")
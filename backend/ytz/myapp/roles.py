@@ -0,0 +1,59 @@
+"""
+팀 역할(TeamUser.role) 조회 + 캐시
+
+- get_role(user_id, team_id) → "admin" / "sub_admin" / "user" / None
+- Django 캐시 백엔드(settings.TEAM_ROLE_CACHE)에 저장, None이면 캐시 없이 매번 조회 (쿼리 1번)
+  워커 전체가 공유하는 캐시(Redis 등)여야 함 (프로세스별 LocMemCache면 무효화가 변경한 워커에만 적용되어
+  다른 워커에서는 TTL 동안 탈퇴한 팀원이 권한을 유지하고, 새 팀원은 "팀원 아님"으로 403)
+- 팀원이 아닌 경우도 캐시 (반복 조회 시 DB를 치지 않도록)
+- TeamUser가 생성/변경/삭제되면 signals.py에서 invalidate() 호출
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import TeamUser
+
+TEAM_ROLE_CACHE = getattr(settings, "TEAM_ROLE_CACHE", None)
+TEAM_ROLE_CACHE_TTL = getattr(settings, "TEAM_ROLE_CACHE_TTL", 300)
+
+# 팀원이 아님을 나타내는 캐시 값 (None은 캐시 miss와 구분이 안 되므로)
+NOT_A_MEMBER = ""
+
+
+def cache_key(user_id, team_id):
+    return f"team_role:{user_id}:{team_id}"
+
+
+def get_role(user_id, team_id):
+    if not user_id or not team_id:
+        return None
+
+    try:
+        team_id = int(team_id)
+    except (TypeError, ValueError):
+        return None
+
+    if TEAM_ROLE_CACHE is None:
+        return lookup(user_id, team_id) or None
+
+    cache = caches[TEAM_ROLE_CACHE]
+    key = cache_key(user_id, team_id)
+    role = cache.get(key)
+
+    if role is None:
+        role = lookup(user_id, team_id)
+        cache.set(key, role, TEAM_ROLE_CACHE_TTL)
+
+    return role or None
+
+
+def lookup(user_id, team_id):
+    return TeamUser.objects.filter(
+        user_id=user_id,
+        team_id=team_id
+    ).values_list("role", flat=True).first() or NOT_A_MEMBER
+
+
+def invalidate(user_id, team_id):
+    if TEAM_ROLE_CACHE is not None:
+        caches[TEAM_ROLE_CACHE].delete(cache_key(user_id, team_id))
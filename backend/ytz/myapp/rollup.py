@@ -0,0 +1,207 @@
+"""
+센서 데이터 분/시간/일 집계 (SensorRollup)
+
+- apply_readings(): 저장된 SensorData 묶음을 받아 집계 행을 증분 갱신
+- backfill(): 기존 원본 데이터로 집계를 다시 계산 (backfill_rollups 명령어)
+- choose_resolution(): 조회 기간에 맞는 해상도 자동 선택
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMinute
+
+from .models import SensorData, SensorRollup
+
+METRICS = ("temperature", "humidity", "dust_density", "co2_level")
+
+# 해상도: (버킷 길이, 버킷 시작 시각 계산, DB 절삭 함수) - 세밀한 순서
+RESOLUTIONS = {
+    "minute": (timedelta(minutes=1), lambda dt: dt.replace(second=0, microsecond=0), TruncMinute),
+    "hour": (timedelta(hours=1), lambda dt: dt.replace(minute=0, second=0, microsecond=0), TruncHour),
+    "day": (timedelta(days=1), lambda dt: dt.replace(hour=0, minute=0, second=0, microsecond=0), TruncDay),
+}
+
+# 한 번의 조회에서 돌려줄 최대 버킷 수
+ROLLUP_MAX_POINTS = getattr(settings, "ROLLUP_MAX_POINTS", 500)
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def choose_resolution(since, until, requested=None):
+    """
+    요청 기간의 버킷 수가 ROLLUP_MAX_POINTS 이하가 되는 해상도 선택
+    - requested가 있으면 그보다 세밀한 해상도는 쓰지 않음
+    - 어떤 해상도도 맞지 않으면 가장 굵은 day 사용
+    """
+    names = list(RESOLUTIONS)
+    if requested in RESOLUTIONS:
+        names = names[names.index(requested):]
+
+    span = until - since
+    for name in names:
+        if span / RESOLUTIONS[name][0] <= ROLLUP_MAX_POINTS:
+            return name
+    return names[-1]
+
+
+def _empty_bucket():
+    bucket = {"sample_count": 0, "ir_detected_count": 0}
+    for metric in METRICS:
+        bucket[f"{metric}_sum"] = 0.0
+        bucket[f"{metric}_count"] = 0
+        bucket[f"{metric}_min"] = None
+        bucket[f"{metric}_max"] = None
+    return bucket
+
+
+def _merge(target, source):
+    """집계값 source를 target(dict 또는 SensorRollup)에 합침"""
+    def get(name):
+        return target[name] if isinstance(target, dict) else getattr(target, name)
+
+    def put(name, value):
+        if isinstance(target, dict):
+            target[name] = value
+        else:
+            setattr(target, name, value)
+
+    put("sample_count", get("sample_count") + source["sample_count"])
+    put("ir_detected_count", get("ir_detected_count") + source["ir_detected_count"])
+    for metric in METRICS:
+        put(f"{metric}_sum", get(f"{metric}_sum") + source[f"{metric}_sum"])
+        put(f"{metric}_count", get(f"{metric}_count") + source[f"{metric}_count"])
+
+        low, high = get(f"{metric}_min"), source[f"{metric}_min"]
+        if high is not None and (low is None or high < low):
+            put(f"{metric}_min", high)
+
+        low, high = get(f"{metric}_max"), source[f"{metric}_max"]
+        if high is not None and (low is None or high > low):
+            put(f"{metric}_max", high)
+
+
+def _collect(readings):
+    """SensorData 목록 → {(device_id, resolution, bucket_start): 집계값}"""
+    buckets = {}
+    for reading in readings:
+        sample = _empty_bucket()
+        sample["sample_count"] = 1
+        sample["ir_detected_count"] = 1 if reading.ir_detected else 0
+        for metric in METRICS:
+            value = getattr(reading, metric)
+            if value is None:
+                continue
+            sample[f"{metric}_sum"] = value
+            sample[f"{metric}_count"] = 1
+            sample[f"{metric}_min"] = value
+            sample[f"{metric}_max"] = value
+
+        for name, (_, truncate, _) in RESOLUTIONS.items():
+            key = (reading.device_id, name, truncate(reading.created_at))
+            _merge(buckets.setdefault(key, _empty_bucket()), sample)
+    return buckets
+
+
+def _write(buckets):
+    keys = Q()
+    for device_id, resolution, bucket_start in buckets:
+        keys |= Q(device_id=device_id, resolution=resolution, bucket_start=bucket_start)
+
+    with transaction.atomic():
+        existing = {
+            (row.device_id, row.resolution, row.bucket_start): row
+            for row in SensorRollup.objects.select_for_update().filter(keys)
+        }
+
+        created = []
+        for key, values in buckets.items():
+            row = existing.get(key)
+            if row is None:
+                device_id, resolution, bucket_start = key
+                created.append(SensorRollup(
+                    device_id=device_id,
+                    resolution=resolution,
+                    bucket_start=bucket_start,
+                    **values
+                ))
+            else:
+                _merge(row, values)
+
+        if existing:
+            SensorRollup.objects.bulk_update(
+                existing.values(),
+                [name for name in _empty_bucket()]
+            )
+        SensorRollup.objects.bulk_create(created)
+
+
+def apply_readings(readings):
+    """새로 저장된 SensorData들을 분/시간/일 집계에 반영"""
+    buckets = _collect(readings)
+    if not buckets:
+        return
+
+    try:
+        _write(buckets)
+    except IntegrityError:
+        # 같은 버킷을 다른 요청이 먼저 만든 경우 → 한 번 더 시도하면 갱신 경로로 감
+        _write(buckets)
+
+
+def backfill(device_ids=None, since=None):
+    """
+    원본 SensorData로 집계를 다시 계산
+    - since는 하루 단위로 내림 (부분 버킷이 생기지 않도록)
+    - 반환값: {resolution: 생성한 버킷 수}
+    """
+    source = SensorData.objects.all()
+    target = SensorRollup.objects.all()
+    if device_ids:
+        source = source.filter(device_id__in=device_ids)
+        target = target.filter(device_id__in=device_ids)
+    if since is not None:
+        since = RESOLUTIONS["day"][1](since)
+        source = source.filter(created_at__gte=since)
+        target = target.filter(bucket_start__gte=since)
+
+    aggregates = {
+        "sample_count": Count("sensor_id"),
+        "ir_detected_count": Count("sensor_id", filter=Q(ir_detected=True)),
+    }
+    for metric in METRICS:
+        aggregates[f"{metric}_sum"] = Sum(metric)
+        aggregates[f"{metric}_count"] = Count(metric)
+        aggregates[f"{metric}_min"] = Min(metric)
+        aggregates[f"{metric}_max"] = Max(metric)
+
+    result = {}
+    with transaction.atomic():
+        target.delete()
+        for name, (_, _, trunc) in RESOLUTIONS.items():
+            rows = (
+                source.annotate(bucket=trunc("created_at"))
+                .values("device_id", "bucket")
+                .annotate(**aggregates)
+                .order_by()
+            )
+            created = []
+            result[name] = 0
+            for row in rows.iterator(chunk_size=BACKFILL_CHUNK_SIZE):
+                for metric in METRICS:
+                    # 값이 하나도 없는 버킷은 Sum이 None
+                    row[f"{metric}_sum"] = row[f"{metric}_sum"] or 0.0
+                created.append(SensorRollup(
+                    device_id=row.pop("device_id"),
+                    resolution=name,
+                    bucket_start=row.pop("bucket"),
+                    **row
+                ))
+                if len(created) >= BACKFILL_CHUNK_SIZE:
+                    SensorRollup.objects.bulk_create(created)
+                    result[name] += len(created)
+                    created = []
+            SensorRollup.objects.bulk_create(created)
+            result[name] += len(created)
+    return result
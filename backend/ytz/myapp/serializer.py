@@ -1,5 +1,12 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Team, User, Device, TeamUser, TeamDevice, SensorData, FilterStatus
+from .models import (
+    Team, User, Device, TeamUser, TeamDevice, SensorData, FilterStatus,
+    SensorRollup, LatestSensorData, Alert
+)
 
 
 class TeamSerializer(serializers.ModelSerializer):
@@ -17,7 +24,9 @@ class UserSerializer(serializers.ModelSerializer):
 class DeviceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Device
-        fields = '__all__'
+        # 내부 상태는 제외 (ETag는 last_sync 기준)
+        # local_control_until은 last_sync를 바꾸지 않고 갱신됨, 접속 상태는 device/presence/
+        exclude = ('last_heartbeat', 'local_control_until')
 
 
 class TeamUserSerializer(serializers.ModelSerializer):
@@ -32,13 +41,113 @@ class TeamDeviceSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+# 배치 업로드 측정 시각(created_at)이 서버 시각보다 이만큼까지 앞서는 것은 허용 (초)
+SENSOR_CLOCK_SKEW = getattr(settings, "SENSOR_CLOCK_SKEW", 300)
+
+
 class SensorDataSerializer(serializers.ModelSerializer):
     class Meta:
         model = SensorData
         fields = '__all__'
+        read_only_fields = ('created_at',)
 
 
 class FilterStatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = FilterStatus
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class SensorDataBatchItemSerializer(serializers.ModelSerializer):
+    """
+    배치 업로드용 센서 데이터 검증
+    - device는 context["devices"] (미리 조회한 dict)에서 찾아서 항목마다 쿼리하지 않음
+    - created_at(측정 시각)은 생략 시 저장 시각
+    """
+    device = serializers.CharField()
+    # UTC 오프셋이 붙은 시각은 서버 시간대(TIME_ZONE)로 변환 (USE_TZ=False 기본 동작은 UTC 기준)
+    created_at = serializers.DateTimeField(
+        required=False, default_timezone=timezone.get_default_timezone()
+    )
+
+    class Meta:
+        model = SensorData
+        fields = '__all__'
+
+    def validate_device(self, value):
+        device = self.context["devices"].get(value)
+        if device is None:
+            raise serializers.ValidationError("등록되지 않은 디바이스입니다.")
+        return device
+
+    def validate_created_at(self, value):
+        # 재전송(store-and-forward)된 측정값은 측정 시각 유지, 미래 시각은 거부
+        if not settings.USE_TZ:
+            value = timezone.make_naive(value, timezone.get_default_timezone())
+        if value > timezone.now() + timedelta(seconds=SENSOR_CLOCK_SKEW):
+            raise serializers.ValidationError("측정 시각이 서버 시각보다 미래입니다.")
+        return value
+
+
+class SensorRollupSerializer(serializers.ModelSerializer):
+    """집계 행 → 항목별 avg / min / max + 점유율"""
+    class Meta:
+        model = SensorRollup
+        fields = '__all__'
+
+    def to_representation(self, instance):
+        data = {
+            "bucket_start": instance.bucket_start,
+            "sample_count": instance.sample_count,
+            "occupancy": (
+                instance.ir_detected_count / instance.sample_count
+                if instance.sample_count else None
+            ),
+        }
+        for metric in ("temperature", "humidity", "dust_density", "co2_level"):
+            count = getattr(instance, f"{metric}_count")
+            data[metric] = {
+                "avg": getattr(instance, f"{metric}_sum") / count if count else None,
+                "min": getattr(instance, f"{metric}_min"),
+                "max": getattr(instance, f"{metric}_max"),
+            }
+        return data
+
+
+class DeviceCommandSerializer(serializers.Serializer):
+    """팀 디바이스 일괄 제어 요청 (device_ids 생략 시 팀 전체)"""
+    user_id = serializers.CharField()
+    team_id = serializers.IntegerField()
+    device_ids = serializers.ListField(child=serializers.CharField(), required=False)
+
+    power_state = serializers.BooleanField(required=False)
+    fan_speed = serializers.IntegerField(required=False, min_value=0)
+    angle = serializers.FloatField(required=False)
+    mode = serializers.ChoiceField(choices=Device.MODE_CHOICES, required=False)
+
+    COMMAND_FIELDS = ("power_state", "fan_speed", "angle", "mode")
+
+    def validate(self, attrs):
+        if not any(field in attrs for field in self.COMMAND_FIELDS):
+            raise serializers.ValidationError(
+                "power_state, fan_speed, angle, mode 중 하나 이상 필요합니다."
+            )
+        return attrs
+
+
+class DeviceHeartbeatSerializer(serializers.Serializer):
+    """브릿지 heartbeat (battery_level / ip_address는 생략 가능)"""
+    device_id = serializers.CharField()
+    battery_level = serializers.IntegerField(required=False, allow_null=True, min_value=0, max_value=100)
+    ip_address = serializers.IPAddressField(required=False, allow_null=True)
+
+
+class LatestSensorDataSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LatestSensorData
+        fields = '__all__'
+
+
+class AlertSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Alert
+        fields = '__all__'
@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import commands, events, roles
+from .models import Device, TeamDevice, TeamUser
+
+# 푸시 채널로 변경분을 보내는 Device 필드
+DEVICE_STATE_FIELDS = ("power_state", "fan_speed", "angle", "mode")
+
+
+# ------------------------
+# 팀 역할 캐시 무효화
+# ------------------------
+@receiver(post_init, sender=TeamUser)
+def remember_team_user_key(sender, instance, **kwargs):
+    # user / team 자체가 바뀌는 경우 이전 키도 지워야 하므로 로드 시점 값 보관
+    instance._role_cache_key = (instance.user_id, instance.team_id)
+
+
+@receiver(post_save, sender=TeamUser)
+def invalidate_role_on_save(sender, instance, **kwargs):
+    roles.invalidate(*instance._role_cache_key)
+    roles.invalidate(instance.user_id, instance.team_id)
+    instance._role_cache_key = (instance.user_id, instance.team_id)
+
+
+@receiver(post_delete, sender=TeamUser)
+def invalidate_role_on_delete(sender, instance, **kwargs):
+    roles.invalidate(*instance._role_cache_key)
+    roles.invalidate(instance.user_id, instance.team_id)
+
+
+# ------------------------
+# 디바이스 상태 변경 → 푸시 이벤트
+# ------------------------
+@receiver(post_init, sender=Device)
+def remember_device_state(sender, instance, **kwargs):
+    instance._pushed_state = {
+        field: getattr(instance, field) for field in DEVICE_STATE_FIELDS
+    }
+
+
+@receiver(post_save, sender=Device)
+def publish_device_change(sender, instance, created, **kwargs):
+    push_device_changes(instance, created)
+
+
+def push_device_changes(instance, created=False):
+    """
+    로드 시점 대비 바뀐 상태 필드만 푸시
+    (bulk_update처럼 post_save가 안 오는 경로에서는 직접 호출)
+    """
+    state = {field: getattr(instance, field) for field in DEVICE_STATE_FIELDS}
+    if created:
+        changes = state
+    else:
+        changes = {
+            field: value for field, value in state.items()
+            if instance._pushed_state.get(field) != value
+        }
+    instance._pushed_state = state
+
+    if not changes:
+        return
+
+    # 브릿지로 보낼 명령 큐에도 적재 (커밋 후 요청 단위로 묶어서 저장, 롤백되면 취소)
+    # 새 디바이스는 제외 → 브릿지가 첫 poll에서 reset으로 현재 상태를 받음
+    if not created:
+        commands.enqueue(instance.device_id, changes)
+
+    event = {
+        "type": "device.created" if created else "device.changed",
+        "device_id": instance.device_id,
+        "changes": changes,
+        "last_sync": instance.last_sync.isoformat() if instance.last_sync else None,
+    }
+
+    def publish():
+        topics = [f"device:{instance.device_id}"]
+        # 팀 구독자가 있을 때만 팀 조회
+        if events.broker.has_subscribers("team:"):
+            topics += [
+                f"team:{team_id}" for team_id in TeamDevice.objects.filter(
+                    device_id=instance.device_id
+                ).values_list("team_id", flat=True)
+            ]
+        events.broker.publish(topics, event)
+
+    # 롤백된 변경이 나가지 않도록 커밋 후 발행
+    transaction.on_commit(publish)
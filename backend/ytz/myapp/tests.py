@@ -1,3 +1,1076 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import viewsets
+from rest_framework.test import APIClient
+
+from . import (
+    ai_client, alerts, commands, export, fan_control, fast_list, filter_life, heartbeat, metrics, roles, rollup,
+    timers, views, voice_cache, write_behind,
+)
+from .models import (
+    Alert, CommandCursor, Device, FanTimer, FilterStatus, IdempotencyKey, LatestSensorData, QueuedCommand,
+    SensorData, SensorRollup, Team, TeamDevice, TeamUser, User,
+)
+
+
+# settings.QUERY_BUDGETS 초과 시 QueryMetricsMiddleware가 예외를 내서 테스트 실패
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+        user = User.objects.create(user_id="u1")
+        self.team = Team.objects.create(team_name="team1")
+        TeamUser.objects.create(user=user, team=self.team, role="user")
+        for i in range(5):
+            device = Device.objects.create(device_id=f"fan{i}")
+            TeamDevice.objects.create(team=self.team, device=device)
+            FilterStatus.objects.create(device=device, condition="good")
+
+        self.client.post(
+            "/api/sensors/batch/",
+            [{"device": f"fan{i % 5}", "temperature": 20 + i} for i in range(20)],
+            format="json",
+        )
+        cache.clear()
+        self.params = {"user_id": "u1", "team_id": self.team.team_id}
+
+    def test_read_endpoints_within_budget(self):
+        urls = [
+            "/api/team/dashboard/",
+            "/api/team/my-role/",
+            "/api/sensors/",
+            "/api/sensors/latest/",
+            "/api/filters/",
+            "/api/devices/",
+            "/api/devices/fan0/",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                response = self.client.get(url, self.params)
+                self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_query_count_does_not_grow_with_devices(self):
+        for i in range(5, 15):
+            device = Device.objects.create(device_id=f"fan{i}")
+            TeamDevice.objects.create(team=self.team, device=device)
+
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/team/dashboard/", {"user_id": "u1"})
+        self.assertEqual(len(response.json()["teams"][0]["devices"]), 15)
+
+
+class AsyncQueryMetricsTests(TestCase):
+    """QueryMetricsMiddleware가 async 뷰를 스레드로 밀어내지 않고 쿼리도 집계"""
+
+    def setUp(self):
+        metrics.registry.reset()
+        Device.objects.create(device_id="fan0")
+
+    def test_async_chain(self):
+        async def view(request):
+            return HttpResponse()
+
+        middleware = metrics.QueryMetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertFalse(iscoroutinefunction(metrics.QueryMetricsMiddleware(lambda request: HttpResponse())))
+
+    async def test_async_view_queries_counted(self):
+        response = await self.async_client.get("/api/device/commands/", {"device_id": "fan0", "timeout": 0})
+        self.assertEqual(response.status_code, 200)
+
+        stats = metrics.registry.endpoints[("device_commands", "GET")]
+        self.assertEqual(stats.requests, 1)
+        self.assertGreater(stats.queries, 0)
+
+
+class DateTimeParamTests(TestCase):
+    """?since= / ?until= 에 오프셋(+09:00, Z)이 붙어 와도 USE_TZ 설정에 맞게 변환"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        user = User.objects.create(user_id="u1")
+        team = Team.objects.create(team_name="team1")
+        TeamUser.objects.create(user=user, team=team, role="user")
+        device = Device.objects.create(device_id="fan0")
+        TeamDevice.objects.create(team=team, device=device)
+        self.params = {"user_id": "u1", "team_id": team.team_id, "device": "fan0"}
+
+        # 서울 시간 09:00 / 10:00 (UTC 00:00 / 01:00)
+        for hour in (9, 10):
+            SensorData.objects.create(
+                device=device, temperature=20.0, created_at=self.local(2026, 10, 18, hour)
+            )
+
+    @staticmethod
+    def local(*args):
+        value = datetime(*args)
+        if settings.USE_TZ:
+            return timezone.make_aware(value)
+        return value
+
+    def get(self, url, **params):
+        return self.client.get(url, dict(self.params, **params))
+
+    def test_sensor_list_accepts_offsets(self):
+        for since in ("2026-10-18T10:00:00+09:00", "2026-10-18T01:00:00Z", "2026-10-18T10:00:00"):
+            with self.subTest(since=since):
+                response = self.get("/api/sensors/", since=since)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_rollup_and_alerts_accept_offsets(self):
+        response = self.get(
+            "/api/sensors/rollup/", since="2026-10-18T00:00:00Z", until="2026-10-18T02:00:00+00:00"
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.get("/api/alerts/", since="2026-10-18T00:00:00Z")
+        self.assertEqual(response.status_code, 200)
+
+    def test_export_accepts_offsets(self):
+        response = self.get("/api/sensors/export/", since="2026-10-18T01:00:00Z")
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 1)
+
+    def test_invalid_datetime_is_400(self):
+        for since in ("어제", "2026-02-30T00:00:00"):
+            with self.subTest(since=since):
+                self.assertEqual(self.get("/api/sensors/", since=since).status_code, 400)
+
+
+
+class SensorExportTests(TestCase):
+    """내보내기: ASGI에서는 async iterator로 청크마다 전송 (전체를 메모리에 모으지 않음)"""
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(user_id="u1")
+        team = Team.objects.create(team_name="team1")
+        TeamUser.objects.create(user=user, team=team, role="user")
+        device = Device.objects.create(device_id="fan0")
+        TeamDevice.objects.create(team=team, device=device)
+        SensorData.objects.bulk_create(
+            [SensorData(device=device, temperature=20.0 + i) for i in range(6)]
+        )
+        self.params = {"user_id": "u1", "team_id": team.team_id}
+
+        # iter_rows가 몇 행까지 읽혔는지 기록
+        self.produced = 0
+        iter_rows = export.iter_rows
+
+        def counting(queryset, chunk_size=2):
+            for row in iter_rows(queryset, chunk_size):
+                self.produced += 1
+                yield row
+
+        patcher = patch.multiple(export, iter_rows=counting, EXPORT_CHUNK_SIZE=2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_asgi_export_streams(self):
+        response = await self.async_client.get("/api/sensors/export/", self.params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+
+        chunks = aiter(response.streaming_content)
+        first = await anext(chunks)
+        self.assertEqual(len(first.splitlines()), 2)
+        self.assertLess(self.produced, 6)  # 첫 청크를 보낼 때 나머지는 아직 읽지 않음
+
+        rest = [chunk async for chunk in chunks]
+        lines = b"".join([first] + rest).splitlines()
+        self.assertEqual([json.loads(line)["temperature"] for line in lines], [20.0 + i for i in range(6)])
+
+    def test_wsgi_export_streams(self):
+        response = APIClient().get("/api/sensors/export/", dict(self.params, output="csv"))
+        self.assertFalse(response.is_async)
+        chunks = iter(response.streaming_content)
+        self.assertEqual(len(next(chunks).splitlines()), 3)  # 헤더 + 2행
+        self.assertLess(self.produced, 6)
+        self.assertEqual(len(b"".join(chunks).splitlines()), 4)
+
+
+@skipUnless(ai_client.httpx, "httpx 미설치")
+class AsyncAIClientTests(SimpleTestCase):
+    """httpx 클라이언트는 이벤트 루프별로 재사용하고, 루프가 끝나면 닫힘 (WSGI의 async_to_sync 포함)"""
+
+    def setUp(self):
+        self.clients = []
+        get_client = ai_client._get_async_client
+
+        async def spy():
+            client = await get_client()
+            self.clients.append(client)
+            return client
+
+        patcher = patch.multiple(
+            ai_client, _get_async_client=spy, AI_SERVER_URL="http://127.0.0.1:9/llm/run"
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(ai_client.breaker.record_success)
+
+    async def call(self, text):
+        ai_client.breaker.record_success()
+        return await ai_client.acall_ai_server(text)
+
+    def test_client_closed_when_loop_ends(self):
+        for i in range(3):
+            result = async_to_sync(self.call)(f"테스트 명령 {i}")
+            self.assertEqual(result["action"], "error")
+
+        self.assertEqual(len(self.clients), 3)
+        self.assertTrue(all(client.is_closed for client in self.clients))
+        self.assertEqual(len(ai_client._async_clients), 0)
+
+    def test_client_reused_within_loop(self):
+        async def twice():
+            await self.call("테스트 명령 a")
+            await self.call("테스트 명령 b")
+
+        asyncio.run(twice())
+        self.assertIs(self.clients[0], self.clients[1])
+        self.assertTrue(self.clients[0].is_closed)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    """half-open 시험 호출이 취소되거나 끝나지 않아도 서킷이 half-open에 갇히지 않음"""
+
+    def half_open(self, **kwargs):
+        breaker = ai_client.CircuitBreaker(failure_threshold=1, reset_timeout=0, **kwargs)
+        breaker.record_failure()
+        return breaker
+
+    @skipUnless(ai_client.httpx, "httpx 미설치")
+    def test_cancelled_trial_released(self):
+        breaker = self.half_open()
+
+        class Client:
+            async def post(self, *args, **kwargs):
+                raise asyncio.CancelledError
+
+        async def client():
+            return Client()
+
+        with patch.multiple(ai_client, breaker=breaker, _get_async_client=client):
+            with self.assertRaises(asyncio.CancelledError):
+                async_to_sync(ai_client.acall_ai_server)("취소되는 명령")
+        self.assertFalse(breaker.trial_running)
+        breaker.before_call()  # 다음 요청이 다시 시험
+
+    def test_stale_trial_expires(self):
+        breaker = self.half_open(trial_timeout=10)
+        breaker.before_call()
+        with self.assertRaises(ai_client.CircuitOpenError):
+            breaker.before_call()
+        breaker.trial_started -= 11
+        breaker.before_call()
+
+
+class VoiceCacheTests(SimpleTestCase):
+    """음성 명령 캐시: 정규화한 문장 키, TTL 만료, LRU 제거, 버전이 바뀌면 전체 무효화"""
+
+    def setUp(self):
+        self.cache = voice_cache.VoiceCommandCache(max_size=2, ttl=60)
+        self.now = 1000.0
+        patcher = patch("myapp.voice_cache.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_normalize(self):
+        for text in ("선풍기 좀 켜줘요!", "선풍기 켜줘", "  선풍기, 켜줘요.", "선풍기를 켜줘"):
+            with self.subTest(text=text):
+                self.assertEqual(voice_cache.normalize(text), "선풍기켜줘")
+        self.assertEqual(voice_cache.normalize("Fan ON!"), "fanon")
+        self.assertNotEqual(voice_cache.normalize("선풍기 꺼줘"), voice_cache.normalize("선풍기 켜줘"))
+
+    def test_hit_is_copy_and_expires(self):
+        self.cache.put("선풍기 켜줘", {"action": "on"})
+        hit = self.cache.get("선풍기 좀 켜줘요")
+        self.assertEqual(hit, {"action": "on"})
+        hit["action"] = "off"  # 받은 dict를 바꿔도 캐시는 그대로
+        self.assertEqual(self.cache.get("선풍기 켜줘"), {"action": "on"})
+
+        self.now += 61
+        self.assertIsNone(self.cache.get("선풍기 켜줘"))
+        self.assertEqual(self.cache.stats()["size"], 0)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_lru_eviction(self):
+        self.cache.put("켜", {"action": "on"})
+        self.cache.put("꺼", {"action": "off"})
+        self.cache.get("켜")  # 최근 사용 → 꺼가 가장 오래됨
+        self.cache.put("회전", {"action": "rotate"})
+        self.assertIsNone(self.cache.get("꺼"))
+        self.assertIsNotNone(self.cache.get("켜"))
+        self.assertIsNotNone(self.cache.get("회전"))
+
+    def test_errors_not_cached_and_version_invalidates(self):
+        self.cache.put("켜", {"action": "error", "message": "timeout"})
+        self.assertIsNone(self.cache.get("켜"))
+
+        self.cache.put("켜", {"action": "on", "model_version": "v1"})
+        self.cache.put("꺼", {"action": "off", "model_version": "v2"})  # 새 버전 → 이전 결과 버림
+        self.assertIsNone(self.cache.get("켜"))
+        self.assertEqual(self.cache.stats()["version"], "v2")
+        self.cache.set_version("v3")
+        self.assertIsNone(self.cache.get("꺼"))
+
+    def test_ai_call_skipped_on_hit(self):
+        self.cache.put("선풍기 켜줘", {"action": "on"})
+        with patch.object(ai_client, "voice_cache", self.cache), patch.object(ai_client._session, "post") as post:
+            self.assertEqual(ai_client.call_ai_server("선풍기 좀 켜줘요"), {"action": "on"})
+        post.assert_not_called()
+
+
+class FastListTests(TestCase):
+    """목록 빠른 경로(values() → JSON) 출력이 DRF serializer 경로와 같음 (키 순서, 값 형식, 페이지 링크)"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        User.objects.create(user_id="u1")
+        team = Team.objects.create(team_name="team1")
+        TeamUser.objects.create(user_id="u1", team=team, role="user")
+        device = Device.objects.create(device_id="fan0")
+        TeamDevice.objects.create(team=team, device=device)
+        self.params = {"user_id": "u1", "team_id": team.team_id, "page_size": 2}
+
+        base = timezone.now().replace(microsecond=123456)
+        SensorData.objects.bulk_create([
+            SensorData(device=device, temperature=21.5, humidity=None, ir_detected=True, created_at=base),
+            SensorData(device=device, dust_density=12.0, co2_level=415.0, created_at=base - timedelta(seconds=1)),
+            SensorData(device=device, temperature=-3.25, ir_detected=False, created_at=base - timedelta(seconds=2)),
+        ])
+        FilterStatus.objects.create(device=device, condition="good", dust_accumulated=1.5)
+        FilterStatus.objects.create(device=device, condition="bad")
+
+    def both(self, viewset, url, params=None, **headers):
+        fast = self.client.get(url, params, **headers)
+        with patch.object(viewset, "list", viewsets.ModelViewSet.list):
+            cache.clear()
+            slow = self.client.get(url, params, **headers)
+        self.assertEqual((fast.status_code, slow.status_code), (200, 200))
+        return fast, slow
+
+    def assertSameJson(self, fast, slow):
+        self.assertEqual(json.dumps(json.loads(fast)), json.dumps(json.loads(slow)))  # 키 순서까지 비교
+
+    def test_sensor_pages(self):
+        url = "/api/sensors/"
+        params = self.params
+        pages = 0
+        while url:
+            fast, slow = self.both(views.SensorDataViewSet, url, params)
+            self.assertSameJson(fast.content, slow.content)
+            url, params = fast.json()["next"], None
+            pages += 1
+        self.assertEqual(pages, 2)
+
+    def test_unpaginated_and_gzip(self):
+        fast, slow = self.both(views.FilterStatusViewSet, "/api/filters/")
+        self.assertSameJson(fast.content, slow.content)
+
+        with patch.object(fast_list, "FAST_LIST_GZIP_MIN_SIZE", 10):
+            fast, slow = self.both(views.FilterStatusViewSet, "/api/filters/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(fast["Content-Encoding"], "gzip")
+        self.assertSameJson(gzip.decompress(fast.content), slow.content)
+
+
+class SensorBatchUploadTests(TestCase):
+    """배치 업로드: 항목별 검증 → 통과한 것만 저장, 거부된 항목은 index와 오류로 응답"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Device.objects.create(device_id="fan0")
+        Device.objects.create(device_id="fan1")
+
+    def post(self, readings):
+        return self.client.post("/api/sensors/batch/", readings, format="json")
+
+    def test_partial_rejection(self):
+        future = (timezone.now() + timedelta(hours=1)).isoformat()
+        response = self.post([
+            {"device": "fan0", "temperature": 21.0},
+            {"device": "unknown", "temperature": 22.0},
+            {"device": "fan1", "humidity": "습함"},
+            {"device": "fan1", "temperature": 23.0, "created_at": future},
+            {"device": "fan1", "temperature": 24.0},
+        ])
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body["accepted"], body["rejected"]), (2, 3))
+        self.assertEqual([result["status"] for result in body["results"]], [
+            "accepted", "rejected", "rejected", "rejected", "accepted",
+        ])
+        self.assertIn("device", body["results"][1]["errors"])
+        self.assertIn("humidity", body["results"][2]["errors"])
+        self.assertIn("created_at", body["results"][3]["errors"])
+        self.assertEqual(sorted(SensorData.objects.values_list("temperature", flat=True)), [21.0, 24.0])
+
+    def test_all_rejected_or_invalid_body(self):
+        response = self.post([{"device": "unknown"}, {"device": "fan0", "temperature": "더움"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["rejected"], 2)
+        self.assertEqual(self.post({"readings": []}).status_code, 400)
+        self.assertEqual(self.post({"device": "fan0"}).status_code, 400)
+        self.assertFalse(SensorData.objects.exists())
+
+    def test_batch_size_limit(self):
+        with patch.object(views, "SENSOR_BATCH_MAX_SIZE", 3):
+            self.assertEqual(self.post([{"device": "fan0", "temperature": 20.0}] * 4).status_code, 400)
+            self.assertEqual(self.post({"readings": [{"device": "fan0", "temperature": 20.0}] * 3}).status_code, 201)
+        self.assertEqual(SensorData.objects.count(), 3)
+
+
+class SensorRollupTests(TestCase):
+    """분/시간/일 집계: 업로드마다 증분 반영한 결과와 원본으로 다시 계산(backfill)한 결과가 같음"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        Device.objects.create(device_id="fan0")
+        Device.objects.create(device_id="fan1")
+        # 이틀 전 10:59 ~ 11:01 (분 / 시간 경계에 걸치게)
+        self.base = (timezone.now() - timedelta(days=2)).replace(hour=10, minute=59, second=0, microsecond=0)
+
+    def upload(self, *readings):
+        rows = [
+            dict(reading, created_at=(self.base + timedelta(seconds=offset)).isoformat())
+            for offset, reading in readings
+        ]
+        self.assertEqual(self.client.post("/api/sensors/batch/", rows, format="json").status_code, 201)
+
+    @staticmethod
+    def snapshot():
+        return {
+            (row.pop("device_id"), row.pop("resolution"), row.pop("bucket_start")): row
+            for row in SensorRollup.objects.values(*[
+                field.attname for field in SensorRollup._meta.concrete_fields if not field.primary_key
+            ])
+        }
+
+    def test_incremental_matches_backfill(self):
+        self.upload(
+            (0, {"device": "fan0", "temperature": 20.5, "ir_detected": True}),
+            (30, {"device": "fan0", "temperature": 22.25, "dust_density": 10.0}),
+            (10, {"device": "fan1", "humidity": 40.0}),
+        )
+        # 다음 요청: 같은 버킷에 합쳐지는 값 + 다음 분 / 다음 시간
+        self.upload(
+            (45, {"device": "fan0", "temperature": 19.75}),
+            (90, {"device": "fan0", "temperature": 25.0, "co2_level": 500.0}),
+            (70, {"device": "fan1", "humidity": 42.5, "ir_detected": True}),
+        )
+        incremental = self.snapshot()
+
+        minute = incremental[("fan0", "minute", self.base)]
+        self.assertEqual(minute["sample_count"], 3)
+        self.assertEqual((minute["temperature_min"], minute["temperature_max"]), (19.75, 22.25))
+        self.assertEqual(minute["temperature_sum"], 62.5)
+        self.assertEqual((minute["dust_density_count"], minute["ir_detected_count"]), (1, 1))
+        self.assertEqual(incremental[("fan0", "hour", self.base.replace(minute=0))]["sample_count"], 3)
+        self.assertEqual(incremental[("fan0", "hour", self.base.replace(hour=11, minute=0))]["sample_count"], 1)
+        self.assertEqual(incremental[("fan0", "day", self.base.replace(hour=0, minute=0))]["sample_count"], 4)
+
+        result = rollup.backfill()
+        self.assertEqual(result["day"], 2)
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_backfill_since_keeps_older_buckets(self):
+        self.upload((0, {"device": "fan0", "temperature": 20.0}))
+        SensorData.objects.update(created_at=self.base - timedelta(days=1))
+        rollup.backfill()
+        self.upload((0, {"device": "fan0", "temperature": 30.0}))
+        before = self.snapshot()
+
+        rollup.backfill(device_ids=["fan0"], since=self.base)  # 하루 단위로 내림 → 전날 버킷은 그대로
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(SensorRollup.objects.filter(resolution="day").count(), 2)
+
+    def test_choose_resolution(self):
+        with patch.object(rollup, "ROLLUP_MAX_POINTS", 100):
+            self.assertEqual(rollup.choose_resolution(self.base, self.base + timedelta(minutes=90)), "minute")
+            self.assertEqual(rollup.choose_resolution(self.base, self.base + timedelta(days=2)), "hour")
+            self.assertEqual(rollup.choose_resolution(self.base, self.base + timedelta(days=30)), "day")
+            self.assertEqual(rollup.choose_resolution(self.base, self.base + timedelta(days=3650)), "day")
+            self.assertEqual(
+                rollup.choose_resolution(self.base, self.base + timedelta(minutes=10), requested="hour"), "hour"
+            )
+
+
+class BatchIdempotencyTests(TestCase):
+    """Idempotency-Key: 같은 배치를 다시 보내도 한 번만 저장 (write-behind는 저장과 같은 트랜잭션에서 키 기록)"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.device = Device.objects.create(device_id="fan0", power_state=False, fan_speed=1)
+        self.readings = [{"device": "fan0", "dust_density": 10.0}, {"device": "fan0", "dust_density": 20.0}]
+
+    def post(self, key):
+        return self.client.post(
+            "/api/sensors/batch/", self.readings, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_duplicate_batch_saved_once(self):
+        self.assertEqual(self.post("k1").status_code, 201)
+        response = self.post("k1")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["duplicate"])
+        self.assertEqual(SensorData.objects.count(), 2)
+
+    def write_behind(self):
+        buffer = write_behind.WriteBehindBuffer(10, 500, 10)
+        buffer.start = lambda: None  # 플러셔 스레드 대신 테스트에서 직접 flush
+        patcher = patch.multiple(write_behind, SENSOR_WRITE_BEHIND=True, buffer=buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return buffer
+
+    def test_write_behind_claims_key_when_saved(self):
+        buffer = self.write_behind()
+        self.assertEqual(self.post("k1").status_code, 202)
+        self.assertFalse(IdempotencyKey.objects.filter(key="k1").exists())
+        self.assertTrue(self.post("k1").json()["duplicate"])  # 큐에 대기 중
+
+        buffer.flush(buffer.next_batch(timeout=0))
+        self.assertEqual(SensorData.objects.count(), 2)
+        self.assertTrue(IdempotencyKey.objects.filter(key="k1").exists())
+        self.assertTrue(self.post("k1").json()["duplicate"])  # 저장 완료
+        self.assertEqual(buffer.stats()["pending"], 0)
+
+    def test_write_behind_failed_flush_keeps_key_retryable(self):
+        buffer = self.write_behind()
+        self.post("k1")
+        with patch.object(write_behind, "save_readings", side_effect=RuntimeError("db down")):
+            buffer.flush(buffer.next_batch(timeout=0))
+        self.assertEqual(buffer.stats()["failed"], 2)
+        self.assertFalse(IdempotencyKey.objects.filter(key="k1").exists())
+
+        self.assertEqual(self.post("k1").status_code, 202)
+        buffer.flush(buffer.next_batch(timeout=0))
+        self.assertEqual(SensorData.objects.count(), 2)
+
+    def test_write_behind_capacity_counts_rows(self):
+        self.write_behind()
+        for i in range(5):
+            self.assertEqual(self.post(f"k{i}").status_code, 202)
+        self.assertEqual(self.post("k5").status_code, 429)
+
+    def test_write_behind_uses_device_state_at_flush(self):
+        buffer = self.write_behind()
+        self.post("k1")
+        # 큐에 있는 동안 전원을 켜고 2단으로 변경 → 필터 마모는 바뀐 상태 기준
+        Device.objects.filter(device_id="fan0").update(power_state=True, fan_speed=2)
+        buffer.flush(buffer.next_batch(timeout=0))
+
+        status = FilterStatus.objects.get(device_id="fan0")
+        self.assertAlmostEqual(status.dust_accumulated, 30.0 * filter_life.FILTER_SPEED_WEIGHTS[2])
+
+    def test_write_behind_drops_rows_of_deleted_device(self):
+        buffer = self.write_behind()
+        Device.objects.create(device_id="fan1")
+        self.client.post("/api/sensors/batch/", [{"device": "fan1", "temperature": 20.0}], format="json")
+        Device.objects.filter(device_id="fan1").delete()
+        self.post("k1")
+
+        buffer.flush(buffer.next_batch(timeout=0))
+        self.assertEqual(SensorData.objects.count(), 2)
+        self.assertEqual(buffer.stats()["dropped"], 1)
+        self.assertEqual(buffer.stats()["failed"], 0)
+
+    def test_write_behind_bad_group_does_not_drop_others(self):
+        buffer = self.write_behind()
+        self.post("k1")
+        self.readings = [{"device": "fan0", "dust_density": 99.0}]
+        self.post("k2")
+        save_readings = write_behind.save_readings
+
+        def reject_99(rows):
+            if any(row.dust_density == 99.0 for row in rows):
+                raise ValueError("bad row")
+            save_readings(rows)
+
+        with patch.object(write_behind, "save_readings", side_effect=reject_99):
+            buffer.flush(buffer.next_batch(timeout=0))
+        self.assertEqual(SensorData.objects.count(), 2)
+        self.assertEqual(buffer.stats()["failed"], 1)
+        self.assertEqual(buffer.stats()["pending"], 0)
+        self.assertEqual(set(IdempotencyKey.objects.values_list("key", flat=True)), {"k1"})
+
+    def test_write_behind_requeues_transient_failure(self):
+        buffer = self.write_behind()
+        self.post("k1")
+        with patch.object(write_behind, "save_readings", side_effect=OperationalError("lock wait timeout")):
+            self.assertTrue(buffer.flush(buffer.next_batch(timeout=0)))
+        self.assertEqual(buffer.stats()["failed"], 0)
+        self.assertEqual(buffer.stats()["pending"], 2)
+        self.assertTrue(self.post("k1").json()["duplicate"])  # 아직 대기 중
+
+        self.assertFalse(buffer.flush(buffer.next_batch(timeout=0)))
+        self.assertEqual(SensorData.objects.count(), 2)
+        self.assertEqual(buffer.stats()["pending"], 0)
+
+    def test_write_behind_gives_up_after_max_retries(self):
+        buffer = self.write_behind()
+        self.post("k1")
+        with patch.object(write_behind, "save_readings", side_effect=OperationalError("db down")):
+            for _ in range(write_behind.SENSOR_WRITE_BEHIND_MAX_RETRIES + 1):
+                buffer.flush(buffer.next_batch(timeout=0))
+        self.assertEqual(buffer.stats()["failed"], 2)
+        self.assertEqual(buffer.stats()["pending"], 0)
+        self.assertEqual(buffer.next_batch(timeout=0), [])
+
+
+class LatestSensorDataTests(TestCase):
+    """LatestSensorData 갱신 (MySQL처럼 충돌 대상 지정 upsert를 지원하지 않는 DB 포함)"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for i in range(2):
+            Device.objects.create(device_id=f"fan{i}")
+
+    def upload(self):
+        response = self.client.post("/api/sensors/", {"device": "fan0", "temperature": 20.0}, format="json")
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post("/api/sensors/", {"device": "fan0", "temperature": 21.0}, format="json")
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(
+            "/api/sensors/batch/",
+            [
+                {"device": "fan0", "temperature": 22.0},
+                {"device": "fan1", "temperature": 30.0},
+                {"device": "fan1", "temperature": 31.0},
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+
+        latest = dict(LatestSensorData.objects.values_list("device_id", "temperature"))
+        self.assertEqual(latest, {"fan0": 22.0, "fan1": 31.0})
+
+    def test_upsert(self):
+        self.upload()
+
+    def test_upsert_without_conflict_target(self):
+        with patch.object(connection.features, "supports_update_conflicts_with_target", False):
+            self.upload()
+
+    def test_older_reading_does_not_overwrite(self):
+        self.client.post("/api/sensors/", {"device": "fan0", "temperature": 20.0}, format="json")
+        self.client.post(
+            "/api/sensors/batch/",
+            [{"device": "fan0", "temperature": 5.0, "created_at": "2020-01-01T00:00:00"}],
+            format="json",
+        )
+        self.assertEqual(LatestSensorData.objects.get(device_id="fan0").temperature, 20.0)
+
+
+class AlertPipelineTests(TestCase):
+    """중복 제거가 속도 제한보다 먼저: 반복 알림은 토큰을 쓰지 않음"""
+
+    def setUp(self):
+        Device.objects.create(device_id="fan0")
+        self.pipeline = alerts.AlertPipeline()
+        self.pipeline.buckets = alerts.TokenBuckets(capacity=2, per_minute=0)
+        self.pipeline.dispatcher.submit = lambda alert: None
+
+    def test_repeats_counted_and_do_not_starve_new_events(self):
+        self.assertEqual(self.pipeline.raise_alert("fan0", "high_temp")[0], "created")
+        for _ in range(5):
+            self.assertEqual(self.pipeline.raise_alert("fan0", "high_temp")[0], "deduplicated")
+        self.assertEqual(Alert.objects.get(event="high_temp").count, 6)
+
+        self.assertEqual(self.pipeline.raise_alert("fan0", "low_battery")[0], "created")
+        self.assertEqual(self.pipeline.raise_alert("fan0", "filter")[0], "rate_limited")
+        self.assertEqual(self.pipeline.stats()["suppressed"], 1)
+
+
+class FilterWearTests(TestCase):
+    """필터 마모 누적: 증가분 유실 / 필터 중복 생성 없음"""
+
+    def setUp(self):
+        self.device = Device.objects.create(device_id="fan0", power_state=True, fan_speed=1)
+
+    def apply(self, dust):
+        filter_life.apply_readings([SensorData(device=self.device, dust_density=dust)])
+
+    def test_creates_one_filter_and_accumulates(self):
+        self.apply(10.0)
+        self.apply(20.0)
+        status = FilterStatus.objects.get(device=self.device)
+        self.assertAlmostEqual(status.dust_accumulated, 30.0 * filter_life.FILTER_SPEED_WEIGHTS[1])
+
+    def test_concurrent_increment_not_lost(self):
+        self.apply(10.0)
+        current_filters = filter_life.current_filters
+
+        def stale(device_ids):
+            # 읽은 직후 다른 워커가 누적한 상황
+            filters = current_filters(device_ids)
+            FilterStatus.objects.update(dust_accumulated=F("dust_accumulated") + 100.0)
+            return filters
+
+        with patch.object(filter_life, "current_filters", stale):
+            self.apply(10.0)
+        weight = filter_life.FILTER_SPEED_WEIGHTS[1]
+        self.assertAlmostEqual(FilterStatus.objects.get(device=self.device).dust_accumulated, 20.0 * weight + 100.0)
+
+
+class TeamBulkCommandTests(TestCase):
+    """팀 일괄 제어: 팀원만, 팀 디바이스만 (device_ids로 좁힐 수 있음), 보낸 필드만 변경"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        User.objects.create(user_id="u1")
+        User.objects.create(user_id="outsider")
+        self.team = Team.objects.create(team_name="team1")
+        other = Team.objects.create(team_name="team2")
+        TeamUser.objects.create(user_id="u1", team=self.team, role="user")
+        for device_id, team in (("fan0", self.team), ("fan1", self.team), ("fan9", other)):
+            device = Device.objects.create(device_id=device_id, power_state=True, fan_speed=1, angle=15.0)
+            TeamDevice.objects.create(team=team, device=device)
+
+    def command(self, user_id="u1", **command):
+        return self.client.post(
+            "/api/team/devices/command/", {"user_id": user_id, "team_id": self.team.team_id, **command}, format="json"
+        )
+
+    def state(self):
+        return dict(Device.objects.values_list("device_id", "power_state"))
+
+    def test_whole_team(self):
+        response = self.command(power_state=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["updated"], 2)
+        self.assertEqual(self.state(), {"fan0": False, "fan1": False, "fan9": True})
+        self.assertEqual(set(Device.objects.values_list("angle", flat=True)), {15.0})  # 보내지 않은 필드는 그대로
+
+    def test_device_ids_limited_to_team(self):
+        response = self.command(device_ids=["fan1", "fan9"], fan_speed=3)
+        self.assertEqual([device["device_id"] for device in response.json()["devices"]], ["fan1"])
+        self.assertEqual(dict(Device.objects.values_list("device_id", "fan_speed")), {"fan0": 1, "fan1": 3, "fan9": 1})
+
+    def test_rejected(self):
+        self.assertEqual(self.command(user_id="outsider", power_state=False).status_code, 403)
+        self.assertEqual(self.command().status_code, 400)  # 명령 필드 없음
+        self.assertEqual(self.command(mode="turbo").status_code, 400)
+        self.assertEqual(self.command(fan_speed=-1).status_code, 400)
+        self.assertEqual(self.state(), {"fan0": True, "fan1": True, "fan9": True})
+
+
+class CommandQueueTests(TestCase):
+    """브릿지 명령 큐: 요청 단위로 커밋 후 한 번에 적재"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        User.objects.create(user_id="u1")
+        self.team = Team.objects.create(team_name="team1")
+        TeamUser.objects.create(user_id="u1", team=self.team, role="user")
+
+    def add_devices(self, count):
+        for i in range(Device.objects.count(), count):
+            device = Device.objects.create(device_id=f"fan{i:02}")
+            TeamDevice.objects.create(team=self.team, device=device)
+
+    def command(self, **command):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/team/devices/command/", {"user_id": "u1", "team_id": self.team.team_id, **command}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_team_command_queries_do_not_grow_with_devices(self):
+        self.add_devices(5)
+        few = self.command(fan_speed=2)
+        self.add_devices(20)
+        self.assertEqual(self.command(fan_speed=3), few)
+
+        self.assertEqual(QueuedCommand.objects.filter(kind="fan_speed").count(), 20)
+        self.assertEqual(set(CommandCursor.objects.values_list("last_seq", flat=True)), {1, 2})
+        self.assertEqual(
+            list(QueuedCommand.objects.filter(device_id="fan00").values_list("seq", "value")), [(2, 3)]
+        )
+
+    def test_create_and_unrelated_save_queue_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            device = Device.objects.create(device_id="fan0", fan_speed=2)
+            device.save(update_fields=["last_sync"])
+        self.assertFalse(QueuedCommand.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            device.fan_speed = 3
+            device.save()
+        self.assertEqual(list(QueuedCommand.objects.values_list("kind", "value")), [("fan_speed", 3)])
+
+    def test_savepoint_rollback_inside_batch(self):
+        self.add_devices(3)
+        devices = list(Device.objects.order_by("device_id"))
+        with patch.object(commands, "enqueue_many", wraps=commands.enqueue_many) as enqueue_many:
+            with self.captureOnCommitCallbacks(execute=True), commands.batched(), transaction.atomic():
+                devices[0].fan_speed = 2
+                devices[0].save()
+                try:
+                    with transaction.atomic():  # write-behind 요청별 세이브포인트처럼
+                        devices[1].fan_speed = 2
+                        devices[1].save()
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                devices[2].fan_speed = 2
+                devices[2].save()
+
+        # 세이브포인트 롤백 후에도 배치는 하나, 롤백된 변경은 제외
+        self.assertEqual(enqueue_many.call_count, 1)
+        self.assertEqual(sorted(QueuedCommand.objects.values_list("device_id", flat=True)), ["fan00", "fan02"])
+
+    def test_rollback_queues_nothing(self):
+        device = Device.objects.create(device_id="fan0")
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    device.fan_speed = 3
+                    device.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertFalse(QueuedCommand.objects.exists())
+
+
+class FanTimerTests(TestCase):
+    """전원 끄기 타이머: 설정 / 교체 / 취소는 heap 항목 무효 표시, 재시작 시 DB에서 복구, 잘못된 값이면 디바이스도 그대로"""
+
+    def setUp(self):
+        self.device = Device.objects.create(device_id="fan0", power_state=True, fan_speed=2)
+        self.scheduler = timers.TimerScheduler()
+        self.scheduler.start = lambda: None  # 스레드 대신 테스트에서 직접 실행
+        patcher = patch.object(timers, "scheduler", self.scheduler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def set_timer(self, seconds):
+        with self.captureOnCommitCallbacks(execute=True):
+            return timers.set_timer("fan0", seconds)
+
+    def fire_at(self):
+        return FanTimer.objects.filter(device_id="fan0").values_list("fire_at", flat=True).first()
+
+    def test_set_replace_cancel(self):
+        first = self.set_timer(60)["fire_at"]
+        self.assertEqual(self.scheduler.entries["fan0"][timers.FIRE_AT], first)
+
+        second = self.set_timer(120)["fire_at"]
+        self.assertEqual(self.fire_at(), second)
+        self.assertEqual(self.scheduler.entries["fan0"][timers.FIRE_AT], second)
+        self.assertEqual(self.scheduler.stats()["heap_size"], 2)  # 이전 항목은 무효 표시만
+        self.assertEqual(self.scheduler.stale, 1)
+
+        self.assertIsNone(self.set_timer(None)["fire_at"])
+        self.assertIsNone(self.fire_at())
+        self.assertEqual(self.scheduler.stats()["pending"], 0)
+
+    def test_reload_and_fire(self):
+        now = timezone.now()
+        Device.objects.create(device_id="fan1", power_state=True)
+        FanTimer.objects.create(device_id="fan0", fire_at=now - timedelta(seconds=1))
+        FanTimer.objects.create(device_id="fan1", fire_at=now + timedelta(hours=1))
+
+        self.assertEqual(self.scheduler.load(), 2)  # 재시작 후 복구
+        entry = self.scheduler.next_due()
+        self.assertEqual(entry[timers.DEVICE_ID], "fan0")
+        self.scheduler.fire(entry)
+
+        self.device.refresh_from_db()
+        self.assertFalse(self.device.power_state)
+        self.assertEqual(list(FanTimer.objects.values_list("device_id", flat=True)), ["fan1"])
+        self.assertEqual(self.scheduler.stats()["fired"], 1)
+
+    def test_replaced_timer_not_fired(self):
+        fire_at = self.set_timer(60)["fire_at"]
+        self.set_timer(3600)
+        self.scheduler.fire([fire_at, 0, "fan0", fire_at, True])  # 다른 워커가 들고 있던 이전 타이머
+        self.device.refresh_from_db()
+        self.assertTrue(self.device.power_state)
+        self.assertEqual(self.scheduler.stats()["skipped"], 1)
+
+    def test_invalid_timer_keeps_device(self):
+        with patch("myapp.views.call_ai_server", return_value={"action": "off", "timer": "한 시간"}):
+            response = APIClient().post("/api/ai/control/", {"device_id": "fan0", "voice_command": "꺼"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.device.refresh_from_db()
+        self.assertTrue(self.device.power_state)
+        self.assertIsNone(self.fire_at())
+
+
+class HeartbeatPresenceTests(TestCase):
+    """접속 상태: 워커 여러 개 → DB의 last_heartbeat와 메모리 중 최근 값, 제어 저장은 heartbeat 아님"""
+
+    def setUp(self):
+        self.device = Device.objects.create(device_id="fan0")
+        self.tracker = heartbeat.HeartbeatTracker(window=30, offline_after=90)
+
+    def online(self):
+        return self.tracker.presence(["fan0"])[0]["online"]
+
+    def test_heartbeat_from_other_worker(self):
+        self.assertEqual(self.tracker.beat("fan0", battery_level=80), "written")
+        # 이 워커가 기억하는 heartbeat는 오래됨, 다른 워커가 방금 받음
+        self.tracker.last_seen["fan0"] = timezone.now() - timedelta(seconds=600)
+        self.assertTrue(self.online())
+
+        Device.objects.filter(device_id="fan0").update(last_heartbeat=timezone.now() - timedelta(seconds=600))
+        self.assertFalse(self.online())
+
+    def test_control_write_is_not_heartbeat(self):
+        self.device.fan_speed = 3
+        self.device.save()
+        self.assertFalse(self.online())
+
+    def test_heartbeat_validation(self):
+        client = APIClient()
+        for payload in (
+            {"device_id": "fan0", "battery_level": "full"},
+            {"device_id": "fan0", "battery_level": 150},
+            {"device_id": "fan0", "ip_address": "not-an-ip"},
+            {"battery_level": 80},
+        ):
+            self.assertEqual(client.post("/api/device/heartbeat/", payload, format="json").status_code, 400, payload)
+
+        response = client.post(
+            "/api/device/heartbeat/", {"device_id": "fan0", "battery_level": "80", "ip_address": "192.168.0.147"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.device.refresh_from_db()
+        self.assertEqual((self.device.battery_level, self.device.ip_address), (80, "192.168.0.147"))
+
+
+class DeviceConditionalGetTests(TestCase):
+    """디바이스 조건부 GET: 응답 필드가 바뀌면 200 (새 ETag), 내부 상태만 바뀌면 304"""
+
+    def setUp(self):
+        self.client = APIClient()
+        Device.objects.create(device_id="fan0", fan_speed=1)
+
+    def get(self, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get("/api/devices/fan0/", **headers)
+
+    def test_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("local_control_until", response.data)
+        self.assertNotIn("last_heartbeat", response.data)
+        self.assertEqual(self.get(response["ETag"]).status_code, 304)
+
+        fan_control.controller.touch("fan0")  # last_sync는 그대로, 응답에도 없음
+        self.assertEqual(self.get(response["ETag"]).status_code, 304)
+
+    def test_modified_after_change(self):
+        etag = self.get()["ETag"]
+        self.assertEqual(self.client.patch("/api/devices/fan0/", {"fan_speed": 3}, format="json").status_code, 200)
+
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["fan_speed"], 3)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class LocalFanControlTests(TestCase):
+    """브릿지 로컬 제어 표시는 DB에 저장 → 요청을 받은 워커와 관계없이 서버 자동 풍속 생략"""
+
+    def setUp(self):
+        self.client = APIClient()
+        Device.objects.create(device_id="fan0", fan_speed=1)
+
+    def upload(self, temperature):
+        response = self.client.post("/api/sensors/", {"device": "fan0", "temperature": temperature}, format="json")
+        self.assertEqual(response.status_code, 201)
+        return Device.objects.get(device_id="fan0").fan_speed
+
+    def test_policy_sync_defers_server_rule(self):
+        self.assertEqual(self.client.get("/api/device/auto-speed/", {"device_id": "fan0"}).status_code, 200)
+        self.assertEqual(self.upload(31.0), 1)
+
+        Device.objects.filter(device_id="fan0").update(local_control_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.upload(31.0), 3)
+
+    def test_policy_includes_power_state(self):
+        response = self.client.get("/api/device/auto-speed/", {"device_id": "fan0"})
+        self.assertFalse(response.data["power_state"])
+        etag = response["ETag"]
+        self.assertEqual(
+            self.client.get("/api/device/auto-speed/", {"device_id": "fan0"}, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+        Device.objects.filter(device_id="fan0").update(power_state=True)  # 앱 / 타이머로 켬
+        response = self.client.get("/api/device/auto-speed/", {"device_id": "fan0"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["power_state"])
+
+    def test_touch_writes_only_when_half_expired(self):
+        fan_control.controller.touch("fan0")
+        until = Device.objects.get(device_id="fan0").local_control_until
+        with self.assertNumQueries(1):
+            fan_control.controller.touch("fan0")
+        self.assertEqual(Device.objects.get(device_id="fan0").local_control_until, until)
+
+
+class TeamRoleCacheTests(TestCase):
+    """팀 역할 캐시: TeamUser 생성 / 변경 / 삭제 시 무효화 (캐시 없이 조회하는 설정 포함)"""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create(user_id="u1")
+        self.team = Team.objects.create(team_name="team1")
+
+    def check_invalidation(self):
+        self.assertIsNone(roles.get_role("u1", self.team.team_id))  # "팀원 아님"도 캐시됨
+
+        member = TeamUser.objects.create(user_id="u1", team=self.team, role="user")
+        self.assertEqual(roles.get_role("u1", self.team.team_id), "user")
+
+        member.role = "sub_admin"
+        member.save()
+        self.assertEqual(roles.get_role("u1", self.team.team_id), "sub_admin")
+
+        member.delete()
+        self.assertIsNone(roles.get_role("u1", self.team.team_id))
+
+    def test_shared_cache(self):
+        # 테스트에서는 LocMemCache가 공유 캐시 역할 (한 프로세스)
+        with patch.object(roles, "TEAM_ROLE_CACHE", "default"):
+            self.check_invalidation()
+            with self.assertNumQueries(0):
+                roles.get_role("u1", self.team.team_id)
+
+    def test_without_cache(self):
+        with patch.object(roles, "TEAM_ROLE_CACHE", None):
+            self.check_invalidation()
+            with self.assertNumQueries(1):
+                roles.get_role("u1", self.team.team_id)
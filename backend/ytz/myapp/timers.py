@@ -0,0 +1,246 @@
+"""
+전원 끄기 타이머 스케줄러 ({"timer": 초} / {"timer": null})
+
+- 예약 내용은 FanTimer 테이블에 저장 (디바이스당 1개) → 재시작 시 다시 읽어 복구
+- 프로세스 안에서는 실행 시각 기준 min-heap 하나 + 스레드 하나
+  스레드는 가장 빠른 타이머 시각까지 한 번만 대기 (디바이스별 폴링 없음)
+  더 이른 타이머가 들어올 때만 깨워서 대기 시간 재계산
+- 취소/교체: heap에서 바로 빼지 않고 항목을 무효 표시 (O(1)) 후 새 항목 push (O(log n))
+  무효 항목은 맨 앞에 올 때 버리고, 너무 많이 쌓이면 heap을 다시 만듦
+- 실행은 control_fan과 같은 경로: apply_ai_result(device, {"action": "off"}) → device.save()
+  (signals.py 통해 SSE 구독자에게도 변경 전달)
+
+※ 여러 워커 프로세스가 같은 타이머를 들고 있어도 실행은 한 번만:
+  (device, fire_at)이 일치하는 행을 삭제한 프로세스만 전원을 끔
+  (교체·취소된 타이머는 행이 이미 바뀌었으므로 실행되지 않음)
+※ 다른 워커에서 설정한 타이머는 그 워커가 실행함 (이 프로세스에는 재시작 시에만 로드)
+"""
+import heapq
+import itertools
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .control import apply_ai_result
+from .models import Device, FanTimer
+
+FAN_TIMER_MAX_SECONDS = getattr(settings, "FAN_TIMER_MAX_SECONDS", 24 * 3600)
+FAN_TIMER_RETRY_SECONDS = getattr(settings, "FAN_TIMER_RETRY_SECONDS", 30)
+
+# 무효 항목이 이 수를 넘고 유효 항목보다 많아지면 heap 재구성
+COMPACT_MIN_STALE = 1024
+
+# heap 항목: [실행 시각, 순번, device_id, DB의 fire_at, 유효 여부]
+DUE, SEQ, DEVICE_ID, FIRE_AT, ACTIVE = range(5)
+
+
+class TimerScheduler:
+    def __init__(self):
+        self.heap = []
+        self.entries = {}   # device_id → 유효한 heap 항목
+        self.stale = 0
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.thread = None
+        self.stopped = False
+
+        self.fired = 0
+        self.skipped = 0
+        self.failed = 0
+
+    # --- heap 조작 (cond 잡은 상태에서만 호출) ---
+
+    def _push(self, device_id, fire_at, due=None):
+        old = self.entries.pop(device_id, None)
+        if old is not None:
+            old[ACTIVE] = False
+            self.stale += 1
+
+        entry = [due or fire_at, next(self.seq), device_id, fire_at, True]
+        self.entries[device_id] = entry
+        heapq.heappush(self.heap, entry)
+        self._maybe_compact()
+
+        # 새 항목이 맨 앞이면 대기 중인 스레드가 시각을 다시 계산하도록
+        if self.heap[0] is entry:
+            self.cond.notify()
+
+    def _maybe_compact(self):
+        if self.stale > COMPACT_MIN_STALE and self.stale > len(self.entries):
+            self.heap = [entry for entry in self.heap if entry[ACTIVE]]
+            heapq.heapify(self.heap)
+            self.stale = 0
+
+    # --- 외부 API ---
+
+    def add(self, device_id, fire_at):
+        with self.cond:
+            self._push(device_id, fire_at)
+
+    def remove(self, device_id):
+        with self.cond:
+            entry = self.entries.pop(device_id, None)
+            if entry is not None:
+                entry[ACTIVE] = False
+                self.stale += 1
+                self._maybe_compact()
+
+    def start(self):
+        with self.cond:
+            if self.thread is not None:
+                return
+            self.stopped = False
+            self.thread = threading.Thread(target=self.run, name="fan-timers", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    # --- 스레드 ---
+
+    def load(self):
+        """FanTimer 테이블의 대기 중인 타이머를 heap에 올림 (이미 메모리에 있는 디바이스는 유지)"""
+        rows = list(FanTimer.objects.values_list("device_id", "fire_at"))
+        with self.cond:
+            for device_id, fire_at in rows:
+                if device_id not in self.entries:
+                    entry = [fire_at, next(self.seq), device_id, fire_at, True]
+                    self.entries[device_id] = entry
+                    self.heap.append(entry)
+            heapq.heapify(self.heap)
+            self.cond.notify()
+        return len(rows)
+
+    def next_due(self):
+        """다음 실행할 항목이 될 때까지 대기 (stop 시 None)"""
+        with self.cond:
+            while not self.stopped:
+                while self.heap and not self.heap[0][ACTIVE]:
+                    heapq.heappop(self.heap)
+                    self.stale -= 1
+
+                if not self.heap:
+                    self.cond.wait()
+                    continue
+
+                delay = (self.heap[0][DUE] - timezone.now()).total_seconds()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    continue
+
+                entry = heapq.heappop(self.heap)
+                del self.entries[entry[DEVICE_ID]]
+                return entry
+        return None
+
+    def run(self):
+        while not self.stopped:
+            try:
+                self.load()
+                break
+            except Exception as e:
+                # 마이그레이션 전 등 테이블이 없을 때 → 잠시 후 재시도
+                print(f"[TIMER] 타이머 복구 실패, {FAN_TIMER_RETRY_SECONDS}초 후 재시도: {e}")
+                with self.cond:
+                    self.cond.wait(FAN_TIMER_RETRY_SECONDS)
+            finally:
+                close_old_connections()
+
+        while True:
+            entry = self.next_due()
+            if entry is None:
+                return
+            self.fire(entry)
+
+    def fire(self, entry):
+        device_id, fire_at = entry[DEVICE_ID], entry[FIRE_AT]
+        try:
+            with transaction.atomic():
+                deleted, _ = FanTimer.objects.filter(device_id=device_id, fire_at=fire_at).delete()
+                if not deleted:
+                    # 다른 프로세스에서 이미 실행 / 교체 / 취소됨
+                    self.skipped += 1
+                    return
+
+                device = Device.objects.select_for_update().filter(device_id=device_id).first()
+                if device is not None:
+                    body, status_code, changed = apply_ai_result(device, {"action": "off"})
+                    if changed:
+                        device.save()
+            self.fired += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"[TIMER] {device_id} 타이머 실행 실패, {FAN_TIMER_RETRY_SECONDS}초 후 재시도: {e}")
+            retry_at = timezone.now() + timedelta(seconds=FAN_TIMER_RETRY_SECONDS)
+            with self.cond:
+                # 그 사이 새 타이머가 설정됐으면 그쪽이 우선
+                if device_id not in self.entries:
+                    self._push(device_id, fire_at, due=retry_at)
+        finally:
+            close_old_connections()
+
+    def stats(self):
+        with self.cond:
+            return {
+                "running": self.thread is not None,
+                "pending": len(self.entries),
+                "heap_size": len(self.heap),
+                "fired": self.fired,
+                "skipped": self.skipped,
+                "failed": self.failed,
+            }
+
+
+scheduler = TimerScheduler()
+
+
+def parse_seconds(value):
+    """{"timer": 초} 값 검증 (None = 취소)"""
+    if value is None:
+        return None
+    try:
+        seconds = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("timer는 초 단위 정수여야 합니다.")
+    if not 0 < seconds <= FAN_TIMER_MAX_SECONDS:
+        raise ValueError(f"timer는 1 ~ {FAN_TIMER_MAX_SECONDS}초 사이여야 합니다.")
+    return seconds
+
+
+def set_timer(device_id, seconds):
+    """
+    타이머 설정 / 교체 (seconds=None이면 취소)
+    반환: timer_status() 형식
+    """
+    seconds = parse_seconds(seconds)
+    scheduler.start()
+
+    if seconds is None:
+        with transaction.atomic():
+            FanTimer.objects.filter(device_id=device_id).delete()
+            transaction.on_commit(lambda: scheduler.remove(device_id))
+        return {"device_id": device_id, "fire_at": None, "remaining": None}
+
+    fire_at = timezone.now() + timedelta(seconds=seconds)
+    with transaction.atomic():
+        FanTimer.objects.update_or_create(device_id=device_id, defaults={"fire_at": fire_at})
+        transaction.on_commit(lambda: scheduler.add(device_id, fire_at))
+    return {"device_id": device_id, "fire_at": fire_at, "remaining": seconds}
+
+
+def timer_status(device_id):
+    """남은 시간 조회 (DB 기준 → 다른 워커에서 설정한 타이머도 보임)"""
+    fire_at = FanTimer.objects.filter(device_id=device_id).values_list("fire_at", flat=True).first()
+    if fire_at is None:
+        return {"device_id": device_id, "fire_at": None, "remaining": None}
+
+    remaining = max(0, int((fire_at - timezone.now()).total_seconds()))
+    return {"device_id": device_id, "fire_at": fire_at, "remaining": remaining}
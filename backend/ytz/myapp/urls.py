@@ -3,11 +3,13 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     TeamViewSet, UserViewSet, DeviceViewSet,
     TeamUserViewSet, TeamDeviceViewSet,
-    SensorDataViewSet, FilterStatusViewSet,
-    control_fan, send_alert, register_device,
+    SensorDataViewSet, FilterStatusViewSet, AlertViewSet,
+    control_fan, control_fan_async, ai_cache, send_alert, register_device,
+    device_stream, device_timer, device_commands,
+    device_heartbeat, device_presence, device_auto_speed,
     register_user, login_user, get_my_role,
     create_team, join_team, find_user_id, reset_password,
-    set_sub_admin, remove_team_user,
+    set_sub_admin, remove_team_user, team_device_command, team_dashboard,
 )
 
 router = DefaultRouter()
@@ -18,6 +20,7 @@ router.register(r'team-users', TeamUserViewSet)
 router.register(r'team-devices', TeamDeviceViewSet)
 router.register(r'sensors', SensorDataViewSet)
 router.register(r'filters', FilterStatusViewSet)
+router.register(r'alerts', AlertViewSet)
 
 urlpatterns = [
     # --- CRUD 기본 라우트 ---
@@ -31,15 +34,25 @@ urlpatterns = [
 
     # --- 팀 관련 ---
     path('device/register/', register_device, name='register_device'),
+    path('device/heartbeat/', device_heartbeat, name='device_heartbeat'),
+    path('device/auto-speed/', device_auto_speed, name='device_auto_speed'),
+    path('device/presence/', device_presence, name='device_presence'),
+    path('device/stream/', device_stream, name='device_stream'),
+    path('device/timer/', device_timer, name='device_timer'),
+    path('device/commands/', device_commands, name='device_commands'),
 
     path('team/create/', create_team, name='create_team'),
     path('team/join/', join_team, name='join_team'),
     path('team/my-role/', get_my_role, name='get_my_role'),
+    path('team/dashboard/', team_dashboard, name='team_dashboard'),
     path('team/set-sub-admin/', set_sub_admin, name='set_sub_admin'),
     path('team/remove-user/', remove_team_user, name='remove_team_user'),
+    path('team/devices/command/', team_device_command, name='team_device_command'),
 
     # --- AI/제어 기능 ---
     path('ai/control/', control_fan, name='control_fan'),
+    path('ai/control/async/', control_fan_async, name='control_fan_async'),
+    path('ai/cache/', ai_cache, name='ai_cache'),
 
     # --- 알림 ---
     path('alert/', send_alert, name='send_alert'),
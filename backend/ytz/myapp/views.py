@@ -1,32 +1,73 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
+from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
+from django.db.models import Count, Max
+from rest_framework.exceptions import ValidationError
 from .models import (
     Team, User, Device, TeamUser, TeamDevice,
-    SensorData, FilterStatus
+    SensorData, FilterStatus, SensorRollup, Alert
 )
+from django.db.models import Subquery
 from .serializer import (
     TeamSerializer, UserSerializer, DeviceSerializer,
     TeamUserSerializer, TeamDeviceSerializer,
-    SensorDataSerializer, FilterStatusSerializer
+    SensorDataSerializer, FilterStatusSerializer,
+    SensorDataBatchItemSerializer, SensorRollupSerializer,
+    DeviceCommandSerializer, DeviceHeartbeatSerializer, LatestSensorDataSerializer, AlertSerializer
 )
-
-import requests
+from .pagination import SensorDataCursorPagination
+from .fast_list import FastListMixin
+from . import rollup, roles, conditional, export, write_behind, commands, idempotency
+from .heartbeat import tracker as heartbeats
+from .ingest import save_readings, apply_derived
+from .alerts import pipeline as alert_pipeline
+from .fan_control import controller as auto_speed
+from . import fan_control
+from .ai_client import call_ai_server, acall_ai_server
+from .control import apply_ai_result
+from . import timers
+from .voice_cache import voice_cache
+from .events import broker
+from .signals import push_device_changes
+
+import asyncio
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+import json
 from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+# 배치 업로드 한 번에 받을 수 있는 최대 센서 데이터 수
+SENSOR_BATCH_MAX_SIZE = getattr(settings, "SENSOR_BATCH_MAX_SIZE", 500)
+
 
-# AI 서버
-AI_SERVER_URL = getattr(settings, "AI_SERVER_URL", "http://localhost:8001/llm/run")
-def call_ai_server(text: str) -> dict:
+def parse_datetime_param(params, name):
+    """
+    ?since= / ?until= 같은 ISO 8601 쿼리 파라미터 (없으면 None, 형식 오류는 400)
+    - 오프셋(+09:00, Z)이 있어도 없어도 됨: DB 설정(USE_TZ)에 맞는 naive / aware 값으로 변환
+    """
+    value = params.get(name)
+    if not value:
+        return None
     try:
-        res = requests.post(
-            AI_SERVER_URL,
-            json={"text": text},
-            timeout=3
-        )
-        return res.json()
-    except Exception as e:
-        return {"action": "error", "message": str(e)}
+        parsed = parse_datetime(value)
+    except ValueError:  # 형식은 맞지만 없는 날짜 (2026-02-30 등)
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "날짜 형식이 올바르지 않습니다. (ISO 8601)"})
+    if settings.USE_TZ and timezone.is_naive(parsed):
+        return timezone.make_aware(parsed)
+    if not settings.USE_TZ and timezone.is_aware(parsed):
+        return timezone.make_naive(parsed, timezone.get_default_timezone())
+    return parsed
+
 
 # ------------------------
 # 기본 CRUD 뷰셋
@@ -41,8 +82,7 @@ class TeamViewSet(viewsets.ModelViewSet):
         team_id = kwargs.get("pk")
 
         # 해당 유저의 역할 확인
-        team_user = TeamUser.objects.filter(user__user_id=user_id, team__team_id=team_id).first()
-        if not team_user or team_user.role != "admin":
+        if roles.get_role(user_id, team_id) != "admin":
             return Response({"error": "관리자만 팀을 삭제할 수 있습니다."}, status=403)
 
         # 팀 삭제
@@ -60,6 +100,36 @@ class DeviceViewSet(viewsets.ModelViewSet):
     queryset = Device.objects.all()
     serializer_class = DeviceSerializer
 
+    # 조건부 GET: last_sync만 조회해서 변경 없으면 직렬화 없이 304
+    def retrieve(self, request, *args, **kwargs):
+        last_sync = Device.objects.filter(
+            pk=kwargs["pk"]
+        ).values_list("last_sync", flat=True).first()
+        if last_sync is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = conditional.make_etag("device", kwargs["pk"], last_sync.timestamp())
+        cached = conditional.not_modified(request, etag, last_sync)
+        if cached:
+            return cached
+
+        response = super().retrieve(request, *args, **kwargs)
+        return conditional.with_validators(response, etag, last_sync)
+
+    def list(self, request, *args, **kwargs):
+        state = Device.objects.aggregate(count=Count("pk"), last_sync=Max("last_sync"))
+        last_sync = state["last_sync"]
+
+        etag = conditional.make_etag(
+            "devices", state["count"], last_sync.timestamp() if last_sync else 0
+        )
+        cached = conditional.not_modified(request, etag, last_sync)
+        if cached:
+            return cached
+
+        response = super().list(request, *args, **kwargs)
+        return conditional.with_validators(response, etag, last_sync)
+
     def partial_update(self, request, *args, **kwargs):
         """선풍기 수동 제어 (전원, 풍속, 각도 등)"""
         device = self.get_object()
@@ -81,65 +151,312 @@ class TeamDeviceViewSet(viewsets.ModelViewSet):
     serializer_class = TeamDeviceSerializer
 
 
-class SensorDataViewSet(viewsets.ModelViewSet):
+class SensorDataViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = SensorData.objects.all().order_by('-created_at')
     serializer_class = SensorDataSerializer
+    pagination_class = SensorDataCursorPagination
 
     # 센서 데이터 권한 필터링
     def get_queryset(self):
         user_id = self.request.query_params.get("user_id")
         team_id = self.request.query_params.get("team_id")
 
-        qs = SensorData.objects.all().order_by('-created_at')
+        qs = SensorData.objects.all()
 
         # 필수 파라미터 없으면 차단
         if not user_id or not team_id:
             return SensorData.objects.none()
 
-        team_user = TeamUser.objects.filter(
-            user__user_id=user_id,
-            team__team_id=team_id
-        ).first()
+        role = roles.get_role(user_id, team_id)
 
-        if not team_user:
+        if not role:
             return SensorData.objects.none()
 
         # 일반 user → 팀에 속한 디바이스 센서만
-        if team_user.role == "user":
-            return qs.filter(
+        if role == "user":
+            qs = qs.filter(
                 device__teamdevice__team__team_id=team_id
             )
 
         # admin / sub_admin → 전체 조회
+        return self.filter_queryset_params(qs)
+
+    def filter_queryset_params(self, qs):
+        """device / since / until 필터 (인덱스 범위 조회)"""
+        params = self.request.query_params
+
+        device_id = params.get("device")
+        if device_id:
+            qs = qs.filter(device_id=device_id)
+
+        for name, lookup in (("since", "created_at__gte"), ("until", "created_at__lt")):
+            value = self.parse_datetime_param(name)
+            if value is not None:
+                qs = qs.filter(**{lookup: value})
+
         return qs
 
+    def parse_datetime_param(self, name):
+        return parse_datetime_param(self.request.query_params, name)
+
     def create(self, request, *args, **kwargs):
         """라즈베리파이 → 서버로 센서 데이터 업로드"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+
+        # write-behind 모드: 큐에 넣고 바로 응답 (저장은 백그라운드)
+        if write_behind.SENSOR_WRITE_BEHIND:
+            return self.enqueue([SensorData(**serializer.validated_data)])
+
         self.perform_create(serializer)
+        apply_derived([serializer.instance])
 
         device = serializer.validated_data.get('device')
-        if device:
-            temp = serializer.validated_data.get('temperature')
-            # 온도 기반 자동 풍속 제어
-            if temp:
-                if temp > 30:
-                    device.fan_speed = 3
-                elif temp > 25:
-                    device.fan_speed = 2
-                else:
-                    device.fan_speed = 1
-                device.last_sync = timezone.now()
-                device.save()
+        temp = serializer.validated_data.get('temperature')
+        dust = serializer.validated_data.get('dust_density')
+        if device and (temp or dust is not None):
+            # 온도 / 미세먼지 기반 자동 풍속 제어 (바뀔 때만 저장)
+            auto_speed.apply(device, temp, dust)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request):
+        """
+        센서 데이터 일괄 업로드 (여러 디바이스 가능)
+        - 항목별로 검증 후 통과한 것만 bulk insert
+        - 자동 풍속은 디바이스당 가장 마지막 측정값으로 한 번만 적용
+        - Idempotency-Key 헤더가 있으면 같은 키는 한 번만 저장 (재전송 시 200 + duplicate)
+        """
+        readings = request.data
+        if isinstance(readings, dict):
+            readings = readings.get("readings")
+
+        if not isinstance(readings, list) or not readings:
+            return Response({"error": "readings 배열이 필요합니다."}, status=400)
+
+        if len(readings) > SENSOR_BATCH_MAX_SIZE:
+            return Response(
+                {"error": f"한 번에 최대 {SENSOR_BATCH_MAX_SIZE}개까지 업로드할 수 있습니다."},
+                status=400
+            )
+
+        # 디바이스는 한 번의 쿼리로 조회
+        device_ids = {
+            str(item.get("device")) for item in readings
+            if isinstance(item, dict) and item.get("device") is not None
+        }
+        devices = Device.objects.in_bulk(list(device_ids))
+
+        results = []
+        rows = []
+        for index, item in enumerate(readings):
+            serializer = SensorDataBatchItemSerializer(
+                data=item, context={"devices": devices}
+            )
+            if not serializer.is_valid():
+                results.append({
+                    "index": index,
+                    "status": "rejected",
+                    "errors": serializer.errors
+                })
+                continue
+
+            rows.append(SensorData(**serializer.validated_data))
+            results.append({"index": index, "status": "accepted"})
+
+        if not rows:
+            return Response({
+                "accepted": 0,
+                "rejected": len(readings),
+                "results": results
+            }, status=400)
+
+        key = request.headers.get("Idempotency-Key")
+        duplicate = Response({"message": "이미 처리된 요청입니다.", "duplicate": True})
+
+        if write_behind.SENSOR_WRITE_BEHIND:
+            # 키는 플러셔가 저장과 같은 트랜잭션에서 기록 (큐에 못 넣거나 저장이 실패하면 재시도 가능)
+            if key and (idempotency.seen(key) or write_behind.buffer.is_pending(key)):
+                return duplicate
+            response = self.enqueue(rows, key)
+            if response.status_code == 202:
+                response.data["results"] = results
+            return response
+
+        with commands.batched(), transaction.atomic():
+            if key and not idempotency.claim(key):
+                return duplicate
+            save_readings(rows)
+
+        return Response({
+            "accepted": len(rows),
+            "rejected": len(readings) - len(rows),
+            "results": results
+        }, status=status.HTTP_201_CREATED)
+
+    def enqueue(self, rows, key=None):
+        if not write_behind.buffer.offer(rows, key):
+            return Response(
+                {"error": "서버가 바쁩니다. 잠시 후 다시 보내주세요."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": "1"}
+            )
+        return Response({
+            "message": "저장 대기열에 추가되었습니다.",
+            "accepted": len(rows)
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path='write-behind')
+    def write_behind_stats(self, request):
+        """write-behind 버퍼 상태 (대기 / 저장 / 거절 / 중복 / 실패 건수)"""
+        return Response(write_behind.buffer.stats())
+
+    @action(detail=False, methods=['get'], url_path='auto-speed')
+    def auto_speed_stats(self, request):
+        """자동 풍속 제어 상태 (실제 저장 / 변경 없어 생략한 횟수)"""
+        return Response(auto_speed.stats())
+
+    @action(detail=False, methods=['get'], url_path='latest')
+    def latest(self, request):
+        """
+        가장 최근 센서 데이터 1건 (?device= 로 디바이스 지정)
+        - 최신 sensor_id가 같으면 304 (인덱스만 조회, 직렬화 없음)
+        """
+        qs = self.get_queryset().order_by("-created_at", "-sensor_id")
+        head = qs.values_list("sensor_id", "created_at").first()
+        if head is None:
+            return Response({"error": "센서 데이터 없음"}, status=404)
+
+        sensor_id, created_at = head
+        etag = conditional.make_etag("sensor", sensor_id)
+        cached = conditional.not_modified(request, etag, created_at)
+        if cached:
+            return cached
+
+        reading = SensorData.objects.get(sensor_id=sensor_id)
+        response = Response(SensorDataSerializer(reading).data)
+        return conditional.with_validators(response, etag, created_at)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        센서 데이터 스트리밍 내보내기
+        - ?output=ndjson (기본) / csv
+        - 권한 / device / since / until 필터는 목록 조회와 동일
+        ※ DRF가 ?format= 을 렌더러 선택에 쓰므로 output 파라미터 사용
+        """
+        if not roles.get_role(request.query_params.get("user_id"), request.query_params.get("team_id")):
+            return Response({"error": "접근 권한 없음"}, status=403)
+
+        output = request.query_params.get("output", "ndjson")
+        if output not in export.FORMATS:
+            return Response({"error": "output은 ndjson 또는 csv 입니다."}, status=400)
+
+        encode, content_type, extension = export.FORMATS[output]
+        chunks = encode(self.get_queryset())
+        if isinstance(request._request, ASGIRequest):
+            chunks = export.async_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="sensors.{extension}"'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='rollup')
+    def rollup(self, request):
+        """
+        센서 집계 조회 (차트용)
+        - device 필수, since / until 미지정 시 최근 24시간
+        - resolution(minute/hour/day)은 최소 해상도, 기간이 길면 더 굵은 해상도로 자동 전환
+        """
+        device_id = request.query_params.get("device")
+        if not device_id:
+            return Response({"error": "device는 필수입니다."}, status=400)
+
+        # 권한 확인: get_queryset과 같은 규칙 (user는 팀 디바이스만)
+        team_id = request.query_params.get("team_id")
+        role = roles.get_role(request.query_params.get("user_id"), team_id)
+        if not role:
+            return Response({"error": "접근 권한 없음"}, status=403)
+
+        devices = Device.objects.filter(device_id=device_id)
+        if role == "user":
+            devices = devices.filter(teamdevice__team__team_id=team_id)
+        if not devices.exists():
+            return Response({"error": "접근 권한 없음"}, status=403)
+
+        requested = request.query_params.get("resolution")
+        if requested and requested not in rollup.RESOLUTIONS:
+            return Response({"error": "resolution은 minute, hour, day 중 하나입니다."}, status=400)
+
+        until = self.parse_datetime_param("until") or timezone.now()
+        since = self.parse_datetime_param("since") or until - timedelta(days=1)
+        if since >= until:
+            return Response({"error": "since는 until보다 이전이어야 합니다."}, status=400)
+
+        resolution = rollup.choose_resolution(since, until, requested)
+        rows = SensorRollup.objects.filter(
+            device_id=device_id,
+            resolution=resolution,
+            bucket_start__gte=rollup.RESOLUTIONS[resolution][1](since),
+            bucket_start__lt=until,
+        ).order_by("bucket_start")
+
+        return Response({
+            "device": device_id,
+            "resolution": resolution,
+            "since": since,
+            "until": until,
+            "buckets": SensorRollupSerializer(rows, many=True).data
+        })
+
+
+class AlertViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    알림 조회 (센서 데이터와 같은 권한 규칙)
+    - ?device= / ?since= 필터, 최근 알림부터
+    """
+    queryset = Alert.objects.all().order_by('-last_seen')
+    serializer_class = AlertSerializer
+
+    def get_queryset(self):
+        params = self.request.query_params
+        role = roles.get_role(params.get("user_id"), params.get("team_id"))
+        if not role:
+            return Alert.objects.none()
+
+        qs = Alert.objects.all().order_by('-last_seen', '-alert_id')
+        if role == "user":
+            qs = qs.filter(device__teamdevice__team__team_id=params.get("team_id"))
+
+        if params.get("device"):
+            qs = qs.filter(device_id=params.get("device"))
+        since = parse_datetime_param(params, "since")
+        if since is not None:
+            qs = qs.filter(last_seen__gte=since)
+        return qs
+
+    @action(detail=False, methods=['get'], url_path='stats')
+    def stats(self, request):
+        """알림 파이프라인 상태 (생성 / 중복 / 속도 제한 / 전달 대기)"""
+        return Response(alert_pipeline.stats())
+
 
-class FilterStatusViewSet(viewsets.ModelViewSet):
+class FilterStatusViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = FilterStatus.objects.all().order_by('-filter_id')
     serializer_class = FilterStatusSerializer
 
+    @action(detail=False, methods=['get'], url_path='current')
+    def current(self, request):
+        """디바이스의 현재 필터 상태 (?device=, 가장 최근 FilterStatus 1건)"""
+        device_id = request.query_params.get("device")
+        if not device_id:
+            return Response({"error": "device는 필수입니다."}, status=400)
+
+        status_row = FilterStatus.objects.filter(device_id=device_id).order_by('-filter_id').first()
+        if not status_row:
+            return Response({"error": "필터 정보 없음"}, status=404)
+        return Response(FilterStatusSerializer(status_row).data)
+
 
 # ------------------------
 # 추가 제어 기능 (AI / 음성 / 알림)
@@ -159,65 +476,330 @@ def control_fan(request):
 
     ai_result = call_ai_server(voice)
 
-    action = ai_result.get("action")
+    body, status_code, changed = apply_ai_result(device, ai_result)
 
-    # AI 서버 에러
-    if action == "error":
-        return Response({
-            "error": "AI 서버 오류",
-            "detail": ai_result.get("message")
-        }, status=502)
+    # 타이머 설정 / 취소 ({"timer": 초} / {"timer": null}), 잘못된 값이면 디바이스도 저장하지 않음
+    timer = status_code == 200 and "timer" in ai_result
+    if timer:
+        try:
+            seconds = timers.parse_seconds(ai_result["timer"])
+        except ValueError as e:
+            return Response({"error": str(e), "ai_result": ai_result}, status=400)
 
-    # 처리할 명령 없음
-    if action == "none":
-        return Response({
-            "message": "처리할 명령이 없습니다.",
-            "ai_result": ai_result
-        }, status=200)
+    if changed:
+        device.save()
+    if timer:
+        body["timer"] = timers.set_timer(device.device_id, seconds)
 
-    # AI 오류
-    VALID_ACTIONS = {"off", "on", "rotate", "following", "tracking", "none"}
+    return Response(body, status=status_code)
 
-    if action not in VALID_ACTIONS:
-        return Response({
-            "error": "알 수 없는 AI action",
-            "action": action
-        }, status=400)
 
-    # 실제 제어 로직
-    fan_speed = ai_result.get("fan_speed")
-    angle = ai_result.get("angle")
+@csrf_exempt
+async def control_fan_async(request):
+    """
+    control_fan의 ASGI 버전 (ytz.asgi:application 으로 실행)
+    - AI 서버 응답을 기다리는 동안 워커 스레드를 점유하지 않음
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST만 지원합니다."}, status=405)
 
-    if action == "off":
-        device.power_state = False
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "JSON 형식이 올바르지 않습니다."}, status=400)
 
-    elif action == "on":
-        device.power_state = True
-        if fan_speed is not None:
-            device.fan_speed = fan_speed
+    device_id = data.get("device_id")
+    voice = data.get("voice_command")
 
-    elif action == "rotate":
-        if angle is not None:
-            device.angle = angle
+    device = await Device.objects.filter(device_id=device_id).afirst()
+    if not device:
+        return JsonResponse({"error": "디바이스 없음"}, status=404)
 
-    device.last_sync = timezone.now()
-    device.save()
+    if not voice:
+        return JsonResponse({"error": "음성명령 없음"}, status=400)
+
+    ai_result = await acall_ai_server(voice)
+
+    body, status_code, changed = apply_ai_result(device, ai_result)
+
+    timer = status_code == 200 and "timer" in ai_result
+    if timer:
+        try:
+            seconds = timers.parse_seconds(ai_result["timer"])
+        except ValueError as e:
+            return JsonResponse(
+                {"error": str(e), "ai_result": ai_result},
+                status=400, json_dumps_params={"ensure_ascii": False}
+            )
+
+    if changed:
+        await device.asave()
+    if timer:
+        body["timer"] = await sync_to_async(timers.set_timer)(device.device_id, seconds)
+
+    return JsonResponse(body, status=status_code, json_dumps_params={"ensure_ascii": False})
+
+# 스트림 연결 유지용 주석 전송 간격 (초)
+DEVICE_STREAM_HEARTBEAT = getattr(settings, "DEVICE_STREAM_HEARTBEAT", 15)
+
+# 명령 long-poll 기본 / 최대 대기 시간 (초)
+DEVICE_COMMAND_POLL_TIMEOUT = getattr(settings, "DEVICE_COMMAND_POLL_TIMEOUT", 25)
+DEVICE_COMMAND_POLL_MAX = getattr(settings, "DEVICE_COMMAND_POLL_MAX", 60)
 
-    return Response({
-        "message": "AI 명령 처리 완료",
-        "device": DeviceSerializer(device).data,
-        "ai_result": ai_result
-    })
+
+def sse_message(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def device_stream(request):
+    """
+    디바이스 상태 변경 푸시 (Server-Sent Events, ASGI 전용)
+    - ?device_id=a&device_id=b       → 해당 디바이스 변경분
+    - ?team_id=1&user_id=u           → 팀 전체 디바이스 변경분 (팀원만)
+    - 연결 직후 현재 상태 snapshot 1회, 이후 변경된 필드만 전송
+    """
+    device_ids = request.GET.getlist("device_id")
+    team_id = request.GET.get("team_id")
+
+    if not device_ids and not team_id:
+        return JsonResponse({"error": "device_id 또는 team_id가 필요합니다."}, status=400)
+
+    topics = [f"device:{device_id}" for device_id in device_ids]
+    devices = Device.objects.filter(device_id__in=device_ids)
+
+    if team_id:
+        role = await sync_to_async(roles.get_role)(request.GET.get("user_id"), team_id)
+        if not role:
+            return JsonResponse({"error": "접근 권한 없음"}, status=403)
+        topics.append(f"team:{team_id}")
+        devices = devices | Device.objects.filter(teamdevice__team__team_id=team_id)
+
+    # 구독 먼저 → 스냅샷 조회 (사이에 생긴 변경을 놓치지 않도록)
+    subscription = broker.subscribe(topics, loop=asyncio.get_running_loop())
+    snapshot = [DeviceSerializer(device).data async for device in devices.distinct()]
+
+    async def stream():
+        try:
+            yield sse_message("snapshot", {"devices": snapshot})
+            dropped = 0
+            while True:
+                try:
+                    event = await subscription.aget(timeout=DEVICE_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                # 큐가 넘쳐 버려진 이벤트가 있으면 클라이언트가 다시 조회하도록 알림
+                if subscription.dropped != dropped:
+                    dropped = subscription.dropped
+                    yield sse_message("resync", {"dropped": dropped})
+
+                yield sse_message(event["type"], event, event_id=event["id"])
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def device_commands(request):
+    """
+    브릿지(라즈베리파이)용 명령 long-poll (ASGI 전용)
+    - GET ?device_id=&after=<마지막으로 처리한 seq>&timeout=<초>
+    - after 이하 명령은 확인 처리, 이후 명령이 있으면 바로 응답
+    - 없으면 새 명령이 생기거나 timeout까지 대기 후 응답 (commands가 빈 배열일 수 있음)
+    """
+    device_id = request.GET.get("device_id")
+    if not device_id:
+        return JsonResponse({"error": "device_id는 필수입니다."}, status=400)
+
+    try:
+        after = int(request.GET.get("after", 0))
+        timeout = min(float(request.GET.get("timeout", DEVICE_COMMAND_POLL_TIMEOUT)), DEVICE_COMMAND_POLL_MAX)
+    except ValueError:
+        return JsonResponse({"error": "after, timeout은 숫자여야 합니다."}, status=400)
+
+    if not await Device.objects.filter(device_id=device_id).aexists():
+        return JsonResponse({"error": "디바이스 없음"}, status=404)
+
+    # 구독 먼저 → 조회 (사이에 들어온 명령으로 깨어나는 것을 놓치지 않도록)
+    subscription = broker.subscribe([commands.topic(device_id)], loop=asyncio.get_running_loop())
+    try:
+        result = await sync_to_async(commands.pending)(device_id, after)
+        if not result["commands"] and not result["reset"] and timeout > 0:
+            try:
+                await subscription.aget(timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                result = await sync_to_async(commands.pending)(device_id, after)
+    finally:
+        subscription.close()
+
+    return JsonResponse(result, json_dumps_params={"ensure_ascii": False})
+
+@api_view(['GET', 'DELETE'])
+def ai_cache(request):
+    """
+    음성 명령 캐시 상태 조회 (GET) / 무효화 (DELETE)
+    - DELETE에 version을 넘기면 해당 모델/프롬프트 버전으로 교체
+    """
+    if request.method == "DELETE":
+        version = request.data.get("version") or request.query_params.get("version")
+        if version:
+            voice_cache.set_version(version)
+        else:
+            voice_cache.invalidate()
+
+    return Response(voice_cache.stats())
 
 @api_view(['POST'])
 def send_alert(request):
     """
     알림 전송 (고온, 배터리 부족 등)
+    - 같은 알림 반복은 중복 제거, 디바이스별 속도 제한
+    - 실제 전달은 백그라운드에서 묶어서 처리
     """
     event = request.data.get("event")
     device_id = request.data.get("device_id")
-    print(f"[ALERT] {device_id} - {event}")
-    return Response({"message": f"Alert '{event}' sent for {device_id}"})
+
+    if not event or not device_id:
+        return Response({"error": "device_id, event는 필수입니다."}, status=400)
+
+    if not Device.objects.filter(device_id=device_id).exists():
+        return Response({"error": "디바이스 없음"}, status=404)
+
+    result, alert = alert_pipeline.raise_alert(device_id, str(event)[:100])
+
+    if result == "rate_limited":
+        return Response({
+            "message": "알림이 너무 많아 일시적으로 무시되었습니다.",
+            "status": result
+        }, status=429)
+
+    return Response({
+        "message": f"Alert '{event}' sent for {device_id}",
+        "status": result,
+        "alert_id": alert.alert_id if alert else None
+    }, status=201 if alert else 200)
+
+@api_view(['GET', 'POST', 'DELETE'])
+def device_timer(request):
+    """
+    전원 끄기 타이머
+    - GET ?device_id=     → 남은 시간 (device_id 없으면 스케줄러 상태)
+    - POST {device_id, timer}  → 설정 / 교체 (timer: 초, null이면 취소)
+    - DELETE {device_id}  → 취소
+    """
+    if request.method == "GET":
+        device_id = request.query_params.get("device_id")
+        if not device_id:
+            return Response(timers.scheduler.stats())
+        return Response(timers.timer_status(device_id))
+
+    device_id = request.data.get("device_id") or request.query_params.get("device_id")
+    if not Device.objects.filter(device_id=device_id).exists():
+        return Response({"error": "디바이스 없음"}, status=404)
+
+    seconds = request.data.get("timer") if request.method == "POST" else None
+    if request.method == "POST" and "timer" not in request.data:
+        return Response({"error": "timer는 필수입니다. (취소는 null)"}, status=400)
+
+    try:
+        return Response(timers.set_timer(device_id, seconds))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+@api_view(['GET', 'POST'])
+def device_auto_speed(request):
+    """
+    브릿지 로컬 자동 풍속 제어
+    - GET ?device_id=  → 제어 정책 (바뀌지 않았으면 304)
+      device_id를 주면 로컬 제어 중으로 표시 → AUTO_SPEED_LOCAL_TTL 동안 서버 자동 풍속 생략
+      응답에 그 디바이스의 power_state 포함 (앱 / 타이머로 꺼지면 브릿지도 자동 제어 중지)
+    - POST {device_id, fan_speed, ...}  → 브릿지가 내린 풍속 결정 보고 (Device.fan_speed 반영)
+    """
+    if request.method == "GET":
+        device_id = request.query_params.get("device_id")
+        power_state = None
+        if device_id:
+            auto_speed.touch(device_id)
+            power_state = Device.objects.filter(device_id=device_id).values_list("power_state", flat=True).first()
+
+        etag = conditional.make_etag("auto-speed", fan_control.POLICY_VERSION, power_state)
+        cached = conditional.not_modified(request, etag)
+        if cached:
+            return cached
+        body = fan_control.policy()
+        if power_state is not None:
+            body["power_state"] = power_state
+        return conditional.with_validators(Response(body), etag)
+
+    device_id = request.data.get("device_id")
+    try:
+        speed = int(request.data.get("fan_speed"))
+    except (TypeError, ValueError):
+        return Response({"error": "fan_speed는 정수입니다."}, status=400)
+    if speed < 1 or speed > max(fan_control.LEVELS):
+        return Response({"error": f"fan_speed는 1~{max(fan_control.LEVELS)} 사이여야 합니다."}, status=400)
+
+    device = Device.objects.filter(device_id=device_id).first()
+    if device is None:
+        return Response({"error": "디바이스 없음"}, status=404)
+
+    changed = auto_speed.report(device, speed)
+    return Response({"device_id": device_id, "fan_speed": speed, "changed": changed})
+
+@api_view(['POST'])
+def device_heartbeat(request):
+    """
+    브릿지 heartbeat (last_heartbeat, last_sync, battery_level, ip_address만 갱신)
+    - DEVICE_HEARTBEAT_WINDOW 안에 같은 값으로 다시 오면 DB 쓰기 생략
+    """
+    serializer = DeviceHeartbeatSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    device_id = data["device_id"]
+
+    result = heartbeats.beat(
+        device_id,
+        battery_level=data.get("battery_level"),
+        ip_address=data.get("ip_address"),
+    )
+    if result == "unknown":
+        return Response({"error": "디바이스 없음 (device/register/ 먼저 호출)"}, status=404)
+
+    return Response({"device_id": device_id, "status": result})
+
+
+@api_view(['GET'])
+def device_presence(request):
+    """
+    디바이스 접속 상태 (마지막 heartbeat 기준 online / offline)
+    - ?device_id=a&device_id=b  또는  ?team_id=&user_id= (팀 전체, 팀원만)
+    - 둘 다 없으면 heartbeat 처리 통계
+    """
+    device_ids = request.query_params.getlist("device_id")
+    team_id = request.query_params.get("team_id")
+
+    if team_id:
+        if not roles.get_role(request.query_params.get("user_id"), team_id):
+            return Response({"error": "접근 권한 없음"}, status=403)
+        device_ids += list(
+            TeamDevice.objects.filter(team_id=team_id).values_list("device_id", flat=True)
+        )
+
+    if not device_ids:
+        return Response(heartbeats.stats())
+
+    return Response({"devices": heartbeats.presence(list(dict.fromkeys(device_ids)))})
 
 # 디바이스 등록
 @api_view(['POST'])
@@ -229,12 +811,18 @@ def register_device(request):
     if not device_id:
         return Response({"error": "device_id 필수"}, status=400)
 
+    # 이미 등록된 디바이스는 접속 정보만 갱신 (전원/풍속/각도는 처음 등록할 때만 초기화)
     device, created = Device.objects.update_or_create(
         device_id=device_id,
         defaults={
             "ip_address": ip_address,
             "battery_level": battery_level,
             "last_sync": timezone.now(),
+        },
+        create_defaults={
+            "ip_address": ip_address,
+            "battery_level": battery_level,
+            "last_sync": timezone.now(),
             "power_state": False,
             "fan_speed": 1,
             "angle": 0.0,
@@ -459,21 +1047,117 @@ def get_my_teams(request):
 
     return Response({"teams": result}, status=200)
 
+# 홈 화면 대시보드 (팀 / 역할 / 디바이스 상태 / 최신 센서 / 최신 필터)
+@api_view(["GET"])
+def team_dashboard(request):
+    """
+    사용자가 속한 팀 전체를 한 번에 조회
+    - 팀 수, 디바이스 수와 상관없이 쿼리 3번
+      (팀원 정보, 팀 디바이스 + 최신 센서값, 디바이스별 최신 필터)
+    """
+    user_id = request.query_params.get("user_id")
+    if not user_id:
+        return Response({"error": "user_id는 필수입니다."}, status=400)
+
+    team_users = list(
+        TeamUser.objects.filter(user_id=user_id).select_related("team").order_by("team_id")
+    )
+
+    team_devices = TeamDevice.objects.filter(
+        team_id__in=[tu.team_id for tu in team_users]
+    ).select_related("device", "device__latest_reading").order_by("device_id")
+
+    devices_by_team = {}
+    device_ids = set()
+    for td in team_devices:
+        devices_by_team.setdefault(td.team_id, []).append(td.device)
+        device_ids.add(td.device_id)
+
+    latest_filter_ids = FilterStatus.objects.filter(
+        device_id__in=device_ids
+    ).values("device_id").annotate(last=Max("filter_id")).values("last")
+    filters = {
+        f.device_id: f for f in FilterStatus.objects.filter(
+            filter_id__in=Subquery(latest_filter_ids)
+        )
+    }
+
+    result = []
+    for tu in team_users:
+        devices = []
+        for device in devices_by_team.get(tu.team_id, []):
+            latest = getattr(device, "latest_reading", None)
+            latest_filter = filters.get(device.device_id)
+            devices.append({
+                "device": DeviceSerializer(device).data,
+                "latest_sensor": LatestSensorDataSerializer(latest).data if latest else None,
+                "latest_filter": FilterStatusSerializer(latest_filter).data if latest_filter else None,
+            })
+        result.append({
+            "team_id": tu.team.team_id,
+            "team_name": tu.team.team_name,
+            "role": tu.role,
+            "devices": devices
+        })
+
+    return Response({"teams": result}, status=200)
+
 # 팀별 권한 분리
 @api_view(['GET'])
 def get_my_role(request):
     user_id = request.query_params.get("user_id")
     team_id = request.query_params.get("team_id")
 
-    team_user = TeamUser.objects.filter(
-        user__user_id=user_id,
-        team__team_id=team_id
-    ).first()
+    role = roles.get_role(user_id, team_id)
 
-    if not team_user:
+    if not role:
+        return Response({"error": "접근 권한 없음"}, status=403)
+
+    return Response({"role": role})
+
+# 팀 디바이스 일괄 제어 (예: 퇴근 시 팀 선풍기 전체 끄기)
+@api_view(['POST'])
+def team_device_command(request):
+    """
+    팀 디바이스 일괄 제어 (팀원)
+    - device_ids 생략 시 팀에 등록된 디바이스 전체
+    - 한 트랜잭션에서 bulk_update, 변경된 디바이스 상태 반환
+    """
+    serializer = DeviceCommandSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+
+    if not roles.get_role(data["user_id"], data["team_id"]):
         return Response({"error": "접근 권한 없음"}, status=403)
 
-    return Response({"role": team_user.role})
+    command = {
+        field: data[field] for field in DeviceCommandSerializer.COMMAND_FIELDS
+        if field in data
+    }
+    fields = list(command) + ["last_sync"]
+    now = timezone.now()
+
+    with commands.batched(), transaction.atomic():
+        devices = Device.objects.select_for_update().filter(
+            teamdevice__team__team_id=data["team_id"]
+        ).order_by("device_id")
+        if "device_ids" in data:
+            devices = devices.filter(device_id__in=data["device_ids"])
+        devices = list(devices)
+
+        for device in devices:
+            for field, value in command.items():
+                setattr(device, field, value)
+            device.last_sync = now
+
+        Device.objects.bulk_update(devices, fields)
+        for device in devices:
+            push_device_changes(device)
+
+    return Response({
+        "updated": len(devices),
+        "devices": DeviceSerializer(devices, many=True).data
+    })
 
 #------------------------------
 # admin 전용 기능
@@ -488,13 +1172,7 @@ def set_sub_admin(request):
     if not team_user:
         return Response({"error": "대상 사용자가 없습니다."}, status=404)
 
-    admin = TeamUser.objects.filter(
-        user__user_id=admin_id,
-        team=team_user.team,
-        role="admin"
-    ).first()
-
-    if not admin:
+    if roles.get_role(admin_id, team_user.team_id) != "admin":
         return Response({"error": "권한 없음"}, status=403)
 
     team_user.role = "sub_admin"
@@ -513,16 +1191,10 @@ def team_password(request):
     new_password = request.data.get("new_password")  # optional
 
     # admin 권한 확인
-    admin = TeamUser.objects.filter(
-        user__user_id=admin_id,
-        team__team_id=team_id,
-        role="admin"
-    ).first()
-
-    if not admin:
+    if roles.get_role(admin_id, team_id) != "admin":
         return Response({"error": "관리자만 접근 가능합니다."}, status=403)
 
-    team = admin.team
+    team = Team.objects.get(team_id=team_id)
 
     # 비밀번호 변경 요청이 있는 경우
     if new_password:
@@ -550,13 +1222,7 @@ def remove_team_user(request):
     team_id = request.data.get("team_id")
     target_user_id = request.data.get("target_user_id")
 
-    requester = TeamUser.objects.filter(
-        user__user_id=requester_id,
-        team__team_id=team_id,
-        role__in=["admin", "sub_admin"]
-    ).first()
-
-    if not requester:
+    if roles.get_role(requester_id, team_id) not in ("admin", "sub_admin"):
         return Response({"error": "권한이 없습니다."}, status=403)
 
     target = TeamUser.objects.filter(
@@ -0,0 +1,113 @@
+"""
+음성 명령 → AI 결과 캐시
+
+- 키: 정규화한 명령 문장 (공백/문장부호/조사 제거, 소문자)
+  예) "선풍기 좀 켜줘요!" → "선풍기켜줘"
+- TTL + LRU 제거, hit/miss 카운터
+- AI 서버 모델/프롬프트 버전이 바뀌면 전체 무효화
+  (응답의 model_version / prompt_version 값, 또는 set_version() 호출)
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+VOICE_CACHE_MAX_SIZE = getattr(settings, "VOICE_CACHE_MAX_SIZE", 1000)
+VOICE_CACHE_TTL = getattr(settings, "VOICE_CACHE_TTL", 3600)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+# 단어 끝 조사 / 어미 (긴 것부터 검사)
+_PARTICLES = ("에서", "으로", "을", "를", "은", "는", "이", "가", "로", "에", "요")
+# 의미 없는 단어
+_FILLERS = {"좀", "제발", "한번", "그냥"}
+
+
+def normalize(text):
+    words = []
+    for word in _PUNCTUATION.sub(" ", text.lower()).split():
+        if word in _FILLERS:
+            continue
+        for particle in _PARTICLES:
+            if len(word) > len(particle) and word.endswith(particle):
+                word = word[:-len(particle)]
+                break
+        words.append(word)
+    return "".join(words)
+
+
+def result_version(result):
+    """AI 응답에 포함된 모델/프롬프트 버전 (없으면 None)"""
+    parts = [
+        str(result[name]) for name in ("model_version", "prompt_version")
+        if result.get(name) is not None
+    ]
+    return ":".join(parts) or None
+
+
+class VoiceCommandCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = getattr(settings, "AI_MODEL_VERSION", None)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, text):
+        key = normalize(text)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, text, result):
+        # 에러 응답은 캐시하지 않음
+        if result.get("action") == "error":
+            return
+
+        version = result_version(result)
+        key = normalize(text)
+        with self.lock:
+            if version is not None and version != self.version:
+                self.entries.clear()
+                self.version = version
+            self.entries[key] = (time.monotonic() + self.ttl, dict(result))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def set_version(self, version):
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else None,
+            }
+
+
+voice_cache = VoiceCommandCache(VOICE_CACHE_MAX_SIZE, VOICE_CACHE_TTL)
@@ -0,0 +1,229 @@
+"""
+센서 데이터 write-behind 버퍼 (settings.SENSOR_WRITE_BEHIND = True 일 때)
+
+- 요청은 검증 후 큐에 넣고 바로 202 응답 → 응답 시간이 DB 커밋과 무관
+- 백그라운드 스레드가 INTERVAL_MS마다 또는 BATCH_SIZE개가 모이면 ingest.save_readings()
+- 큐가 가득 차면 offer()가 False → 뷰에서 429
+- 프로세스 종료(atexit) 시 남은 데이터 모두 저장
+
+- Idempotency-Key는 저장과 같은 트랜잭션에서 기록 (저장이 실패하면 키도 남지 않음)
+  대기 중인 키로 다시 오면 뷰에서 중복 처리, 그래도 겹친 요청은 저장 시 키 기록이 실패해서 건너뜀
+- 디바이스는 저장 시점에 다시 조회 (자동 풍속 / 필터 가중치가 요청 시점의 fan_speed를 쓰지 않도록)
+  큐에 있는 동안 삭제된 디바이스의 행은 버림 (dropped)
+- 저장 실패 시
+  - 일시적 오류(DB 연결 끊김 / 락 타임아웃 등 OperationalError): 요청 단위로 큐에 되돌려 재시도
+    (MAX_RETRIES번까지, 재시도 전 RETRY_DELAY_MS 대기)
+  - 그 밖의 오류: 요청마다 따로(각자 트랜잭션) 다시 저장 → 잘못된 요청만 버리고 나머지는 저장
+
+※ created_at은 요청 처리 시점(SensorData 생성 시) 값이므로 저장이 늦어져도 수신 시각 유지
+※ 큐는 프로세스 메모리에 있으므로 강제 종료(kill -9) 시 미저장분은 유실됨
+"""
+import atexit
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, close_old_connections, transaction
+
+from . import commands, idempotency
+from .ingest import save_readings
+from .models import Device
+
+SENSOR_WRITE_BEHIND = getattr(settings, "SENSOR_WRITE_BEHIND", False)
+SENSOR_WRITE_BEHIND_QUEUE_SIZE = getattr(settings, "SENSOR_WRITE_BEHIND_QUEUE_SIZE", 10000)
+SENSOR_WRITE_BEHIND_BATCH_SIZE = getattr(settings, "SENSOR_WRITE_BEHIND_BATCH_SIZE", 500)
+SENSOR_WRITE_BEHIND_INTERVAL_MS = getattr(settings, "SENSOR_WRITE_BEHIND_INTERVAL_MS", 200)
+SENSOR_WRITE_BEHIND_MAX_RETRIES = getattr(settings, "SENSOR_WRITE_BEHIND_MAX_RETRIES", 3)
+SENSOR_WRITE_BEHIND_RETRY_DELAY_MS = getattr(settings, "SENSOR_WRITE_BEHIND_RETRY_DELAY_MS", 1000)
+
+# 다시 시도하면 성공할 수 있는 오류
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+class WriteBehindBuffer:
+    """큐 항목은 요청 단위 (rows, key, 재시도 횟수), 용량 / 배치 크기는 행 수 기준"""
+
+    def __init__(self, queue_size, batch_size, interval_ms):
+        self.queue = queue.Queue()
+        self.capacity = queue_size
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000
+        self.offer_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.pending_rows = 0
+        self.pending_keys = set()  # 큐에 있고 아직 저장 안 된 Idempotency-Key
+
+        self.queued = 0
+        self.flushed = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        with self.offer_lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(
+                target=self.run, name="sensor-write-behind", daemon=True
+            )
+            self.thread.start()
+            atexit.register(self.stop)
+
+    def offer(self, rows, key=None):
+        """rows 전체를 큐에 넣음 (공간이 부족하면 하나도 넣지 않고 False)"""
+        if self.thread is None:
+            self.start()
+
+        with self.offer_lock:
+            if self.capacity - self.pending_rows < len(rows):
+                self.rejected += len(rows)
+                return False
+            self.pending_rows += len(rows)
+            if key:
+                self.pending_keys.add(key)
+            self.queue.put_nowait((rows, key, 0))
+            self.queued += len(rows)
+        return True
+
+    def is_pending(self, key):
+        with self.offer_lock:
+            return key in self.pending_keys
+
+    def next_batch(self, timeout=None):
+        try:
+            batch = [self.queue.get(timeout=self.interval if timeout is None else timeout)]
+        except queue.Empty:
+            return []
+
+        count = len(batch[0][0])
+        deadline = time.monotonic() + self.interval
+        while count < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                group = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(group)
+            count += len(group[0])
+        return batch
+
+    def flush(self, batch):
+        """
+        배치 저장 (한 트랜잭션), 실패하면 요청별로 나눠서 처리
+        반환: 큐에 되돌린 요청이 있으면 True
+        """
+        if not batch:
+            return False
+        retry = []
+        try:
+            try:
+                self.commit(batch)
+            except TRANSIENT_ERRORS as e:
+                retry = self.give_up(batch, e, transient=True)
+            except Exception as e:
+                print(f"[WRITE-BEHIND] 배치 저장 실패, 요청별로 다시 저장: {e}")
+                for group in batch:
+                    try:
+                        self.commit([group])
+                    except TRANSIENT_ERRORS as e:
+                        retry += self.give_up([group], e, transient=True)
+                    except Exception as e:
+                        self.give_up([group], e)
+        finally:
+            requeued = {id(group) for group in retry}
+            done = [group for group in batch if id(group) not in requeued]
+            with self.offer_lock:
+                self.pending_rows -= sum(len(rows) for rows, _, _ in done)
+                self.pending_keys.difference_update(key for _, key, _ in done if key)
+                for rows, key, attempts in retry:
+                    self.queue.put_nowait((rows, key, attempts + 1))
+            close_old_connections()
+        return bool(retry)
+
+    def commit(self, batch):
+        """요청 묶음 저장, 키 기록과 저장이 같은 트랜잭션 → 저장이 실패하면 키도 롤백"""
+        with commands.batched(), transaction.atomic():
+            rows, duplicates = [], 0
+            for group, key, _ in batch:
+                if key and not idempotency.claim(key):
+                    duplicates += len(group)
+                    continue
+                rows += group
+            kept = refresh_devices(rows)
+            if kept:
+                save_readings(kept)
+        self.flushed += len(kept)
+        self.duplicates += duplicates
+        self.dropped += len(rows) - len(kept)
+
+    def give_up(self, batch, error, transient=False):
+        """실패한 요청 중 재시도할 것만 반환 (나머지는 failed)"""
+        retry = [group for group in batch if transient and group[2] < SENSOR_WRITE_BEHIND_MAX_RETRIES]
+        count = sum(len(rows) for rows, _, _ in batch)
+        retried = sum(len(rows) for rows, _, _ in retry)
+        self.retried += retried
+        self.failed += count - retried
+        if retried:
+            print(f"[WRITE-BEHIND] {count}건 저장 실패, {retried}건 재시도 예정: {error}")
+        else:
+            print(f"[WRITE-BEHIND] {count}건 저장 실패: {error}")
+        return retry
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.flush(self.next_batch()):
+                self.stop_event.wait(SENSOR_WRITE_BEHIND_RETRY_DELAY_MS / 1000)
+
+    def stop(self):
+        """플러셔 종료 후 남은 데이터를 현재 스레드에서 모두 저장"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+        while True:
+            batch = self.next_batch(timeout=0)
+            if not batch:
+                return
+            self.flush(batch)
+
+    def stats(self):
+        return {
+            "enabled": SENSOR_WRITE_BEHIND,
+            "pending": self.pending_rows,
+            "queued": self.queued,
+            "flushed": self.flushed,
+            "rejected": self.rejected,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+def refresh_devices(rows):
+    """
+    큐에 있는 동안 바뀌었을 수 있는 디바이스 상태(fan_speed, power_state)를 저장 직전에 다시 조회
+    반환: 디바이스가 아직 있는 행 (삭제된 디바이스의 행은 FK 오류로 배치 전체를 실패시키지 않도록 제외)
+    """
+    devices = Device.objects.in_bulk({row.device_id for row in rows})
+    kept = []
+    for row in rows:
+        device = devices.get(row.device_id)
+        if device is not None:
+            row.device = device
+            kept.append(row)
+    return kept
+
+
+buffer = WriteBehindBuffer(
+    SENSOR_WRITE_BEHIND_QUEUE_SIZE,
+    SENSOR_WRITE_BEHIND_BATCH_SIZE,
+    SENSOR_WRITE_BEHIND_INTERVAL_MS,
+)
@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+AI 음성 제어(async) 등 비동기 뷰는 ASGI 서버로 실행해야 효과가 있습니다.
+    uvicorn ytz.asgi:application --host 0.0.0.0 --port 8000
 """
 
 import os
@@ -14,3 +17,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ytz.settings')
 
 application = get_asgi_application()
+
+# 저장된 전원 끄기 타이머 복구 + 스케줄러 시작 (manage.py 명령에서는 실행 안 됨)
+from myapp.timers import scheduler  # noqa: E402
+
+scheduler.start()
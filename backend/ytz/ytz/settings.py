@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 import pymysql
 
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'myapp.metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,6 +93,135 @@ DATABASES = {
 }
 
 
+# Cache
+# default: 프로세스별 메모리 (워커끼리 달라도 되는 값만)
+# shared: 워커 전체가 공유 (무효화가 모든 워커에 보여야 하는 값, 예: 팀 역할)
+#   REDIS_URL 환경변수가 있을 때만 구성, 없으면 팀 역할은 캐시 없이 매번 DB 조회
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "ytz-default",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+if REDIS_URL:
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+
+# 프로세스별 캐시(LocMemCache)를 지정하면 다른 워커에서 역할 변경이 TTL 동안 반영되지 않음
+TEAM_ROLE_CACHE = "shared" if REDIS_URL else None
+TEAM_ROLE_CACHE_TTL = 300  # 초
+
+
+# AI 서버 (myapp/ai_client.py)
+
+AI_SERVER_URL = "http://localhost:8001/llm/run"
+AI_SERVER_CONNECT_TIMEOUT = 1.0  # 초
+AI_SERVER_READ_TIMEOUT = 3.0     # 초
+AI_SERVER_POOL_SIZE = 20
+AI_CIRCUIT_FAILURE_THRESHOLD = 5  # 연속 실패 횟수
+AI_CIRCUIT_RESET_TIMEOUT = 30.0   # 차단 유지 시간 (초)
+AI_CIRCUIT_TRIAL_TIMEOUT = 5.0    # half-open 시험 호출 결과를 기다리는 최대 시간 (초)
+AI_MODEL_VERSION = None           # 바뀌면 음성 명령 캐시 무효화
+
+VOICE_CACHE_MAX_SIZE = 1000
+VOICE_CACHE_TTL = 3600  # 초
+
+
+# 디바이스 상태 푸시 (SSE, /api/device/stream/)
+
+DEVICE_STREAM_QUEUE_SIZE = 100
+DEVICE_STREAM_HEARTBEAT = 15  # 초
+
+
+# 브릿지 명령 long-poll (/api/device/commands/)
+
+DEVICE_COMMAND_POLL_TIMEOUT = 25  # 기본 대기 시간 (초)
+DEVICE_COMMAND_POLL_MAX = 60      # 요청에서 지정할 수 있는 최대 대기 시간 (초)
+
+
+# 디바이스 heartbeat / 접속 상태 (myapp/heartbeat.py)
+
+DEVICE_HEARTBEAT_WINDOW = 30  # 이 시간 안의 같은 값 heartbeat는 DB에 쓰지 않음 (초)
+DEVICE_OFFLINE_AFTER = 90     # 마지막 heartbeat 후 이 시간이 지나면 offline (초)
+
+
+# 온도 / 미세먼지 기반 자동 풍속 (myapp/fan_control.py)
+# 같은 정책을 브릿지가 device/auto-speed/ 로 받아 로컬에서 제어 (hardware/workspace/local_control.py)
+
+AUTO_SPEED_THRESHOLDS = {2: 25.0, 3: 30.0}       # 풍속 단계: 진입 온도(초과)
+AUTO_SPEED_HYSTERESIS = 1.0                      # 내려갈 때 진입 온도보다 이만큼 낮아야 함
+AUTO_SPEED_DUST_THRESHOLDS = {2: 35.0, 3: 75.0}  # 풍속 단계: 진입 PM2.5 (µg/m³ 초과, 보통 / 나쁨 경계)
+AUTO_SPEED_DUST_HYSTERESIS = 5.0
+AUTO_SPEED_PWM = {1: 90, 2: 170, 3: 255}         # 브릿지가 ESP32로 보내는 FAN 명령 값 (0~255)
+AUTO_SPEED_MIN_INTERVAL = 3                      # 브릿지 로컬 제어: 풍속 변경 최소 간격 (초)
+AUTO_SPEED_LOCAL_TTL = 300                       # 브릿지가 로컬 제어 결정을 보고한 뒤 이 시간 동안 서버 자동 풍속 생략 (초)
+AUTO_SPEED_MAX_AGE = 120                         # 이보다 오래된 측정값(재전송분)은 자동 풍속에 쓰지 않음 (초)
+
+
+# 엔드포인트별 SQL 쿼리 예산 (URL 이름: 요청 1건 최대 쿼리 수, GET 기준)
+# 다른 메서드는 "POST sensordata-batch" 처럼 메서드를 앞에 붙여서 지정
+# 초과 시 경고, QUERY_BUDGET_STRICT = True 면 예외 (테스트에서 사용)
+
+QUERY_BUDGETS = {
+    "team_dashboard": 3,
+    "get_my_role": 1,
+    "sensordata-list": 2,
+    "sensordata-latest": 3,
+    "filterstatus-list": 1,
+    "device-list": 2,
+    "device-detail": 2,
+}
+QUERY_BUDGET_STRICT = False
+
+
+# 알림 파이프라인 (myapp/alerts.py)
+
+ALERT_DEDUPE_WINDOW = 600     # 같은 (디바이스, 이벤트)를 하나로 합치는 시간 (초)
+ALERT_RATE_CAPACITY = 10      # 디바이스별 토큰 버킷 크기
+ALERT_RATE_PER_MINUTE = 2     # 분당 토큰 충전량
+ALERT_BATCH_SIZE = 50
+ALERT_BATCH_INTERVAL = 5.0    # 초
+ALERT_SINKS = [
+    "myapp.alerts.ConsoleSink",
+    "myapp.alerts.BrokerSink",
+]
+
+
+# 필터 마모 추정 (myapp/filter_life.py)
+
+FILTER_SPEED_WEIGHTS = {1: 1.0, 2: 1.6, 3: 2.2}  # 풍속 단계별 풍량 가중치
+FILTER_CONDITION_THRESHOLDS = [                  # (누적값 하한, 상태)
+    (0, "good"),
+    (50000, "fair"),
+    (80000, "replace_soon"),
+    (100000, "replace"),
+]
+
+
+# 센서 데이터 write-behind (켜면 업로드는 202 응답 후 백그라운드에서 bulk insert)
+
+SENSOR_WRITE_BEHIND = False
+SENSOR_WRITE_BEHIND_QUEUE_SIZE = 10000
+SENSOR_WRITE_BEHIND_BATCH_SIZE = 500
+SENSOR_WRITE_BEHIND_INTERVAL_MS = 200
+SENSOR_WRITE_BEHIND_MAX_RETRIES = 3        # 일시적 DB 오류 시 요청별 재시도 횟수
+SENSOR_WRITE_BEHIND_RETRY_DELAY_MS = 1000  # 재시도 전 대기
+
+SENSOR_CLOCK_SKEW = 300  # 배치 업로드 측정 시각이 서버보다 앞서도 되는 한도 (초)
+
+
+# 전원 끄기 타이머 (myapp/timers.py)
+
+FAN_TIMER_MAX_SECONDS = 24 * 3600  # 설정 가능한 최대 타이머 (초)
+FAN_TIMER_RETRY_SECONDS = 30       # 실행/복구 실패 시 재시도 간격 (초)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
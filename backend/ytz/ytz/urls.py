@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
+from myapp.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('myapp.urls')),  # myapp 연결
+    path('metrics', metrics_view, name='metrics'),  # Prometheus
 ]
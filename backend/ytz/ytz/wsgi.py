@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ytz.settings')
 
 application = get_wsgi_application()
+
+# 저장된 전원 끄기 타이머 복구 + 스케줄러 시작 (manage.py 명령에서는 실행 안 됨)
+from myapp.timers import scheduler  # noqa: E402
+
+scheduler.start()
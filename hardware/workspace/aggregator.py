@@ -0,0 +1,193 @@
+# aggregator.py
+"""
+센서 프레임 윈도우 집계 (main.py / raspberry.py 공용)
+
+- ESP32 줄마다 업로드하는 대신 고정 길이 윈도우(tumbling, 시계 기준 정렬)마다 채널별
+  count / mean / min / max / last 를 계산해서 윈도우당 1건만 업로드
+  (백엔드 SensorData에는 채널별 평균 저장, ir_detected는 윈도우 안에서 한 번이라도 감지되면 True)
+- 경보 임계값(고온 / 미세먼지 / CO2)을 넘는 순간의 프레임은 윈도우를 기다리지 않고 바로 업로드
+  임계값 아래로 내려갔다가 다시 넘을 때만 다시 보냄 (계속 높은 동안 매 프레임 전송하지 않음)
+- 프레임이 끊겨도 타이머 스레드가 윈도우 끝에 집계 전송
+
+설정 (환경변수)
+- AGGREGATE_WINDOW: 윈도우 길이(초), 0이면 집계하지 않고 프레임마다 업로드
+- ALERT_TEMPERATURE / ALERT_DUST / ALERT_CO2: 즉시 업로드 임계값
+"""
+import os
+import threading
+import time
+from collections import deque
+
+WINDOW_SECONDS = float(os.environ.get("AGGREGATE_WINDOW", "10"))
+ALERT_THRESHOLDS = {
+    "temperature": float(os.environ.get("ALERT_TEMPERATURE", "35")),   # °C
+    "dust_density": float(os.environ.get("ALERT_DUST", "75")),          # µg/m³ (나쁨)
+    "co2_level": float(os.environ.get("ALERT_CO2", "1500")),            # ppm
+}
+HISTORY_SIZE = 60  # /sensor/windows 로 보여줄 최근 윈도우 수
+
+# 채널별 누적값 인덱스: [COUNT, TOTAL, MIN, MAX, LAST]
+COUNT, TOTAL, MIN, MAX, LAST = range(5)
+
+
+class WindowAggregator:
+    """
+    - on_summary(summary): 윈도우가 끝날 때마다 호출
+    - on_alert(fields, ts, names): 임계값을 넘는 프레임이 들어오면 바로 호출
+    콜백은 lock 밖에서 호출 (add를 부른 시리얼 스레드 또는 타이머 스레드)
+    """
+
+    def __init__(self, window=WINDOW_SECONDS, thresholds=ALERT_THRESHOLDS,
+                 on_summary=None, on_alert=None, history=HISTORY_SIZE):
+        self.window = window
+        self.thresholds = dict(thresholds)
+        self.on_summary = on_summary
+        self.on_alert = on_alert
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.start_ts = None   # 현재 윈도우 시작 시각
+        self.channels = {}     # 필드 이름 → [COUNT, TOTAL, MIN, MAX, LAST]
+        self.frames = 0        # 현재 윈도우 프레임 수
+        self.alerting = set()  # 임계값을 넘은 상태인 채널
+        self.history = deque(maxlen=history)
+
+        self.windows = 0
+        self.alerts = 0
+        self.total_frames = 0
+
+    def start(self):
+        if self.thread is None and self.window > 0:
+            self.thread = threading.Thread(target=self.run, name="window-aggregator", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """남은 윈도우는 바로 집계해서 전송"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+        with self.lock:
+            summary = self._flush(time.time())
+        self._emit(summary)
+
+    def run(self):
+        while True:
+            with self.lock:
+                end = self.start_ts + self.window if self.start_ts is not None else None
+            wait = self.window if end is None else max(0.0, end - time.time())
+            if self.stop_event.wait(wait):
+                return
+            self.flush_due(time.time())
+
+    def add(self, fields, ts):
+        alert = None
+        summary = None
+        with self.lock:
+            if self.start_ts is not None and ts >= self.start_ts + self.window:
+                summary = self._flush(self.start_ts + self.window)
+            if self.start_ts is None:
+                self.start_ts = ts - ts % self.window if self.window > 0 else ts
+
+            for name, value in fields.items():
+                value = float(value)  # ir_detected: True/False → 1.0/0.0
+                channel = self.channels.get(name)
+                if channel is None:
+                    self.channels[name] = [1, value, value, value, value]
+                else:
+                    channel[COUNT] += 1
+                    channel[TOTAL] += value
+                    if value < channel[MIN]:
+                        channel[MIN] = value
+                    if value > channel[MAX]:
+                        channel[MAX] = value
+                    channel[LAST] = value
+            self.frames += 1
+            self.total_frames += 1
+
+            crossed = []
+            for name, limit in self.thresholds.items():
+                value = fields.get(name)
+                if value is None:
+                    continue
+                if value >= limit:
+                    if name not in self.alerting:
+                        self.alerting.add(name)
+                        crossed.append(name)
+                else:
+                    self.alerting.discard(name)
+            if crossed:
+                self.alerts += 1
+                alert = crossed
+
+            if self.window <= 0:
+                summary = self._flush(ts)
+
+        self._emit(summary)
+        # 집계하지 않는 모드(window <= 0)에서는 프레임마다 이미 업로드됨
+        if alert and self.on_alert and self.window > 0:
+            self.on_alert(fields, ts, alert)
+
+    def flush_due(self, now):
+        """윈도우 끝이 지났으면 집계 (프레임이 안 들어와도 타이머 스레드가 호출)"""
+        with self.lock:
+            if self.start_ts is None or now < self.start_ts + self.window:
+                return
+            summary = self._flush(self.start_ts + self.window)
+        self._emit(summary)
+
+    def _flush(self, end):
+        """현재 윈도우 집계 후 초기화 (lock 잡은 상태에서 호출, 빈 윈도우면 None)"""
+        if not self.frames:
+            self.start_ts = None
+            return None
+
+        summary = {
+            "start": self.start_ts,
+            "end": end,
+            "frames": self.frames,
+            "channels": {
+                name: {
+                    "count": channel[COUNT],
+                    "mean": channel[TOTAL] / channel[COUNT],
+                    "min": channel[MIN],
+                    "max": channel[MAX],
+                    "last": channel[LAST],
+                }
+                for name, channel in self.channels.items()
+            },
+        }
+        self.history.append(summary)
+        self.windows += 1
+        self.start_ts = None
+        self.channels = {}
+        self.frames = 0
+        return summary
+
+    def _emit(self, summary):
+        if summary is not None and self.on_summary:
+            self.on_summary(summary)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "window": self.window,
+                "thresholds": self.thresholds,
+                "windows": self.windows,
+                "alerts": self.alerts,
+                "frames": self.total_frames,
+                "pending_frames": self.frames,
+                "alerting": sorted(self.alerting),
+            }
+
+
+def to_reading(summary):
+    """윈도우 집계 → SensorData 한 건 (채널별 평균, ir_detected는 윈도우 중 감지 여부)"""
+    reading = {}
+    for name, channel in summary["channels"].items():
+        if name == "ir_detected":
+            reading[name] = channel["max"] > 0
+        else:
+            reading[name] = round(channel["mean"], 2)
+    return reading
@@ -0,0 +1,119 @@
+# esp32_sim.py
+"""
+ESP32 시리얼 시뮬레이터 (pty 사용, 리눅스 / 라즈베리파이 전용)
+
+하드웨어 없이 브릿지를 테스트할 때:
+    python esp32_sim.py --rate 20 --burst 5 --split
+    → 출력된 /dev/pts/N 을 SERIAL_PORT 환경변수로 지정하고 main.py / raspberry.py 실행
+
+- ESP32 펌웨어(Wheel.ino)와 같은 형식으로 센서 줄 전송
+- --format kv / csv: 전체 센서 필드 전송 (line_protocol.py 형식, 예: T=24.5C,H=41.2%,PM25=17,CO2=412ppm,IR=0)
+- --burst: 여러 줄을 한 번에 write (버스트 수신 확인)
+- --split: 줄을 임의 위치에서 잘라서 전송 (줄 조각 이어 붙이기 확인)
+- --noise: 가끔 깨진 바이트 / 줄바꿈 없는 긴 줄 전송 (overruns, decode_errors 확인)
+- 브릿지가 보낸 명령(FAN 120 등)은 펌웨어처럼 응답
+"""
+import argparse
+import os
+import pty
+import random
+import select
+import time
+import tty
+
+
+def sensor_line(t, fmt="pm25"):
+    wave = abs((t % 60) - 30) / 30  # 1분 주기 0~1
+    pm25 = 12 + int(8 * wave) + random.randint(0, 3)
+    if fmt == "pm25":
+        return f"PM25:{pm25}"
+
+    temperature = round(24 + 3 * wave + random.uniform(-0.2, 0.2), 1)
+    humidity = round(40 + 5 * wave + random.uniform(-0.5, 0.5), 1)
+    co2 = 410 + int(200 * wave) + random.randint(0, 10)
+    ir = int(random.random() < 0.1)
+    if fmt == "csv":
+        return f"{temperature},{humidity},{pm25},{co2},{ir}"
+    return f"T={temperature}C,H={humidity}%,PM25={pm25},CO2={co2}ppm,IR={ir}"
+
+
+def reply_for(cmd):
+    if cmd.startswith("FAN"):
+        return f"Fan speed set to {cmd[4:].strip()}"
+    if cmd in ("MOVE FWD", "MOVE BACK", "MOVE LEFT", "MOVE RIGHT", "STOP"):
+        return f"Received: {cmd}"
+    return "Unknown command."
+
+
+def write_lines(fd, lines, split):
+    data = "".join(line + "\r\n" for line in lines).encode()
+    if not split:
+        os.write(fd, data)
+        return
+    while data:
+        cut = random.randint(1, max(1, len(data) // 2))
+        os.write(fd, data[:cut])
+        data = data[cut:]
+        time.sleep(0.001)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ESP32 시리얼 시뮬레이터")
+    parser.add_argument("--rate", type=float, default=1.0, help="초당 전송 횟수")
+    parser.add_argument("--burst", type=int, default=1, help="한 번에 보낼 줄 수")
+    parser.add_argument("--split", action="store_true", help="줄을 잘라서 전송")
+    parser.add_argument("--noise", type=float, default=0.0, help="깨진 데이터 전송 확률 (0~1)")
+    parser.add_argument("--format", choices=["pm25", "kv", "csv"], default="pm25",
+                        help="센서 줄 형식 (pm25: 현재 펌웨어, kv / csv: 전체 필드)")
+    parser.add_argument("--count", type=int, default=0, help="보낼 총 줄 수 (0이면 무한)")
+    args = parser.parse_args()
+
+    master, slave = pty.openpty()
+    tty.setraw(slave)  # 에코 / 줄 단위 버퍼링 끄기 (실제 UART처럼)
+    print(f"ESP32 simulator on {os.ttyname(slave)}", flush=True)
+
+    os.write(master, b"ESP32-S3 motor & fan & PM2008M ready.\r\n")
+    interval = 1.0 / args.rate
+    next_send = time.monotonic()
+    sent = 0
+    pending = b""
+
+    try:
+        while True:
+            # --count만큼 보낸 뒤에는 명령 응답만 (포트는 Ctrl+C 까지 유지)
+            done = args.count and sent >= args.count
+            timeout = None if done else max(0.0, next_send - time.monotonic())
+            readable, _, _ = select.select([master], [], [], timeout)
+
+            # 브릿지 → ESP32 명령
+            if readable:
+                pending += os.read(master, 1024)
+                while b"\n" in pending:
+                    raw, pending = pending.split(b"\n", 1)
+                    cmd = raw.decode(errors="ignore").strip()
+                    if cmd:
+                        write_lines(master, [reply_for(cmd)], False)
+                continue
+            if done:
+                continue
+
+            lines = [sensor_line(time.time(), args.format) for _ in range(args.burst)]
+            if args.count:
+                lines = lines[:args.count - sent]
+
+            if random.random() < args.noise:
+                os.write(master, random.choice([b"\xff\xfePM25:\xc3\r\n", b"X" * 400]))
+
+            write_lines(master, lines, args.split)
+            sent += len(lines)
+            next_send += interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"sent {sent} lines", flush=True)
+        os.close(master)
+        os.close(slave)
+
+
+if __name__ == "__main__":
+    main()
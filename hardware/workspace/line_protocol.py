@@ -0,0 +1,185 @@
+# line_protocol.py
+"""
+ESP32 센서 줄 파서 (main.py / raspberry.py 공용)
+
+지원 형식 (한 줄 = 한 프레임)
+- key=value / key:value 쌍 (쉼표, 세미콜론, 공백 구분, 단위 붙여도 됨)
+    T=24.5C,H=41%,PM25=17,CO2=412ppm,IR=1
+    PM25:17                    (현재 펌웨어)
+    PM2.5 (GRIMM) : 17         (이전 펌웨어, 괄호 주석 무시)
+    PM2.5: 17 ug/m3            (단위를 띄어 쓰면 아는 단위만, 다음 키와 구분)
+- CSV (순서 고정: temperature, humidity, dust_density, co2_level, ir_detected)
+    24.5,41,17,412,1
+
+결과는 SensorData 필드 이름의 dict ({"temperature": 24.5, "dust_density": 17.0, ...})
+- 센서 키가 하나도 없는 줄(로그 등)은 None (ignored)
+- 형식 오류 / 모르는 단위 / 범위 밖 값 / 같은 필드 중복은 프레임 전체를 버림 (rejected)
+- 모르는 키는 무시 (펌웨어에 항목이 추가돼도 브릿지는 계속 동작)
+
+정규식은 모듈 로드 시 한 번만 컴파일, 키 / 단위는 dict 조회
+
+벤치마크: python line_protocol.py --bench
+"""
+import re
+import time
+
+# 필드 정의: (SensorData 필드, 키 별칭, 값 종류, 허용 범위, 단위 → 변환 함수)
+# 단위는 소문자로 비교, "" = 단위 생략
+_same = float
+FIELDS = [
+    ("temperature", ("t", "temp", "temperature"), "float", (-40.0, 85.0), {
+        "": _same, "c": _same, "°c": _same, "degc": _same,
+        "f": lambda v: (v - 32) * 5 / 9, "°f": lambda v: (v - 32) * 5 / 9,
+    }),
+    ("humidity", ("h", "hum", "humidity", "rh"), "float", (0.0, 100.0), {
+        "": _same, "%": _same, "%rh": _same,
+    }),
+    ("dust_density", ("pm25", "pm2.5", "dust", "pm"), "float", (0.0, 1000.0), {
+        "": _same, "ug/m3": _same, "µg/m3": _same, "ug/m³": _same, "µg/m³": _same,
+    }),
+    ("co2_level", ("co2",), "float", (0.0, 10000.0), {
+        "": _same, "ppm": _same,
+    }),
+    ("ir_detected", ("ir", "pir", "presence"), "bool", None, {
+        "": None,
+    }),
+]
+
+CSV_FIELDS = ("temperature", "humidity", "dust_density", "co2_level", "ir_detected")
+
+BOOL_VALUES = {
+    "1": True, "true": True, "on": True, "yes": True,
+    "0": False, "false": False, "off": False, "no": False,
+}
+
+_NUMBER = r"[-+]?(?:\d+(?:\.\d*)?|\.\d+)"
+_UNITS = "|".join(
+    re.escape(unit) for unit in sorted({unit for field in FIELDS for unit in field[4] if unit}, key=len, reverse=True)
+)
+_PAIR = (
+    r"([A-Za-z][A-Za-z0-9_.]*)"    # 키
+    r"(?:\s*\([^)]*\))?"           # (GRIMM) 같은 주석
+    r"\s*[=:]\s*"
+    r"(" + _NUMBER + r"|[A-Za-z]+)"  # 값
+    r"(?:([^\s,;=:]+)"              # 단위 (값에 붙여 씀: 24.5C, 412ppm)
+    r"|\s+((?i:" + _UNITS + r"))(?=[\s,;]|$)(?!\s*[=:(]))?"  # 띄어 쓴 단위 (17 ug/m3)
+)
+PAIR_RE = re.compile(_PAIR)
+FRAME_RE = re.compile(r"\s*" + _PAIR + r"(?:\s*[,;\s]\s*" + _PAIR + r")*\s*[,;]?\s*")
+CSV_RE = re.compile(r"\s*" + _NUMBER + r"(?:\s*,\s*" + _NUMBER + r"){%d}\s*" % (len(CSV_FIELDS) - 1))
+NUMBER_RE = re.compile(_NUMBER)
+
+# 별칭 → 필드 정의
+KEYS = {alias: field for field in FIELDS for alias in field[1]}
+BY_NAME = {field[0]: field for field in FIELDS}
+KEY_START_RE = re.compile(
+    r"\s*(?:" + "|".join(re.escape(alias) for alias in sorted(KEYS, key=len, reverse=True))
+    + r")(?:\s*\([^)]*\))?\s*[=:]",
+    re.IGNORECASE,
+)
+
+
+class MalformedFrame(ValueError):
+    pass
+
+
+def convert(field, value, unit=""):
+    name, _, kind, limits, units = field
+    if kind == "bool":
+        if unit or value.lower() not in BOOL_VALUES:
+            raise MalformedFrame(f"{name}: {value}{unit}")
+        return BOOL_VALUES[value.lower()]
+
+    converter = units.get(unit.lower())
+    if converter is None or not NUMBER_RE.fullmatch(value):
+        raise MalformedFrame(f"{name}: {value}{unit}")
+    number = converter(float(value))
+    if not limits[0] <= number <= limits[1]:
+        raise MalformedFrame(f"{name} 범위 밖: {number}")
+    return number
+
+
+class LineParser:
+    def __init__(self):
+        self.parsed = 0
+        self.ignored = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def parse(self, line):
+        """한 줄 → {필드: 값} (센서 프레임이 아니거나 잘못된 프레임이면 None)"""
+        try:
+            fields = self._parse(line)
+        except MalformedFrame as e:
+            self.rejected += 1
+            self.last_error = f"{e} ({line[:80]})"
+            return None
+
+        if fields is None:
+            self.ignored += 1
+        else:
+            self.parsed += 1
+        return fields
+
+    def _parse(self, line):
+        if CSV_RE.fullmatch(line):
+            values = [value.strip() for value in line.split(",")]
+            return {name: convert(BY_NAME[name], value) for name, value in zip(CSV_FIELDS, values)}
+
+        if not FRAME_RE.fullmatch(line):
+            # 센서 키로 시작하는데 형식이 틀리면 잘못된 프레임, 나머지는 로그 줄
+            if KEY_START_RE.match(line):
+                raise MalformedFrame("형식 오류")
+            return None
+
+        fields = {}
+        for key, value, unit, spaced_unit in PAIR_RE.findall(line):
+            field = KEYS.get(key.lower())
+            if field is None:
+                continue
+            if field[0] in fields:
+                raise MalformedFrame(f"{field[0]} 중복")
+            fields[field[0]] = convert(field, value, unit or spaced_unit)
+        return fields or None
+
+    def stats(self):
+        return {
+            "parsed": self.parsed,
+            "ignored": self.ignored,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
+
+
+parser = LineParser()
+parse_line = parser.parse
+
+
+def bench(count=200000):
+    """줄 종류를 섞어서 초당 처리 줄 수 측정"""
+    samples = [
+        "T=24.5C,H=41.2%,PM25=17,CO2=412ppm,IR=1",
+        "PM25:17",
+        "PM2.5 (GRIMM) : 23",
+        "24.5,41.2,17,412,0",
+        "Fan speed set to 120",
+        "T=24.5C,H=141%",
+    ]
+    lines = [samples[i % len(samples)] for i in range(count)]
+    bench_parser = LineParser()
+    started = time.perf_counter()
+    for line in lines:
+        bench_parser.parse(line)
+    elapsed = time.perf_counter() - started
+    print(f"{count} lines in {elapsed:.3f}s → {count / elapsed:,.0f} lines/s")
+    print(bench_parser.stats())
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--bench" in sys.argv:
+        bench()
+    else:
+        for line in sys.stdin:
+            print(parse_line(line.rstrip("\n")))
@@ -0,0 +1,274 @@
+# local_control.py
+"""
+라즈베리파이 로컬 자동 풍속 제어 (main.py / raspberry.py 공용)
+
+- 센서 프레임을 받은 시리얼 스레드에서 바로 온도 / PM2.5 → 풍속 단계 계산 → "FAN <pwm>" 전송
+  백엔드 왕복 / DB 쓰기 없이 반응, 백엔드가 꺼져 있어도 동작
+- 규칙은 백엔드 myapp/fan_control.py 와 같음 (level_for / channel_speed / next_speed, 바꾸면 양쪽 함께 수정)
+  단계별 진입 값 초과 시 바로 올라가고, 진입 값 - hysteresis 이하가 되어야 한 단계씩 내려감
+  온도 / PM2.5 중 높은 단계 적용
+- 임계값 등 정책 값은 브릿지에 따로 두지 않고 백엔드 policy()만 사용
+  정책을 한 번도 못 받았으면(캐시 파일도 없음) 로컬 제어를 하지 않음 → 백엔드 자동 풍속이 그대로 동작
+- 풍속 변경은 min_interval(초)에 한 번까지 (막힌 변경은 다음 프레임에서 다시 판단)
+- 정책은 POLICY_SYNC_INTERVAL마다 백엔드 device/auto-speed/ 에서 동기화 (ETag, 안 바뀌었으면 304)
+  받은 정책은 파일에 캐시 → 재부팅 후 백엔드가 꺼져 있어도 마지막 정책 사용
+  동기화 요청은 "이 디바이스는 로컬 제어 중" 표시도 겸함 (그동안 백엔드 자동 풍속은 생략)
+- 결정은 모두 report 콜백으로 백엔드에 보고 (outbox 경유)
+- 수동 명령(/fan/{speed}) 후 MANUAL_HOLD 동안 자동 제어 중지
+- 전원 상태 추적: FAN 0(수동) 또는 백엔드 power_state=False(앱 / 타이머)면 꺼짐
+  꺼져 있는 동안은 자동 제어 안 함 (수동 hold가 끝나도 다시 켜지 않음)
+  수동 FAN <pwm>(1 이상), /fan/auto 재개, 백엔드 power_state=True로 바뀌면 다시 켜짐
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+POLICY_CACHE_PATH = os.environ.get("FAN_POLICY_PATH", "fan_policy.json")
+POLICY_SYNC_INTERVAL = 60  # 초 (백엔드 AUTO_SPEED_LOCAL_TTL보다 짧게)
+MANUAL_HOLD = 600          # 초
+REQUEST_TIMEOUT = 3        # 초
+
+
+def normalize_policy(policy):
+    """JSON으로 받은 정책의 단계 키(문자열) → int (빠진 항목이 있으면 KeyError)"""
+    policy = dict(policy)
+    for name in ("thresholds", "dust_thresholds", "pwm"):
+        policy[name] = {int(level): value for level, value in policy[name].items()}
+    for name in ("hysteresis", "dust_hysteresis", "min_interval"):
+        policy[name] = float(policy[name])
+    return policy
+
+
+def level_for(value, thresholds):
+    speed = 1
+    for level, threshold in sorted(thresholds.items()):
+        if value > threshold:
+            speed = level
+    return speed
+
+
+def channel_speed(current, value, thresholds, hysteresis):
+    target = level_for(value, thresholds)
+    speed = current
+    while speed > target and (speed not in thresholds or value <= thresholds[speed] - hysteresis):
+        speed -= 1
+    return max(speed, target)
+
+
+def next_speed(policy, current, temp, dust):
+    channels = []
+    if temp:
+        channels.append((temp, policy["thresholds"], policy["hysteresis"]))
+    if dust is not None:
+        channels.append((dust, policy["dust_thresholds"], policy["dust_hysteresis"]))
+    if not channels:
+        return current
+
+    # 자동 제어 범위 밖의 값이면 바로 적용
+    if current != 1 and current not in policy["thresholds"] and current not in policy["dust_thresholds"]:
+        return max(level_for(value, thresholds) for value, thresholds, _ in channels)
+    return max(channel_speed(current, *channel) for channel in channels)
+
+
+class LocalFanController:
+    """
+    - send(cmd) → bool: ESP32로 명령 전송 (SerialReader.write 래퍼)
+    - report(decision): 결정 보고 (outbox.put 래퍼, 시리얼 스레드에서 호출되므로 짧게)
+    """
+
+    def __init__(self, base_url, device_id, send, report=None, cache_path=POLICY_CACHE_PATH):
+        self.url = f"{base_url}/device/auto-speed/"
+        self.device_id = device_id
+        self.send = send
+        self.report = report
+        self.cache_path = cache_path
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.policy = None  # 백엔드에서 받기 전에는 로컬 제어 안 함
+        self.etag = None
+        self.policy_source = None
+        self.power = None          # None: 모름 (켜진 것으로 보고 제어), False면 켤 때까지 자동 제어 안 함
+        self.backend_power = None  # 마지막으로 받은 백엔드 power_state (바뀔 때만 반영)
+        self.load_cache()
+
+        self.level = None        # 마지막으로 보낸 단계 (시작 직후는 모름 → 첫 판단은 무조건 전송)
+        self.temperature = None  # 채널별 마지막 값 (한 프레임에 일부 채널만 와도 판단)
+        self.dust = None
+        self.last_change = 0.0   # monotonic
+        self.hold_until = 0.0    # monotonic, 수동 명령 후 자동 제어 중지
+
+        self.decisions = 0
+        self.rate_limited = 0
+        self.send_failures = 0
+        self.last_latency_ms = None
+
+    # ---- 정책 동기화 ----
+    def load_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            policy = dict(cached["policy"])
+            self.backend_power = policy.pop("power_state", None)
+            self.policy = normalize_policy(policy)
+            self.etag = cached.get("etag")
+            self.policy_source = "cache"
+            self.power = self.backend_power
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ 풍속 정책 캐시 무시: {e}")
+
+    def save_cache(self, policy):
+        tmp = f"{self.cache_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"etag": self.etag, "policy": policy}, f)
+        os.replace(tmp, self.cache_path)  # 쓰는 중에 전원이 꺼져도 이전 캐시 유지
+
+    def sync_policy(self):
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        try:
+            response = requests.get(
+                self.url, params={"device_id": self.device_id}, headers=headers, timeout=REQUEST_TIMEOUT
+            )
+        except requests.RequestException as e:
+            using = f"{self.policy_source} 정책 사용" if self.policy else "정책 없음, 로컬 제어 안 함"
+            print(f"⚠️ 풍속 정책 동기화 실패 ({using}): {e}")
+            return False
+        if response.status_code == 304:
+            return True
+        if response.status_code != 200:
+            print(f"⚠️ 풍속 정책 동기화 실패: {response.status_code}")
+            return False
+
+        policy = response.json()
+        try:
+            power_state = policy.get("power_state")
+            normalized = normalize_policy({k: v for k, v in policy.items() if k != "power_state"})
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"⚠️ 풍속 정책 형식 오류: {e}")
+            return False
+        with self.lock:
+            self.policy = normalized
+            self.etag = response.headers.get("ETag")
+            self.policy_source = "backend"
+            previous, self.backend_power = self.backend_power, power_state
+        # 백엔드에서 전원이 바뀐 경우만 반영 (처음 받은 "켜짐"은 로컬 수동 끔을 덮어쓰지 않음)
+        if power_state is not None and power_state != previous and (previous is not None or not power_state):
+            self.set_power(power_state)
+        self.save_cache(policy)
+        print(f"✅ 풍속 정책 갱신: {policy}")
+        return True
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="fan-policy-sync", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=REQUEST_TIMEOUT + 1)
+            self.thread = None
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.sync_policy()
+            self.stop_event.wait(POLICY_SYNC_INTERVAL)
+
+    # ---- 제어 ----
+    def hold(self, seconds=MANUAL_HOLD):
+        """수동 명령 후 자동 제어 중지"""
+        with self.lock:
+            self.hold_until = time.monotonic() + seconds
+            self.level = None  # 재개하면 현재 값 기준으로 다시 전송
+
+    def manual(self, pwm, seconds=MANUAL_HOLD):
+        """수동 FAN <pwm> 반영: 0이면 꺼짐 (켤 때까지 자동 제어 안 함), 아니면 켜짐 + hold"""
+        with self.lock:
+            self.power = pwm > 0
+        self.hold(seconds)
+
+    def set_power(self, on):
+        """백엔드 전원 상태 반영 (꺼지면 FAN 0 전송, 켜지면 다음 프레임에서 자동 풍속 전송)"""
+        with self.lock:
+            self.power = on
+            self.level = None
+            self.hold_until = 0.0
+        if not on and not self.send("FAN 0"):
+            with self.lock:
+                self.send_failures += 1
+
+    def resume(self):
+        """자동 제어 재개 (꺼져 있었으면 켬)"""
+        with self.lock:
+            self.hold_until = 0.0
+            self.power = True
+
+    def update(self, fields, ts):
+        """센서 프레임 1개 반영 (시리얼 읽기 스레드에서 호출)"""
+        with self.lock:
+            if "temperature" in fields:
+                self.temperature = fields["temperature"]
+            if "dust_density" in fields:
+                self.dust = fields["dust_density"]
+
+            now = time.monotonic()
+            if self.policy is None or self.power is False or now < self.hold_until:
+                return None
+
+            current = self.level if self.level is not None else 1
+            speed = next_speed(self.policy, current, self.temperature, self.dust)
+            if speed == self.level or (self.level is None and self.temperature is None and self.dust is None):
+                return None
+            if now - self.last_change < self.policy["min_interval"]:
+                self.rate_limited += 1
+                return None
+
+            pwm = self.policy["pwm"].get(speed)
+            if pwm is None:
+                return None
+            if not self.send(f"FAN {pwm}"):
+                self.send_failures += 1
+                return None
+
+            previous, self.level = self.level, speed
+            self.last_change = now
+            self.decisions += 1
+            self.last_latency_ms = round((time.time() - ts) * 1000, 2)
+            decision = {
+                "device_id": self.device_id,
+                "fan_speed": speed,
+                "previous": previous,
+                "pwm": pwm,
+                "temperature": self.temperature,
+                "dust_density": self.dust,
+                "latency_ms": self.last_latency_ms,
+                "decided_at": datetime.now().astimezone().isoformat(timespec="milliseconds"),
+            }
+
+        if self.report:
+            self.report(decision)
+        return decision
+
+    def stats(self):
+        with self.lock:
+            return {
+                "level": self.level,
+                "pwm": self.policy["pwm"].get(self.level) if self.policy else None,
+                "temperature": self.temperature,
+                "dust_density": self.dust,
+                "power": self.power,
+                "manual_hold": max(0.0, round(self.hold_until - time.monotonic(), 1)),
+                "policy_source": self.policy_source,
+                "policy": self.policy,
+                "decisions": self.decisions,
+                "rate_limited": self.rate_limited,
+                "send_failures": self.send_failures,
+                "last_latency_ms": self.last_latency_ms,
+            }
@@ -2,128 +2,94 @@
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
-import serial
+import os
 import threading
-import time
-import re
 import requests
 import uvicorn
 from datetime import datetime
 
+from serial_reader import SerialReader
+from line_protocol import parse_line, parser as line_parser
+from outbox import Outbox, Uploader
+from aggregator import WindowAggregator, to_reading
+from local_control import LocalFanController
+
 # -------------------------------
 # 설정
 BASE_URL = "http://192.168.0.20:8000/api"
-SERIAL_PORT = "/dev/ttyUSB0"
+SERIAL_PORT = os.environ.get("SERIAL_PORT", "/dev/ttyUSB0")  # 시뮬레이터: esp32_sim.py가 출력한 /dev/pts/N
 BAUD_RATE = 115200
+DEVICE_ID = "fan5296"
+DEVICE_IP = "192.168.0.147"
+HEARTBEAT_INTERVAL = 20  # 초 (백엔드 접속 상태 표시용)
 
 # 전역 변수
-ser = None
-received_data = ""
 pm25_grimm_value = None
 pm25_grimm_timestamp = None
+latest_sensor = {}  # 채널별 마지막 값 (SensorData 필드 이름)
 stop_event = threading.Event() # 스레드 종료 제어용
 
 # -------------------------------
-# 시리얼 읽기 함수 (스레드용)
-def read_serial():
-    global received_data, pm25_grimm_value, pm25_grimm_timestamp
-    while not stop_event.is_set():
-        if ser and ser.is_open:
-            try:
-                if ser.in_waiting > 0:
-                    line = ser.readline().decode(errors="ignore").strip()
-                    if line:
-                        received_data = line
-                        print(f"[ESP→RPi] {line}")
-                        
-                        # PM2.5 파싱
-                        pm = parse_pm25_from_line(line)
-                        if pm is not None:
-                            pm25_grimm_value = pm
-                            pm25_grimm_timestamp = datetime.utcnow().isoformat() + "Z"
-                            print(f"[PM2.5 GRIMM] {pm25_grimm_value}")
-            except Exception as e:
-                print("Serial read error:", e)
-                time.sleep(1)
-        else:
-            time.sleep(1)
-
-def parse_pm25_from_line(line: str):
-    if "PM2.5" not in line and "PM2.5" not in line.upper():
-        return None
-    m = re.search(r'(\d+)', line)
-    if m:
-        try: return int(m.group(1))
-        except ValueError: return None
-    return None
+# 시리얼 수신 (serial_reader.SerialReader 스레드에서 호출)
+# 줄 파싱은 line_protocol.parse_line (T=24.5C,H=41%,PM25=17,CO2=412ppm,IR=1 / PM25:17 / CSV)
+def handle_frame(frame):
+    global pm25_grimm_value, pm25_grimm_timestamp
+    if not frame.fields:
+        return
+    latest_sensor.update(frame.fields)
+    if "dust_density" in frame.fields:
+        pm25_grimm_value = frame.fields["dust_density"]
+        pm25_grimm_timestamp = datetime.utcfromtimestamp(frame.ts).isoformat() + "Z"
+        print(f"[PM2.5 GRIMM] {pm25_grimm_value}")
+    # 풍속 판단을 먼저 (백엔드를 거치지 않고 바로 FAN 명령)
+    fan_controller.update(frame.fields, frame.ts)
+    aggregator.add(frame.fields, frame.ts)
+
+# 업로드는 윈도우당 1건 (채널별 평균), 임계값을 넘는 프레임만 바로 업로드
+# 측정 시각은 수신 시각 기준 (outbox에서 늦게 전송돼도 유지)
+def local_isoformat(ts):
+    return datetime.fromtimestamp(ts).astimezone().isoformat(timespec="milliseconds")
+
+def upload_summary(summary):
+    outbox.put("/sensors/", dict(to_reading(summary), device=DEVICE_ID, created_at=local_isoformat(summary["end"])))
+
+def upload_alert(fields, ts, names):
+    print(f"🚨 임계값 초과 {names}: 즉시 업로드")
+    outbox.put("/sensors/", dict(fields, device=DEVICE_ID, created_at=local_isoformat(ts)))
+
+aggregator = WindowAggregator(on_summary=upload_summary, on_alert=upload_alert)
+reader = SerialReader(SERIAL_PORT, BAUD_RATE, parse=parse_line, on_frame=handle_frame)
 
 # -------------------------------
-# 초기화 요청 함수들 (예외 처리 추가)
-def safe_post_request(endpoint, data):
-    try:
-        url = f"{BASE_URL}{endpoint}"
-        response = requests.post(url, json=data, timeout=2) # 2초 타임아웃
-        print(f"📌 {endpoint}: {response.status_code}")
-    except Exception as e:
-        print(f"⚠️ {endpoint} 요청 실패: {e}")
+# 백엔드 전송: 로컬 outbox에 기록 → Uploader 스레드가 배치 / 재시도 전송 (연결이 끊겨도 유실 없음)
+outbox = Outbox()
+uploader = Uploader(outbox, BASE_URL)
 
-def run_startup_tasks():
-    print("🚀 초기 데이터 전송 시작...")
-    safe_post_request("/devices/", {
-        "device_id": "fan05", "battery_level": 85, "ip_address": "192.168.0.147",
-        "power_state": False, "fan_speed": 1, "angle": 0
-    })
-    # 필요하면 ai_control, track_user 등도 여기에 추가
-
-# -------------------------------
 # ★ 백엔드 요청 전송 도우미 함수 (요청한 출력 포맷 적용)
-def send_to_backend(endpoint: str, payload: dict, command_name: str):
-    url = f"{BASE_URL}{endpoint}"
-    try:
-        # 타임아웃 2초 설정 (서버가 안 켜져 있어도 멈추지 않게)
-        response = requests.post(url, json=payload, timeout=2)
-        
-        # 성공 (200번대)
-        if 200 <= response.status_code < 300:
-            print(f"{{{response.status_code}}}: {command_name} has been sent!")
-        # 실패 (400, 500번대)
-        else:
-            print(f"{{{response.status_code}}}: request error (Server msg: {response.text})")
-            
-    except requests.exceptions.ConnectionError:
-        print(f"{{Error}}: request error (Cannot connect to Backend at {url})")
-    except Exception as e:
-        print(f"{{Error}}: request error ({str(e)})")
+def send_to_backend(endpoint: str, payload: dict, command_name: str, ttl=None):
+    # 서버가 꺼져 있어도 멈추지 않고 outbox에 쌓아 두었다가 연결되면 전송 (결과는 Uploader가 출력)
+    outbox.put(endpoint, payload, ttl=ttl)
+    print(f"{{queued}}: {command_name} (pending {outbox.stats()['pending']})")
 
 # ★ 시나리오별 실행 함수들
 def run_startup_tasks():
     print("\n🚀 [System Startup] 백엔드 연결 테스트 시작...\n")
 
-    # 1️⃣ 디바이스 생성 (기존)
-    send_to_backend("/devices/", {
-        "device_id": "fan5296",
+    # 1️⃣ 디바이스 등록 (이미 있으면 접속 정보만 갱신, 전원/풍속 상태는 유지)
+    send_to_backend("/device/register/", {
+        "device_id": DEVICE_ID,
         "battery_level": 41,
-        "ip_address": "192.168.0.147",
-        "power_state": False,
-        "fan_speed": 300,
-        "angle": 15
-    }, "Device Creation")
-
-    # 3️⃣ 센서 데이터 업로드
-    send_to_backend("/sensors/", {
-        "device": "fan5296",
-        "temperature": 50.3,
-        "humidity": 1.4,
-        "co2_level": 15,
-        "ir_detected": False
-    }, "Sensor Data Upload")
+        "ip_address": DEVICE_IP
+    }, "Device Registration")
+
+    # 3️⃣ 센서 데이터는 ESP32 프레임을 윈도우별로 집계해서 업로드 (aggregator) (고정값 전송 없음)
 
     send_to_backend("/ai/control/", {
         "mode": "follow",
         "user_x": 30,
         "temperature": 15.1,
         "voice_command": "켜"
-    }, "Sensor Data Upload")
+    }, "Sensor Data Upload", ttl=30)  # 제어 명령은 늦게 도착하면 의미 없으므로 30초 안에 못 보내면 버림
 
     send_to_backend("/alert/", {
         "device_id": "fan5296",
@@ -132,21 +98,27 @@ def run_startup_tasks():
     
     print("\n✅ [System Startup] 테스트 완료.\n")
 # -------------------------------
+# heartbeat (같은 값이면 백엔드가 DB 쓰기를 생략하므로 자주 보내도 부담 없음)
+def heartbeat_loop():
+    while not stop_event.wait(HEARTBEAT_INTERVAL):
+        try:
+            requests.post(f"{BASE_URL}/device/heartbeat/", json={
+                "device_id": DEVICE_ID, "battery_level": 41, "ip_address": DEVICE_IP
+            }, timeout=2)
+        except Exception as e:
+            print(f"⚠️ heartbeat 실패: {e}")
+
+# -------------------------------
 # ★ Lifespan: 앱이 켜지고 꺼질 때 실행될 로직
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 1. 시작될 때 (Startup)
-    global ser
-    try:
-        ser = serial.Serial(SERIAL_PORT, baudrate=BAUD_RATE, timeout=1)
-        print(f"✅ 시리얼 연결 성공: {SERIAL_PORT}")
-    except Exception as e:
-        print(f"❌ 시리얼 포트 열기 실패: {e}")
-        ser = None
-    
-    # 시리얼 읽기 스레드 시작
-    t = threading.Thread(target=read_serial, daemon=True)
-    t.start()
+    # 시리얼 읽기 스레드 시작 (포트 열기 / 끊겼을 때 재연결도 스레드가 처리)
+    reader.start()
+    aggregator.start()
+    fan_controller.start()
+    uploader.start()
+    threading.Thread(target=heartbeat_loop, daemon=True).start()
     
     # 초기 API 데이터 전송 (별도 스레드 혹은 비동기로 하는 게 좋지만, 여기선 간단히 호출)
     run_startup_tasks()
@@ -156,8 +128,10 @@ async def lifespan(app: FastAPI):
     # 2. 꺼질 때 (Shutdown)
     print("🛑 서버 종료 중... 시리얼 닫기")
     stop_event.set()
-    if ser and ser.is_open:
-        ser.close()
+    reader.stop()
+    aggregator.stop()  # 남은 윈도우 집계는 outbox에 기록
+    fan_controller.stop()
+    uploader.stop()
 
 # 앱 생성 (lifespan 적용)
 app = FastAPI(title="RPi-ESP32 Bridge", lifespan=lifespan)
@@ -183,22 +157,54 @@ def get_pm25_grimm():
         return JSONResponse({
             "pm25_grimm": None,
             "timestamp": None,
-            "latest_raw": received_data,
+            "latest_raw": latest_raw(),
             "message": "데이터 대기 중..."
         })
     return JSONResponse({
         "pm25_grimm": pm25_grimm_value,
         "timestamp": pm25_grimm_timestamp,
-        "latest_raw": received_data
+        "latest_raw": latest_raw()
     })
 
+def latest_raw():
+    frame = reader.ring.latest
+    return frame.line if frame else ""
+
+@app.get("/sensor/latest")
+def get_latest_sensor():
+    return latest_sensor
+
+@app.get("/sensor/windows")
+def get_sensor_windows():
+    # 최근 윈도우 집계 (채널별 count / mean / min / max / last)
+    return {"stats": aggregator.stats(), "windows": list(aggregator.history)}
+
+@app.get("/serial/stats")
+def serial_stats():
+    return dict(reader.stats(), parser=line_parser.stats())
+
+@app.get("/serial/frames")
+def serial_frames():
+    # 버퍼에 쌓인 프레임을 모두 꺼냄 (가져간 프레임은 버퍼에서 제거)
+    return [frame._asdict() for frame in reader.ring.drain()]
+
+@app.get("/outbox/stats")
+def outbox_stats():
+    return uploader.stats()
+
 def send_command(cmd: str):
-    if ser and ser.is_open:
-        ser.write((cmd + "\n").encode("utf-8"))
+    if reader.write((cmd + "\n").encode("utf-8")):
         print(f"[RPi->ESP] {cmd}")
         return True
     return False
 
+# 로컬 자동 풍속 (결정은 outbox로 백엔드에 보고)
+def report_fan_decision(decision):
+    print(f"[AUTO FAN] {decision['previous']} → {decision['fan_speed']}단 ({decision['latency_ms']}ms)")
+    outbox.put("/device/auto-speed/", decision)
+
+fan_controller = LocalFanController(BASE_URL, DEVICE_ID, send=send_command, report=report_fan_decision)
+
 @app.post("/move/{direction}")
 def move_command(direction: str):
     mapping = {"fwd": "MOVE FWD", "back": "MOVE BACK", "left": "MOVE LEFT", "right": "MOVE RIGHT", "stop": "STOP"}
@@ -207,10 +213,21 @@ def move_command(direction: str):
         return {"sent": mapping[direction], "status": "ok" if send_command(mapping[direction]) else "error"}
     return {"error": "Invalid direction"}
 
+@app.get("/fan/auto")
+def fan_auto_stats():
+    return fan_controller.stats()
+
+@app.post("/fan/auto")
+def fan_auto_resume():
+    # 수동 명령으로 멈춘 자동 제어 재개 (FAN 0으로 꺼져 있었으면 켬)
+    fan_controller.resume()
+    return fan_controller.stats()
+
 @app.post("/fan/{speed}")
 def fan_command(speed: int):
     speed = max(0, min(speed, 255))
     cmd = f"FAN {speed}"
+    fan_controller.manual(speed)  # 0이면 꺼짐 (다시 켤 때까지 자동 제어 안 함), 아니면 일정 시간 자동 제어 중지
     return {"sent": cmd, "status": "ok" if send_command(cmd) else "error"}
 
 # ... (위쪽 코드는 그대로 유지) ...
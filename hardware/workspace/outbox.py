@@ -0,0 +1,282 @@
+# outbox.py
+"""
+라즈베리파이 store-and-forward 버퍼 (main.py / raspberry.py 공용)
+
+- 백엔드로 보낼 데이터는 모두 먼저 로컬 SQLite(WAL)에 기록 → 와이파이가 끊겨도 유실 없음
+- 업로드 스레드가 오래된 것부터 꺼내 전송
+  센서 데이터(/sensors/)는 최대 BATCH_SIZE개씩 /sensors/batch/ 로 묶어서 전송
+  → 몇 시간 끊겼다 복구돼도 요청 수가 적어 빠르게 따라잡음
+- 배치마다 키: 전송 전에 행에 키를 기록하고, 실패하면 같은 키·같은 행으로 재전송
+  Idempotency-Key 헤더는 지원하는 /sensors/batch/ 에만 보냄
+  (응답만 못 받은 경우에도 백엔드가 중복 저장하지 않음)
+- 실패 시 endpoint별로 1초부터 최대 5분까지 지수 백오프 (+지터)
+  백오프 중인 endpoint는 건너뛰고 다른 endpoint 데이터는 계속 전송 (제어 요청 하나가 센서 업로드를 막지 않음)
+  4xx(잘못된 데이터)는 재시도하지 않고 버림, 5xx / 연결 실패 / 408 / 429는 재시도
+  Retry-After(초 또는 HTTP 날짜)가 있으면 백오프 대신 그 시각까지 대기
+- ttl이 지난 행은 재시도 중인 배치여도 버림 (expired)
+- DB 크기가 MAX_BYTES를 넘으면 전송 중이 아닌 가장 오래된 행부터 삭제
+- 센서 데이터에는 기록 시각(created_at, UTC 오프셋 포함)을 붙여 재전송돼도 측정 시각 유지
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+import requests
+
+OUTBOX_PATH = os.environ.get("OUTBOX_PATH", "outbox.db")
+OUTBOX_MAX_BYTES = 50 * 1024 * 1024
+BATCH_SIZE = 500        # 백엔드 SENSOR_BATCH_MAX_SIZE 이하
+BACKOFF_MIN = 1.0       # 초
+BACKOFF_MAX = 300.0     # 초
+REQUEST_TIMEOUT = 5     # 초
+RETENTION_CHECK_EVERY = 100  # put 몇 번마다 크기 확인
+
+SENSOR_ENDPOINT = "/sensors/"
+SENSOR_BATCH_ENDPOINT = "/sensors/batch/"
+
+
+def retry_after(response):
+    """Retry-After 헤더 → 대기 초 (없거나 형식이 틀리면 None)"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Outbox:
+    def __init__(self, path=OUTBOX_PATH, max_bytes=OUTBOX_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")  # WAL에서는 전원 차단 시에도 DB 손상 없음
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                endpoint TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created REAL NOT NULL,
+                expires REAL,
+                batch_key TEXT
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS outbox_batch_key ON outbox (batch_key)")
+
+        self.queued = 0
+        self.sent = 0
+        self.rejected = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def put(self, endpoint, payload, ttl=None):
+        """
+        전송할 데이터 기록 (바로 반환, 전송은 Uploader 스레드)
+        ttl: 이 시간(초) 안에 못 보내면 버림 (제어 명령처럼 늦게 가면 의미 없는 요청용)
+        """
+        if endpoint == SENSOR_ENDPOINT and "created_at" not in payload:
+            payload = dict(payload, created_at=datetime.now().astimezone().isoformat(timespec="milliseconds"))
+
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO outbox (endpoint, payload, created, expires) VALUES (?, ?, ?, ?)",
+                (endpoint, json.dumps(payload, ensure_ascii=False), now, now + ttl if ttl else None),
+            )
+            self.queued += 1
+            if self.queued % RETENTION_CHECK_EVERY == 0:
+                self.enforce_retention()
+        self.wakeup.set()
+
+    def enforce_retention(self):
+        """DB 크기 제한: 전송 중이 아닌 가장 오래된 행부터 10%씩 삭제 (lock 잡은 상태에서 호출)"""
+        while True:
+            page_size = self.db.execute("PRAGMA page_size").fetchone()[0]
+            pages = self.db.execute("PRAGMA page_count").fetchone()[0]
+            free = self.db.execute("PRAGMA freelist_count").fetchone()[0]
+            if (pages - free) * page_size <= self.max_bytes:
+                return
+
+            count = self.db.execute("SELECT COUNT(*) FROM outbox WHERE batch_key IS NULL").fetchone()[0]
+            if count == 0:
+                return
+            deleted = self.db.execute(
+                "DELETE FROM outbox WHERE id IN ("
+                " SELECT id FROM outbox WHERE batch_key IS NULL ORDER BY id LIMIT ?)",
+                (max(1, count // 10),),
+            ).rowcount
+            self.evicted += deleted
+            print(f"⚠️ outbox 용량 초과: 오래된 데이터 {deleted}건 삭제")
+
+    def claim(self, limit=BATCH_SIZE, skip=()):
+        """
+        다음에 보낼 배치 (key, endpoint, payloads)
+        - 이전에 보내다 실패한 배치가 있으면 같은 키·같은 행 그대로
+        - 없으면 가장 오래된 행의 endpoint로 새 배치 구성 (센서 데이터만 여러 건)
+        - skip: 건너뛸 endpoint (백오프 중)
+        """
+        skip = list(skip)
+        not_skipped = f"endpoint NOT IN ({', '.join('?' * len(skip))})" if skip else "1"
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.expired += self.db.execute(
+                    "DELETE FROM outbox WHERE expires < ?", (time.time(),)
+                ).rowcount
+
+                row = self.db.execute(
+                    f"SELECT batch_key, endpoint FROM outbox WHERE batch_key IS NOT NULL AND {not_skipped}"
+                    " ORDER BY id LIMIT 1",
+                    skip,
+                ).fetchone()
+                if row is None:
+                    first = self.db.execute(
+                        f"SELECT endpoint FROM outbox WHERE batch_key IS NULL AND {not_skipped} ORDER BY id LIMIT 1",
+                        skip,
+                    ).fetchone()
+                    if first is None:
+                        self.db.execute("COMMIT")
+                        return None
+                    row = (uuid.uuid4().hex, first[0])
+                    self.db.execute(
+                        "UPDATE outbox SET batch_key = ? WHERE id IN ("
+                        " SELECT id FROM outbox WHERE batch_key IS NULL AND endpoint = ? ORDER BY id LIMIT ?)",
+                        (row[0], row[1], limit if row[1] == SENSOR_ENDPOINT else 1),
+                    )
+
+                key, endpoint = row
+                payloads = [
+                    json.loads(payload) for (payload,) in self.db.execute(
+                        "SELECT payload FROM outbox WHERE batch_key = ? ORDER BY id", (key,)
+                    )
+                ]
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        return key, endpoint, payloads
+
+    def complete(self, key, rejected=False):
+        """전송 완료(또는 거부된) 배치 삭제"""
+        with self.lock:
+            count = self.db.execute("DELETE FROM outbox WHERE batch_key = ?", (key,)).rowcount
+            if rejected:
+                self.rejected += count
+            else:
+                self.sent += count
+
+    def stats(self):
+        with self.lock:
+            pending = self.db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+            oldest = self.db.execute("SELECT MIN(created) FROM outbox").fetchone()[0]
+        return {
+            "pending": pending,
+            "oldest_age": round(time.time() - oldest, 1) if oldest else None,
+            "queued": self.queued,
+            "sent": self.sent,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+class Uploader:
+    """Outbox → 백엔드 전송 스레드"""
+
+    def __init__(self, outbox, base_url, batch_size=BATCH_SIZE):
+        self.outbox = outbox
+        self.base_url = base_url
+        self.batch_size = batch_size
+        self.session = requests.Session()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.backoff = {}    # endpoint → 현재 백오프 (초)
+        self.retry_at = {}   # endpoint → 다시 보낼 수 있는 시각 (monotonic)
+        self.failures = 0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="outbox-uploader", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.outbox.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=REQUEST_TIMEOUT + 1)
+            self.thread = None
+
+    def run(self):
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            waiting = {endpoint: at for endpoint, at in self.retry_at.items() if at > now}
+            batch = self.outbox.claim(self.batch_size, skip=waiting)
+            if batch is None:
+                # 새 데이터가 들어오거나 가장 먼저 백오프가 끝나는 endpoint까지 대기
+                timeout = min([5.0] + [at - now for at in waiting.values()])
+                if self.outbox.wakeup.wait(timeout=timeout):
+                    self.outbox.wakeup.clear()
+                continue
+
+            key, endpoint, payloads = batch
+            result, delay = self.send(key, endpoint, payloads)
+            if result == "retry":
+                self.failures += 1
+                backoff = min(max(self.backoff.get(endpoint, 0.0) * 2, BACKOFF_MIN), BACKOFF_MAX)
+                self.backoff[endpoint] = backoff
+                if delay is None:
+                    delay = backoff * random.uniform(0.8, 1.2)
+                self.retry_at[endpoint] = time.monotonic() + delay
+                continue
+
+            # 성공하면 쌓인 데이터를 쉬지 않고 바로 다음 배치 전송
+            self.outbox.complete(key, rejected=(result == "rejected"))
+            self.backoff.pop(endpoint, None)
+            self.retry_at.pop(endpoint, None)
+
+    def send(self, key, endpoint, payloads):
+        """
+        반환: (결과, 대기 초)
+        결과: "ok" / "rejected" (버림) / "retry" (나중에 같은 배치 재전송)
+        대기 초: 서버가 Retry-After로 알려 준 재시도까지의 시간 (없으면 None → 백오프)
+        """
+        if endpoint == SENSOR_ENDPOINT:
+            # 백엔드에서 Idempotency-Key를 처리하는 곳은 /sensors/batch/ 뿐
+            url, body, headers = f"{self.base_url}{SENSOR_BATCH_ENDPOINT}", payloads, {"Idempotency-Key": key}
+        else:
+            url, body, headers = f"{self.base_url}{endpoint}", payloads[0], {}
+
+        try:
+            response = self.session.post(url, json=body, headers=headers, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            print(f"{{Error}}: {endpoint} {len(payloads)}건 전송 실패, 재시도 예정 ({e})")
+            return "retry", None
+
+        status = response.status_code
+        if status < 300:
+            print(f"{{{status}}}: {endpoint} {len(payloads)}건 전송 완료")
+            return "ok", None
+        if status >= 500 or status in (408, 429):
+            delay = retry_after(response)
+            after = f" ({delay:.0f}초 후)" if delay is not None else ""
+            print(f"{{{status}}}: {endpoint} 서버 사용 불가, 재시도 예정{after}")
+            return "retry", delay
+
+        print(f"{{{status}}}: {endpoint} {len(payloads)}건 거부됨 (Server msg: {response.text[:200]})")
+        return "rejected", None
+
+    def stats(self):
+        return dict(self.outbox.stats(), backoff=dict(self.backoff), failures=self.failures)
@@ -0,0 +1,246 @@
+# serial_reader.py
+"""
+ESP32 → 라즈베리파이 시리얼 수신 (main.py / raspberry.py 공용)
+
+- in_waiting 폴링 대신 블로킹 read: 데이터가 올 때까지 커널에서 대기 → 유휴 시 CPU 사용 없음
+- 바이트 단위 줄 나누기: 한 번에 여러 줄 / 줄 일부만 와도 처리, 남은 조각은 다음 read와 이어 붙임
+  줄바꿈 없이 MAX_LINE_BYTES를 넘으면 다음 줄바꿈까지 버림 (overruns)
+- 파싱한 줄은 타임스탬프와 함께 고정 크기 링 버퍼에 저장
+  꽉 차면 가장 오래된 프레임을 버림 → 소비자가 느려도 읽기 스레드는 멈추지 않음
+  dropped는 소비자(get / drain)가 READER_IDLE 초 안에 읽어 간 적이 있을 때만 셈
+  (아무도 안 읽으면 링은 최근 프레임 기록일 뿐이므로 유실로 보지 않음)
+- on_frame 콜백 예외는 프레임마다 잡아서 세기만 함 (callback_errors)
+  포트를 닫거나 같은 read의 나머지 줄을 버리지 않음
+- 포트 오류 시 0.1초부터 최대 5초까지 늘려 가며 재연결
+
+하드웨어 없이 테스트: python esp32_sim.py → 출력된 /dev/pts/N 을 SERIAL_PORT로 지정
+"""
+import threading
+import time
+from collections import deque, namedtuple
+
+import serial
+
+MAX_LINE_BYTES = 256
+RING_SIZE = 1024
+READER_IDLE = 60     # 초, 이 시간 동안 안 읽으면 소비자 없음으로 봄
+RECONNECT_MIN = 0.1  # 초
+RECONNECT_MAX = 5.0  # 초
+
+# ts: 수신 시각 (time.time()), line: 원문, fields: 파싱 결과 (dict, 실패 시 None)
+Frame = namedtuple("Frame", ["seq", "ts", "line", "fields"])
+
+
+class LineFramer:
+    """바이트 스트림 → 완성된 줄 목록 (LF 기준, 끝의 CR 제거)"""
+
+    def __init__(self, max_line=MAX_LINE_BYTES):
+        self.max_line = max_line
+        self.partial = bytearray()
+        self.discarding = False  # 너무 긴 줄의 나머지를 버리는 중
+        self.overruns = 0
+
+    def feed(self, data):
+        lines = []
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            if self.discarding:
+                self.discarding = False
+            else:
+                self.partial += data[start:end]
+                if len(self.partial) <= self.max_line:
+                    lines.append(bytes(self.partial).rstrip(b"\r"))
+                else:
+                    self.overruns += 1
+            self.partial.clear()
+            start = end + 1
+
+        if not self.discarding:
+            self.partial += data[start:]
+            if len(self.partial) > self.max_line:
+                self.overruns += 1
+                self.partial.clear()
+                self.discarding = True
+        return lines
+
+    def reset(self):
+        self.partial.clear()
+        self.discarding = False
+
+
+class FrameRing:
+    """고정 크기 프레임 버퍼 (꽉 차면 가장 오래된 것부터 버림)"""
+
+    def __init__(self, size=RING_SIZE, reader_idle=READER_IDLE):
+        self.frames = deque(maxlen=size)
+        self.cond = threading.Condition()
+        self.latest = None
+        self.reader_idle = reader_idle
+        self.last_read = None  # 마지막 get / drain 시각 (monotonic)
+        self.waiting = 0       # get()에서 대기 중인 소비자 수
+        self.dropped = 0
+
+    @property
+    def attached(self):
+        """읽어 가는 소비자가 있는지 (lock 잡은 상태에서 호출)"""
+        return self.waiting > 0 or (
+            self.last_read is not None and time.monotonic() - self.last_read < self.reader_idle
+        )
+
+    def put(self, frame):
+        with self.cond:
+            if len(self.frames) == self.frames.maxlen and self.attached:
+                self.dropped += 1
+            self.frames.append(frame)
+            self.latest = frame
+            self.cond.notify_all()
+
+    def get(self, timeout=None):
+        """가장 오래된 프레임 1개 꺼내기 (timeout 동안 없으면 None)"""
+        with self.cond:
+            self.last_read = time.monotonic()
+            if not self.frames:
+                self.waiting += 1
+                try:
+                    if not self.cond.wait_for(lambda: self.frames, timeout):
+                        return None
+                finally:
+                    self.waiting -= 1
+                    self.last_read = time.monotonic()
+            return self.frames.popleft()
+
+    def drain(self):
+        with self.cond:
+            self.last_read = time.monotonic()
+            frames = list(self.frames)
+            self.frames.clear()
+            return frames
+
+    def __len__(self):
+        return len(self.frames)
+
+
+class SerialReader:
+    """
+    시리얼 읽기 스레드
+    - parse(line: str) → dict 또는 None
+    - on_frame(frame): 프레임마다 읽기 스레드에서 바로 호출 (짧게 처리할 것, 예외는 callback_errors로 셈)
+    """
+
+    def __init__(self, port, baudrate, parse=None, on_frame=None, ring_size=RING_SIZE):
+        self.port = port
+        self.baudrate = baudrate
+        self.parse = parse
+        self.on_frame = on_frame
+        self.ring = FrameRing(ring_size)
+        self.framer = LineFramer()
+        self.ser = None
+        self.write_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.seq = 0
+        self.lines = 0
+        self.decode_errors = 0
+        self.callback_errors = 0
+        self.reconnects = 0
+
+    @property
+    def connected(self):
+        return self.ser is not None and self.ser.is_open
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="serial-reader", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.close()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def open(self):
+        self.ser = serial.Serial(self.port, baudrate=self.baudrate, timeout=1)
+        self.framer.reset()  # 재연결 전 조각은 버림
+        print(f"✅ 시리얼 연결 성공: {self.port}")
+
+    def close(self):
+        ser, self.ser = self.ser, None
+        if ser is not None:
+            try:
+                ser.close()
+            except Exception:
+                pass
+
+    def write(self, data):
+        ser = self.ser
+        if ser is None or not ser.is_open:
+            return False
+        try:
+            with self.write_lock:
+                ser.write(data)
+            return True
+        except Exception as e:
+            print(f"Serial write error: {e}")
+            return False
+
+    def run(self):
+        delay = RECONNECT_MIN
+        while not self.stop_event.is_set():
+            try:
+                if not self.connected:
+                    self.open()
+                # 1바이트 올 때까지 블로킹 (최대 timeout=1초) → 이미 도착한 나머지는 한 번에
+                data = self.ser.read(1)
+                if data:
+                    data += self.ser.read(self.ser.in_waiting)
+                    self.handle_bytes(data)
+                delay = RECONNECT_MIN
+            except Exception as e:
+                if self.stop_event.is_set():
+                    break
+                print(f"Serial read error: {e} ({delay:.1f}초 후 재연결)")
+                self.close()
+                self.reconnects += 1
+                self.stop_event.wait(delay)
+                delay = min(delay * 2, RECONNECT_MAX)
+
+    def handle_bytes(self, data):
+        for raw in self.framer.feed(data):
+            try:
+                line = raw.decode("utf-8").strip()
+            except UnicodeDecodeError:
+                self.decode_errors += 1
+                line = raw.decode("utf-8", errors="ignore").strip()
+            if not line:
+                continue
+
+            self.lines += 1
+            self.seq += 1
+            fields = self.parse(line) if self.parse else None
+            frame = Frame(self.seq, time.time(), line, fields)
+            self.ring.put(frame)
+            if self.on_frame:
+                try:
+                    self.on_frame(frame)
+                except Exception as e:
+                    self.callback_errors += 1
+                    if self.callback_errors % 100 == 1:  # 매 프레임 출력하지 않도록
+                        print(f"⚠️ on_frame 오류 ({self.callback_errors}회): {e!r}")
+
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "lines": self.lines,
+            "buffered": len(self.ring),
+            "dropped": self.ring.dropped,
+            "overruns": self.framer.overruns,
+            "decode_errors": self.decode_errors,
+            "callback_errors": self.callback_errors,
+            "reconnects": self.reconnects,
+        }
@@ -0,0 +1,298 @@
+# tests.py
+"""
+브릿지 모듈 테스트 (하드웨어 / 백엔드 없이 실행)
+
+    cd hardware/workspace && python -m unittest tests
+"""
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import esp32_sim
+from aggregator import WindowAggregator, to_reading
+from line_protocol import LineParser, parse_line
+from local_control import LocalFanController
+from outbox import Outbox, Uploader
+from serial_reader import SerialReader
+
+POLICY = {
+    "thresholds": {"2": 25.0, "3": 30.0},
+    "hysteresis": 1.0,
+    "dust_thresholds": {"2": 35.0, "3": 75.0},
+    "dust_hysteresis": 5.0,
+    "pwm": {"1": 90, "2": 170, "3": 255},
+    "min_interval": 0,
+}
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def json(self):
+        return self.body
+
+
+class LocalFanControlTests(unittest.TestCase):
+    """로컬 자동 풍속: 꺼져 있으면 (FAN 0 / 백엔드 전원 끔) 켤 때까지 자동 제어 안 함"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.sent = []
+        self.controller = LocalFanController(
+            "http://backend/api", "fan0", send=lambda cmd: self.sent.append(cmd) or True,
+            cache_path=os.path.join(self.tmp.name, "policy.json"),
+        )
+        self.sync(dict(POLICY, power_state=True), etag='"v1"')
+
+    def sync(self, body, etag):
+        with patch("local_control.requests.get", return_value=FakeResponse(200, body, {"ETag": etag})):
+            self.assertTrue(self.controller.sync_policy())
+
+    def frame(self, temperature):
+        return self.controller.update({"temperature": temperature}, time.time())
+
+    def test_auto_control(self):
+        self.assertEqual(self.frame(31.0)["fan_speed"], 3)
+        self.assertEqual(self.sent, ["FAN 255"])
+
+    def test_manual_off_survives_hold_expiry(self):
+        self.controller.manual(0, seconds=0)  # hold는 바로 끝남
+        self.assertIsNone(self.frame(31.0))
+        self.assertEqual(self.sent, [])
+
+        self.controller.manual(120, seconds=0)  # 다시 켜면 자동 제어
+        self.assertEqual(self.frame(31.0)["fan_speed"], 3)
+
+    def test_backend_power_off(self):
+        self.assertIsNotNone(self.frame(31.0))
+        self.sync(dict(POLICY, power_state=False), etag='"v2"')
+        self.assertEqual(self.sent[-1], "FAN 0")
+        self.assertIsNone(self.frame(20.0))
+
+        self.sync(dict(POLICY, power_state=True), etag='"v3"')
+        self.assertEqual(self.frame(20.0)["fan_speed"], 1)
+
+    def test_unchanged_backend_power_keeps_local_off(self):
+        self.controller.manual(0, seconds=0)
+        self.sync(dict(POLICY, power_state=True, min_interval=1), etag='"v2"')  # 정책만 바뀜
+        self.assertIsNone(self.frame(31.0))
+
+    def test_power_state_cached(self):
+        self.sync(dict(POLICY, power_state=False), etag='"v2"')
+        restarted = LocalFanController(
+            "http://backend/api", "fan0", send=lambda cmd: True, cache_path=self.controller.cache_path
+        )
+        self.assertFalse(restarted.stats()["power"])
+        self.assertIsNone(restarted.update({"temperature": 31.0}, time.time()))
+
+
+class SerialReaderTests(unittest.TestCase):
+    """시리얼 수신: 시뮬레이터가 잘라 보낸 줄 이어 붙이기, 콜백 예외는 세기만 하고 계속 읽음"""
+
+    def setUp(self):
+        self.frames = []
+        self.reader = SerialReader("/dev/null", 115200, parse=parse_line, on_frame=self.frames.append)
+
+    def simulate(self, lines, split=True):
+        """esp32_sim.write_lines로 pipe에 쓴 바이트를 read 단위 그대로 handle_bytes에 전달"""
+        read_fd, write_fd = os.pipe()
+        self.addCleanup(os.close, read_fd)
+        with patch("esp32_sim.time.sleep"):
+            esp32_sim.write_lines(write_fd, lines, split)
+        os.close(write_fd)
+        while True:
+            data = os.read(read_fd, 7)
+            if not data:
+                break
+            self.reader.handle_bytes(data)
+
+    def test_split_lines(self):
+        lines = [esp32_sim.sensor_line(t, "kv") for t in range(20)]
+        self.simulate(lines)
+        self.assertEqual([frame.line for frame in self.frames], lines)
+        self.assertTrue(all(frame.fields and "temperature" in frame.fields for frame in self.frames))
+        self.assertEqual(self.reader.stats()["lines"], 20)
+
+    def test_overrun(self):
+        self.simulate(["X" * 1000, "PM25:17"], split=False)
+        self.assertEqual([frame.line for frame in self.frames], ["PM25:17"])
+        self.assertEqual(self.reader.stats()["overruns"], 1)
+
+    def test_callback_error_keeps_reading(self):
+        def on_frame(frame):
+            if frame.seq == 1:
+                raise ValueError("boom")
+            self.frames.append(frame)
+
+        self.reader.on_frame = on_frame
+        self.reader.handle_bytes(b"PM25:17\nPM25:18\nPM25:19\n")
+        self.assertEqual([frame.line for frame in self.frames], ["PM25:18", "PM25:19"])
+        self.assertEqual(len(self.reader.ring), 3)
+        self.assertEqual(self.reader.stats()["callback_errors"], 1)
+
+
+class OutboxTests(unittest.TestCase):
+    """outbox: 실패한 배치는 같은 키로 재전송, ttl 지난 행은 버림, 429는 항상 재시도 (Retry-After 우선)"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.outbox = Outbox(os.path.join(self.tmp.name, "outbox.db"))
+        self.addCleanup(self.outbox.db.close)
+        self.uploader = Uploader(self.outbox, "http://backend/api")
+
+    def test_claim_and_retry_same_batch(self):
+        for i in range(3):
+            self.outbox.put("/sensors/", {"device": "fan0", "temperature": 20 + i})
+        self.outbox.put("/alert/", {"device_id": "fan0", "event": "습도 높음"})
+
+        key, endpoint, payloads = self.outbox.claim(limit=2)
+        self.assertEqual((endpoint, [p["temperature"] for p in payloads]), ("/sensors/", [20, 21]))
+        self.assertTrue(all("created_at" in p for p in payloads))
+
+        # 완료 전에는 같은 키 · 같은 행 그대로
+        self.assertEqual(self.outbox.claim(limit=2), (key, endpoint, payloads))
+        # 백오프 중인 endpoint는 건너뜀
+        alert_key, alert_endpoint, _ = self.outbox.claim(limit=2, skip=["/sensors/"])
+        self.assertEqual(alert_endpoint, "/alert/")
+
+        self.outbox.complete(key)
+        self.outbox.complete(alert_key, rejected=True)
+        _, _, payloads = self.outbox.claim(limit=2)
+        self.assertEqual([p["temperature"] for p in payloads], [22])
+        self.assertEqual((self.outbox.stats()["sent"], self.outbox.stats()["rejected"]), (2, 1))
+
+    def test_expired_rows_dropped(self):
+        self.outbox.put("/ai/control/", {"mode": "follow"}, ttl=30)
+        self.assertIsNotNone(self.outbox.claim())  # 재시도 중인 배치여도
+        with patch("outbox.time.time", return_value=time.time() + 31):
+            self.assertIsNone(self.outbox.claim())
+        self.assertEqual(self.outbox.stats()["expired"], 1)
+
+    def send(self, status, headers=None):
+        response = FakeResponse(status, headers=headers)
+        response.text = ""
+        with patch.object(self.uploader.session, "post", return_value=response):
+            return self.uploader.send("k", "/alert/", [{}])
+
+    def test_429_is_retried(self):
+        self.assertEqual(self.send(429), ("retry", None))
+        self.assertEqual(self.send(429, {"Retry-After": "120"}), ("retry", 120.0))
+        result, delay = self.send(429, {"Retry-After": "Thu, 01 Jan 2099 00:00:00 GMT"})
+        self.assertEqual(result, "retry")
+        self.assertGreater(delay, 3600)
+        self.assertEqual(self.send(400), ("rejected", None))
+        self.assertEqual(self.send(201), ("ok", None))
+
+    def test_retry_after_sets_retry_at(self):
+        self.outbox.put("/alert/", {"device_id": "fan0"})
+
+        def send(key, endpoint, payloads):
+            self.uploader.stop_event.set()  # 한 번만 전송
+            return "retry", 120.0
+
+        self.uploader.send = send
+        self.uploader.run()
+        self.assertAlmostEqual(self.uploader.retry_at["/alert/"] - time.monotonic(), 120.0, delta=1.0)
+        self.assertEqual(self.outbox.stats()["pending"], 1)
+
+
+class LineProtocolTests(unittest.TestCase):
+    """센서 줄 파서: 지원 형식 / 띄어 쓴 단위 / 잘못된 프레임 거부"""
+
+    def setUp(self):
+        self.parser = LineParser()
+
+    def test_accepted(self):
+        cases = {
+            "PM25:17": {"dust_density": 17.0},
+            "PM2.5 (GRIMM) : 17": {"dust_density": 17.0},
+            "PM2.5: 17 ug/m3": {"dust_density": 17.0},
+            "T=24.5C,H=41%,PM25=17,CO2=412ppm,IR=1": {
+                "temperature": 24.5, "humidity": 41.0, "dust_density": 17.0, "co2_level": 412.0, "ir_detected": True,
+            },
+            "T=24.5 C, H=41 %; CO2=412 ppm": {"temperature": 24.5, "humidity": 41.0, "co2_level": 412.0},
+            "T=24.5 H=41": {"temperature": 24.5, "humidity": 41.0},  # 다음 키를 단위로 읽지 않음
+            "T=77F": {"temperature": 25.0},
+            "24.5,41,17,412,0": {
+                "temperature": 24.5, "humidity": 41.0, "dust_density": 17.0, "co2_level": 412.0, "ir_detected": False,
+            },
+            "T=24.5,VBAT=3.7": {"temperature": 24.5},  # 모르는 키는 무시
+        }
+        for line, expected in cases.items():
+            with self.subTest(line=line):
+                self.assertEqual(self.parser.parse(line), expected)
+
+    def test_rejected(self):
+        for line in ("PM2.5: 17 mg/m3", "T=24.5K", "H=141%", "T=24.5,T=25", "IR=maybe", "PM25:", "T=24.5 ppmx"):
+            with self.subTest(line=line):
+                self.assertIsNone(self.parser.parse(line))
+        self.assertEqual(self.parser.stats()["rejected"], 7)
+
+    def test_log_lines_ignored(self):
+        for line in ("Fan speed set to 120", "boot ok", "Received: STOP"):
+            self.assertIsNone(self.parser.parse(line))
+        self.assertEqual(self.parser.stats(), dict(self.parser.stats(), ignored=3, rejected=0))
+
+
+class WindowAggregatorTests(unittest.TestCase):
+    """윈도우 집계: 시계 기준 윈도우마다 1건, 임계값을 넘는 순간만 즉시 업로드"""
+
+    def setUp(self):
+        self.summaries = []
+        self.alerts = []
+        self.aggregator = WindowAggregator(
+            window=10, thresholds={"dust_density": 75.0}, on_summary=self.summaries.append,
+            on_alert=lambda fields, ts, names: self.alerts.append((ts, names)),
+        )
+
+    def test_tumbling_windows(self):
+        self.aggregator.add({"temperature": 24.0, "ir_detected": False}, 1003.0)
+        self.aggregator.add({"temperature": 26.0, "ir_detected": True}, 1007.5)
+        self.aggregator.add({"dust_density": 12.0}, 1009.9)
+        self.assertEqual(self.summaries, [])
+
+        self.aggregator.add({"temperature": 30.0}, 1010.0)  # 다음 윈도우의 첫 프레임
+        summary, = self.summaries
+        self.assertEqual((summary["start"], summary["end"], summary["frames"]), (1000.0, 1010.0, 3))
+        self.assertEqual(
+            summary["channels"]["temperature"], {"count": 2, "mean": 25.0, "min": 24.0, "max": 26.0, "last": 26.0}
+        )
+        self.assertEqual(to_reading(summary), {"temperature": 25.0, "ir_detected": True, "dust_density": 12.0})
+
+    def test_flush_due_without_frames(self):
+        self.aggregator.add({"temperature": 24.0}, 1003.0)
+        self.aggregator.flush_due(1009.0)
+        self.assertEqual(self.summaries, [])
+        self.aggregator.flush_due(1010.5)  # 프레임이 끊겨도 타이머가 윈도우 끝에 전송
+        self.assertEqual(len(self.summaries), 1)
+        self.aggregator.flush_due(1030.0)  # 빈 윈도우는 보내지 않음
+        self.assertEqual(len(self.summaries), 1)
+
+    def test_alert_on_crossing_only(self):
+        for ts, dust in ((1001.0, 50.0), (1002.0, 80.0), (1003.0, 90.0), (1004.0, 40.0), (1005.0, 76.0)):
+            self.aggregator.add({"dust_density": dust}, ts)
+        self.assertEqual(self.alerts, [(1002.0, ["dust_density"]), (1005.0, ["dust_density"])])
+        self.assertEqual(self.aggregator.stats()["alerting"], ["dust_density"])
+
+    def test_stop_flushes_pending(self):
+        self.aggregator.add({"temperature": 24.0}, time.time())
+        self.aggregator.stop()
+        self.assertEqual(self.summaries[0]["frames"], 1)
+
+    def test_no_window_uploads_every_frame(self):
+        aggregator = WindowAggregator(window=0, on_summary=self.summaries.append, on_alert=self.alerts.append)
+        aggregator.add({"dust_density": 90.0}, 1001.0)
+        aggregator.add({"dust_density": 91.0}, 1002.0)
+        self.assertEqual([summary["frames"] for summary in self.summaries], [1, 1])
+        self.assertEqual(self.alerts, [])  # 프레임마다 이미 업로드
+
+
+if __name__ == "__main__":
+    unittest.main()